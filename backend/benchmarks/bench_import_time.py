@@ -0,0 +1,164 @@
+"""Profile the API's import time and enforce a cold-start budget.
+
+Imports ``main`` in a fresh interpreter with ``python -X importtime``,
+prints the slowest modules and exits non-zero if the total exceeds the
+budget or if a heavy subsystem (torch, diffusers, the STT stack, LLM and
+vector-store SDKs, ...) is imported before it is first used. It then starts
+the server and times how long ``/health`` takes to answer, which also
+covers everything the lifespan awaits before serving.
+
+Run from backend/:  python -m benchmarks.bench_import_time [budget_seconds] [runs]
+"""
+
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List, Optional, Tuple
+
+DEFAULT_BUDGET = 1.0  # seconds
+# Interpreter start, import and lifespan until the first /health response
+DEFAULT_HEALTH_BUDGET = 1.5  # seconds
+HEALTH_GIVE_UP = 60.0  # seconds
+
+# Must only load on first use, never when the app is imported
+DEFERRED_MODULES = [
+    "torch",
+    "torchaudio",
+    "diffusers",
+    "transformers",
+    "sentence_transformers",
+    "huggingface_hub",
+    "docling",
+    "fastembed",
+    "elevenlabs",
+    "google.genai",
+    "langchain_google_genai",
+    "langchain_ollama",
+    "langchain_qdrant",
+    "qdrant_client",
+    "langchain_mcp_adapters",
+    "langgraph",
+    "utils.stt",
+    "utils.graph_utils",
+]
+
+
+def profile_import(
+    module: str = "main",
+) -> Tuple[float, List[Tuple[int, int, str]], List[str]]:
+    """Return (total seconds, [(depth, cumulative us, name)], modules loaded)"""
+    code = f"import json, sys; import {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries: List[Tuple[int, int, str]] = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <module, indented by depth>"
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative_us), name.strip()))
+        if name.strip() == module and depth == 0:
+            total = int(cumulative_us) / 1e6
+    # Failed optional imports also show up in the profile, so ask the interpreter
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return total, entries, loaded
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_health() -> Optional[float]:
+    """Seconds from launching the server until /health answers, None if it never does"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < HEALTH_GIVE_UP:
+            if server.poll() is not None:
+                return None
+            try:
+                with urllib.request.urlopen(url, timeout=HEALTH_GIVE_UP) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        return None
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main() -> None:
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    # Best of several runs; the first may pay for cold disk caches
+    best = None
+    for _ in range(runs):
+        profile = profile_import()
+        if best is None or profile[0] < best[0]:
+            best = profile
+    total, entries, loaded = best
+
+    print(f"import main: {total:.3f}s (budget {budget:.3f}s, best of {runs})")
+    print("Slowest imports under main:")
+    for depth, cumulative_us, name in sorted(
+        (e for e in entries if 1 <= e[0] <= 3), key=lambda e: e[1], reverse=True
+    )[:15]:
+        print(f"  {cumulative_us / 1e6:8.3f}s  {'  ' * (depth - 1)}{name}")
+
+    failures = []
+    heavy = [
+        module
+        for module in DEFERRED_MODULES
+        if any(name == module or name.startswith(module + ".") for name in loaded)
+    ]
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if total > budget:
+        failures.append(f"import time {total:.3f}s exceeds budget {budget:.3f}s")
+
+    health = time_to_health()
+    if health is None:
+        failures.append(f"/health did not answer within {HEALTH_GIVE_UP:.0f}s")
+    else:
+        print(
+            f"/health answered after {health:.3f}s "
+            f"(budget {DEFAULT_HEALTH_BUDGET:.3f}s)"
+        )
+        if health > DEFAULT_HEALTH_BUDGET:
+            failures.append(
+                f"/health took {health:.3f}s, budget {DEFAULT_HEALTH_BUDGET:.3f}s"
+            )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
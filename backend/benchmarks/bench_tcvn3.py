@@ -0,0 +1,52 @@
+"""Benchmark TCVN3 transcoding on a multi-megabyte document.
+
+Run from backend/:  python -m benchmarks.bench_tcvn3 [size_mb]
+"""
+
+import sys
+import time
+
+from utils.tools.tcvn3 import _TCVN3_UNICODE_MAP, is_tcvn3, tcvn3_to_unicode
+
+TRANSLATION_TABLE = str.maketrans(_TCVN3_UNICODE_MAP)
+
+
+def legacy_tcvn3_to_unicode(vnstr: str) -> str:
+    """The previous implementation: a dict lookup and a concatenation per character"""
+    result = ""
+    for c in vnstr:
+        result += _TCVN3_UNICODE_MAP.get(c, c)
+    return result
+
+
+def make_document(size_mb: float) -> str:
+    # "Chuyển động thẳng biến đổi đều là gì?" in TCVN3, plus a non-Latin-1 bullet
+    line = "• ChuyÓn ®éng th¼ng biÕn ®æi ®Òu lµ g×?\n"
+    repeat = int(size_mb * 1024 * 1024 / len(line.encode("utf-8")))
+    return line * repeat
+
+
+def timed(label: str, func, text: str) -> str:
+    start = time.perf_counter()
+    result = func(text)
+    elapsed = time.perf_counter() - start
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"{label:<12} {elapsed:8.3f}s  {mb / elapsed:8.1f} MB/s")
+    return result
+
+
+def main() -> None:
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 8.0
+    text = make_document(size_mb)
+    print(f"Document: {len(text):,} characters ({size_mb} MB)")
+
+    timed("detect", is_tcvn3, text)
+    fast = timed("charmap", tcvn3_to_unicode, text)
+    translated = timed("translate", lambda t: t.translate(TRANSLATION_TABLE), text)
+    legacy = timed("legacy", legacy_tcvn3_to_unicode, text)
+    assert fast == translated == legacy, "conversion outputs differ"
+    print(f"Sample: {fast[:40]}")
+
+
+if __name__ == "__main__":
+    main()
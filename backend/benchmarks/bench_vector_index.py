@@ -0,0 +1,137 @@
+"""Compare recall and latency of the embedded vector index against Qdrant.
+
+Run from backend/:  python -m benchmarks.bench_vector_index [num_vectors] [dim]
+
+Uses clustered synthetic vectors; exact brute-force search is the ground
+truth for recall@k. The Qdrant row is skipped when Config.QDRANT_URL is not
+reachable.
+"""
+
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from config.config import Config
+from utils.tools.local_vector_index import LocalVectorIndex, _normalize_rows
+
+K = 10
+NUM_QUERIES = 200
+
+
+def make_vectors(num_vectors: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, num_vectors // 50), dim))
+    labels = rng.integers(len(centers), size=num_vectors + NUM_QUERIES)
+    noise = 2.0 * rng.normal(size=(len(labels), dim))
+    data = _normalize_rows(centers[labels] + noise)
+    return data[:num_vectors], data[num_vectors:]
+
+
+def evaluate(
+    label: str, search, queries: np.ndarray, truth: np.ndarray
+) -> None:
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(set(found) & set(expected)) / K)
+    latencies_ms = np.array(latencies) * 1000
+    print(
+        f"{label:<22} recall@{K} {np.mean(recalls):.3f}   "
+        f"p50 {np.percentile(latencies_ms, 50):7.2f} ms   "
+        f"p95 {np.percentile(latencies_ms, 95):7.2f} ms"
+    )
+
+
+def bench_local(
+    vectors,
+    queries,
+    truth,
+    quantization: str,
+    nlist: int,
+    label: str,
+    nprobes=(Config.LOCAL_INDEX_NPROBE,),
+) -> None:
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path, quantization=quantization, nlist=nlist)
+        ids = [str(i) for i in range(len(vectors))]
+        payloads = [{"page_content": "", "metadata": {}}] * len(vectors)
+        index.upsert(ids, vectors, payloads)
+        start = time.perf_counter()
+        index.save()
+        build = time.perf_counter() - start
+        index = LocalVectorIndex.load(path)
+        print(f"{label}: built in {build:.1f}s")
+        for nprobe in nprobes:
+            evaluate(
+                f"  nprobe={nprobe}" if nlist else "  exact",
+                lambda q: [row for row, _ in index.search(q, K, nprobe=nprobe)],
+                queries,
+                truth,
+            )
+
+
+def bench_qdrant(vectors, queries, truth) -> None:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as q_models
+
+    try:
+        client = QdrantClient(url=Config.QDRANT_URL, timeout=5)
+        client.get_collections()
+    except Exception as e:
+        print(f"qdrant: skipped ({e})")
+        return
+
+    name = "bench_vector_index"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        name,
+        vectors_config=q_models.VectorParams(
+            size=vectors.shape[1], distance=q_models.Distance.COSINE
+        ),
+    )
+    client.upload_collection(
+        name, vectors=vectors, ids=list(range(len(vectors))), wait=True
+    )
+    try:
+        print("qdrant (hnsw):")
+        evaluate(
+            "  default",
+            lambda q: [
+                p.id
+                for p in client.query_points(name, query=q.tolist(), limit=K).points
+            ],
+            queries,
+            truth,
+        )
+    finally:
+        client.delete_collection(name)
+
+
+def main() -> None:
+    num_vectors = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    vectors, queries = make_vectors(num_vectors, dim)
+    truth = np.argsort(queries @ vectors.T, axis=1)[:, ::-1][:, :K]
+    print(f"{num_vectors} vectors, dim {dim}, {NUM_QUERIES} queries")
+
+    nlist = int(np.sqrt(num_vectors))
+    nprobes = (4, 8, 16, 32)
+    bench_local(vectors, queries, truth, "none", 0, "local f32")
+    bench_local(vectors, queries, truth, "int8", 0, "local int8")
+    bench_local(
+        vectors, queries, truth, "none", nlist, f"local ivf{nlist} f32", nprobes
+    )
+    bench_local(
+        vectors, queries, truth, "int8", nlist, f"local ivf{nlist} int8", nprobes
+    )
+    bench_qdrant(vectors, queries, truth)
+
+
+if __name__ == "__main__":
+    main()
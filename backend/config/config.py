@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 # Load environment variables from .env file in the config directory
@@ -37,6 +37,8 @@ class Config:
     OLLAMA_CONNECTION_TIMEOUT: int = 10
     OLLAMA_MAX_RETRIES: int = 3
     OLLAMA_RETRY_DELAY: int = 1
+    # Keep the model (and its KV cache for the shared prompt prefix) loaded
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 
     # LLM Configuration
     LLM_MODEL: str = ""
@@ -46,6 +48,42 @@ class Config:
     LLM_BASE_URL: str = OLLAMA_BASE_URL
     MAX_TOKENS: int = 2048
 
+    # Per-agent model profiles; agents not listed use "default"
+    LLM_PROFILES: Dict[str, Dict[str, Any]] = {
+        "default": {
+            "google_model": GOOGLE_MODEL,
+            "ollama_model": LLM_MODEL,
+            "temperature": LLM_TEMPERATURE,
+            "max_tokens": None,
+            "context_length": LLM_CONTEXT_LENGTH,
+        },
+        # Routing only emits "ROUTE: <Agent>", so a small deterministic model will do
+        "routing": {
+            "google_model": os.getenv("GOOGLE_ROUTER_MODEL", "gemini-2.5-flash-lite"),
+            "ollama_model": os.getenv("OLLAMA_ROUTER_MODEL", LLM_MODEL),
+            "temperature": 0.0,
+            "max_tokens": 16,
+            "context_length": 2048,
+            "thinking_budget": 0,
+        },
+    }
+    AGENT_LLM_PROFILES: Dict[str, str] = {"router": "routing"}
+
+    # LLM Client Pool
+    LLM_FALLBACK_PROVIDER: str = os.getenv("LLM_FALLBACK_PROVIDER", "")  # e.g. "ollama"
+    LLM_MAX_CONCURRENCY: Dict[str, int] = {"google_ai_studio": 8, "ollama": 2}
+    LLM_RATE_LIMIT_PER_MINUTE: Dict[str, int] = {"google_ai_studio": 60, "ollama": 0}
+    LLM_QUEUE_TIMEOUT: float = 30.0  # seconds to wait for a free slot
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_TIMEOUT: float = 30.0
+    LLM_HEDGE_DELAY: float = 0.0  # start the fallback after this many seconds; 0 = off
+
+    # Provider-side prompt caching of static system prompts
+    ENABLE_PROVIDER_PROMPT_CACHE: bool = (
+        os.getenv("ENABLE_PROVIDER_PROMPT_CACHE", "false").lower() == "true"
+    )
+    GOOGLE_CONTEXT_CACHE_TTL: int = 3600  # seconds
+
     # LLM Advanced Parameters
     LLM_TOP_K: int = 64
     LLM_MIN_P: float = 0.01
@@ -62,16 +100,168 @@ class Config:
     MAX_RETRIES: int = 3
     RETRY_DELAY: int = 1
     EARLY_STOPPING_METHOD: str = "force"
+    # Planner mode: the router may pick several agents for a compound question;
+    # they run concurrently and their answers are merged
+    ENABLE_PARALLEL_AGENTS: bool = (
+        os.getenv("ENABLE_PARALLEL_AGENTS", "false").lower() == "true"
+    )
+    MAX_PARALLEL_AGENTS: int = int(os.getenv("MAX_PARALLEL_AGENTS", "3"))
+    # Seconds a fanned-out turn waits for its agents; late ones are left out
+    PARALLEL_AGENTS_DEADLINE: float = float(
+        os.getenv("PARALLEL_AGENTS_DEADLINE", "60")
+    )
+    # Speculative routing: the agent predicted from keywords (or the previous
+    # turn) starts alongside the router; kept if the router agrees, else cancelled
+    ENABLE_SPECULATIVE_AGENTS: bool = (
+        os.getenv("ENABLE_SPECULATIVE_AGENTS", "false").lower() == "true"
+    )
+    # Only agents whose runs are safe to discard (no image generation)
+    SPECULATIVE_AGENTS: List[str] = os.getenv(
+        "SPECULATIVE_AGENTS", "assistant,math,research,planning,rag"
+    ).split(",")
 
     # Feature Flags
     ENABLE_STREAMING: bool = False
+    # Register the document-grounded RAG agent in the main graph
+    ENABLE_RAG: bool = os.getenv("ENABLE_RAG", "true").lower() == "true"
+    # Image agent and generate_image tool; its providers load on first use
+    ENABLE_IMAGE_GENERATION: bool = (
+        os.getenv("ENABLE_IMAGE_GENERATION", "true").lower() == "true"
+    )
+    # Index chat uploads per session and retrieve from them on every turn
+    ENABLE_SESSION_DOCUMENTS: bool = (
+        os.getenv("ENABLE_SESSION_DOCUMENTS", "true").lower() == "true"
+    )
+    # Use provider function calling (bind_tools) instead of "[Tool Used]" parsing
+    ENABLE_NATIVE_TOOL_CALLING: bool = (
+        os.getenv("ENABLE_NATIVE_TOOL_CALLING", "true").lower() == "true"
+    )
 
     # File Paths Configuration
     CACHE_DIR: str = "database/cache"
     AUDIO_UPLOAD_DIR: str = f"{CACHE_DIR}/audioUpload"
     GENERATED_IMAGES_DIR: str = f"{CACHE_DIR}/generated_images"
     UPLOADED_FILES_DIR: str = f"{CACHE_DIR}/uploaded_files"
+    MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # bytes; larger uploads get 413
+    MAX_AUDIO_UPLOAD_SIZE: int = 25 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # Speech-to-Text (worker processes; the API process never loads the model)
+    ENABLE_STT: bool = os.getenv("ENABLE_STT", "true").lower() == "true"
+    # Module exposing run(long_form_audio, data); "utils.wrappers.stt_stub" for tests
+    STT_MODEL: str = os.getenv("STT_MODEL", "utils.stt.decode")
+    STT_WORKERS: int = int(os.getenv("STT_WORKERS", "1"))
+    STT_MAX_PENDING: int = 8  # further requests get 503
+    STT_BATCH_SIZE: int = 4  # used when the model module has run_batch
+    STT_BATCH_WAIT: float = 0.02  # seconds to collect concurrent requests
+    STT_TIMEOUT: float = 120.0
+
+    # PDF Extraction
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+    PDF_PAGES_PER_TASK: int = 8  # pages per worker task; smaller streams sooner
+    PDF_TEXT_CACHE_PATH: str = f"{CACHE_DIR}/pdf_text_cache.sqlite3"
+    PDF_HASH_CACHE_SIZE: int = 1024  # remembered (path, size, mtime) -> SHA-256
+
+    # LLM Response Cache
+    ENABLE_LLM_RESPONSE_CACHE: bool = (
+        os.getenv("ENABLE_LLM_RESPONSE_CACHE", "false").lower() == "true"
+    )
+    ENABLE_LLM_SEMANTIC_CACHE: bool = (
+        os.getenv("ENABLE_LLM_SEMANTIC_CACHE", "false").lower() == "true"
+    )
+    LLM_CACHE_PATH: str = f"{CACHE_DIR}/llm_response_cache.json"
+    LLM_CACHE_MAX_ENTRIES: int = 2000
+    LLM_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    LLM_CACHE_TTL: int = 24 * 3600  # seconds
+    LLM_CACHE_SAVE_EVERY: int = 20  # persist after this many new entries
+    LLM_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    # Empty uses EMBEDDING_MODEL: traffic is mostly Vietnamese, and an
+    # English-only model scores unrelated Vietnamese prompts as near-duplicates
+    LLM_CACHE_EMBEDDING_MODEL: str = os.getenv("LLM_CACHE_EMBEDDING_MODEL", "")
+    # Per-agent opt-in; agents not listed are never cached. Agents whose answers
+    # depend on tools (web search) or the current time must stay off.
+    LLM_CACHE_AGENTS: Dict[str, bool] = {
+        "router": True,
+        "research": False,
+        "planning": False,
+        # Keyed on the retrieved context too, so answers follow the documents
+        "rag": True,
+    }
 
     # Database Configuration
-    QDRANT_URL: str = "http://localhost:6333"
-    QDRANT_COLLECTION_NAME: str = "rag_collection"
+    QDRANT_URL: str = os.getenv("QDRANT_URL", "http://localhost:6333")
+    QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+    QDRANT_COLLECTION_NAME: str = os.getenv("QDRANT_COLLECTION_NAME", "rag_collection")
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 10
+
+    # Embedding Service
+    EMBEDDING_MODEL: str = os.getenv(
+        "EMBEDDING_MODEL", "thanhtantran/Vietnamese_Embedding_v2"
+    )
+    EMBEDDING_BATCH_SIZE: int = 64
+    # "torch", "onnx" or "openvino"; CPU nodes benefit from onnx
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+    # ONNX weights inside the model repo, e.g. "onnx/model_qint8_avx512.onnx" for int8
+    EMBEDDING_ONNX_FILE: str = os.getenv("EMBEDDING_ONNX_FILE", "")
+    ENABLE_EMBEDDING_CACHE: bool = (
+        os.getenv("ENABLE_EMBEDDING_CACHE", "true").lower() == "true"
+    )
+    EMBEDDING_CACHE_PATH: str = f"{CACHE_DIR}/embedding_cache.sqlite3"
+    # Least recently used vectors beyond this are evicted (~4 KB each at 1024 dims)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(
+        os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000")
+    )
+    EMBEDDING_CACHE_TTL: int = 30 * 24 * 3600  # seconds since last use
+    EMBEDDING_MICROBATCH_WAIT: float = 0.01  # seconds to collect concurrent queries
+    EMBEDDING_MICROBATCH_SIZE: int = 32
+    # Ingestion chunks are measured in tokens of the embedding model's tokenizer
+    INGEST_CHUNK_TOKENS: int = int(os.getenv("INGEST_CHUNK_TOKENS", "256"))
+    INGEST_CHUNK_OVERLAP_TOKENS: int = int(
+        os.getenv("INGEST_CHUNK_OVERLAP_TOKENS", "64")
+    )
+
+    # RAG Retrieval
+    RAG_TOP_K: int = 6
+    RAG_PREFETCH_K: int = 20  # candidates per search before fusion/reranking
+    # Sparse model for hybrid search (fastembed); empty disables the sparse leg
+    RAG_SPARSE_MODEL: str = os.getenv("RAG_SPARSE_MODEL", "Qdrant/bm25")
+    RAG_SPARSE_VECTOR_NAME: str = "langchain-sparse"
+    RAG_RRF_K: int = 60
+    RAG_DENSE_SCORE_THRESHOLD: float = 0.3  # cosine; weaker dense hits are dropped
+    # Local cross-encoder, e.g. "BAAI/bge-reranker-v2-m3"; empty disables reranking
+    RAG_RERANKER_MODEL: str = os.getenv("RAG_RERANKER_MODEL", "")
+    RAG_RERANK_BATCH_SIZE: int = 16
+    RAG_RERANK_SCORE_THRESHOLD: float = 0.2  # sigmoid relevance
+    # Drop chunks scoring below this fraction of the best chunk (reranker or
+    # cosine score). Fused rank scores get their own cutoff: at 0.45 a chunk
+    # found by one search only survives in its top ~7 when the best chunk was
+    # found by both. Without a reranker, chunks the dense search rejected are
+    # dropped even when BM25 found them.
+    RAG_RELATIVE_SCORE_CUTOFF: float = 0.5
+    RAG_FUSED_RELATIVE_SCORE_CUTOFF: float = 0.45
+    # Retrieval caches; results are keyed by the collection's index_version
+    RAG_RESULT_CACHE_SIZE: int = 1000
+    RAG_RESULT_CACHE_TTL: int = 3600  # seconds
+    RAG_QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    RAG_VERSION_CHECK_INTERVAL: float = 5.0  # seconds between index_version polls
+
+    # Vector store backend: "qdrant", "local" (embedded NumPy index) or
+    # "auto" (Qdrant, falling back to the local index when unreachable)
+    VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "auto")
+    LOCAL_INDEX_DIR: str = "database/local_index"
+    LOCAL_INDEX_QUANTIZATION: str = "none"  # or "int8"
+    LOCAL_INDEX_NLIST: int = 0  # IVF partitions; 0 = exact search
+    LOCAL_INDEX_NPROBE: int = 8
+
+    # Session Documents (chat uploads)
+    SESSION_DOCS_COLLECTION: str = "session_documents"
+    SESSION_DOCS_INGEST_WORKERS: int = 1
+    SESSION_DOCS_CHUNK_SIZE: int = 800
+    SESSION_DOCS_CHUNK_OVERLAP: int = 200
+    SESSION_DOCS_TOP_K: int = 4  # bounds the prompt regardless of document length
+    SESSION_DOCS_MAX_RETRIEVERS: int = 256
+    SESSION_DOCS_MAX_JOBS: int = 1000  # finished upload jobs kept for status queries
+    # How long an upload turn waits for indexing before answering without it
+    SESSION_DOCS_UPLOAD_WAIT: float = 20.0  # seconds
@@ -39,6 +39,31 @@ Examples:
 - "Draw a sunset" → "ROUTE: Image"
 """
 
+    # Appended to the router prompt when the RAG agent is available
+    RAG_ROUTE_HINT = """
+Additional agent:
+- **RAG**: Questions about the course materials and documents in the knowledge base
+  (textbook content, lessons, exercises)
+  e.g. "Chuyển động thẳng biến đổi đều là gì?" → "ROUTE: RAG"
+"""
+
+    # Appended to the router prompt in planner mode (ENABLE_PARALLEL_AGENTS)
+    PARALLEL_ROUTE_HINT = """
+Compound requests:
+If the request has independent parts that need different specialists, list every
+agent needed, separated by commas. They will work in parallel. Use a single agent
+whenever one is enough.
+  e.g. "Summarize the causes of inflation and compute 3% compounded over 10 years"
+  → "ROUTE: Research, Math"
+"""
+
+    # Prepended to the user's message when their uploaded documents match it
+    SESSION_DOCUMENTS_CONTEXT = """Relevant excerpts from documents the user uploaded:
+
+{context}
+
+User message: {message}"""
+
     # RAG Agent Prompts
     #     RAG_SYSTEM_PROMPT = """You are an intelligent research assistant that provides accurate, clear, and well-sourced answers based on retrieved documents from the knowledge database.
 
@@ -182,6 +207,18 @@ def get_router_system_prompt():
     return Prompts.ROUTER_PROMPT
 
 
+def get_rag_route_hint():
+    return Prompts.RAG_ROUTE_HINT
+
+
+def get_parallel_route_hint():
+    return Prompts.PARALLEL_ROUTE_HINT
+
+
+def get_session_documents_context(context: str, message: str):
+    return Prompts.SESSION_DOCUMENTS_CONTEXT.format(context=context, message=message)
+
+
 def get_RAG_system_prompt():
     return Prompts.RAG_SYSTEM_PROMPT
 
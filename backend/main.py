@@ -4,15 +4,88 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from utils.api.endpoints import router
 from config.config import Config
+from typing import Coroutine, Dict
 import os
+import asyncio
+import importlib
 import logging
 from services.mcp_service import detach_mcp_service
+from services.rag_service import rag_service
+from services.pdf_service import pdf_service
+from services.document_service import document_service
+from services.stt_service import stt_service
+from services.graph_service import graph_service
+from services.llm_service import llm_service
+from services.conversation_service import conversation_service
 from database.connection import init_database, close_database
+from utils.wrappers.llm_cache import llm_response_cache
+from utils.tools.file_storage import remove_partial_uploads
 from contextlib import asynccontextmanager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Startup work that runs after the app starts serving, by name
+startup_tasks: Dict[str, asyncio.Task] = {}
+# Must have finished before /ready reports 200; STT loads on its own schedule
+READINESS_TASKS = ("mcp", "rag", "documents", "agents")
+
+
+def start_in_background(name: str, coro: Coroutine) -> None:
+    startup_tasks[name] = asyncio.create_task(coro, name=f"startup:{name}")
+
+
+def startup_status() -> Dict[str, str]:
+    """``pending``, ``done`` or ``failed`` per startup task"""
+    status = {}
+    for name, task in startup_tasks.items():
+        if not task.done():
+            status[name] = "pending"
+        elif task.cancelled() or task.exception() is not None:
+            status[name] = "failed"
+        else:
+            status[name] = "done"
+    return status
+
+
+async def preload(*modules: str) -> None:
+    """Import SDKs in a worker thread; importing them on the loop would stall it"""
+    for module in modules:
+        await asyncio.to_thread(importlib.import_module, module)
+
+
+async def initialize_mcp() -> None:
+    try:
+        await preload("langchain_mcp_adapters.client")
+        await detach_mcp_service.initialize_client()
+        tools = await detach_mcp_service.get_tools()
+        logger.info(f"MCP service initialized with {len(tools)} tools")
+    except Exception as e:
+        logger.error(f"Error initializing MCP service: {e}")
+
+
+async def initialize_rag() -> None:
+    await preload("qdrant_client")
+    await rag_service.initialize()
+
+
+async def initialize_documents() -> None:
+    await preload("qdrant_client", "langchain_text_splitters")
+    await document_service.initialize()
+
+
+async def warm_up_agents() -> None:
+    """Build the shared agent graphs and bind the chat and voice services to them"""
+    # The router lists the MCP tools, so wait for the MCP client first
+    await asyncio.wait([startup_tasks["mcp"]])
+    await graph_service.warm_up()
+    for service in (llm_service, conversation_service):
+        try:
+            await service.initialize()
+        except Exception:
+            # Logged by the service; the first request retries
+            pass
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,18 +98,53 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
 
-    # Initialize MCP service
-    try:
-        await detach_mcp_service.initialize_client()
-        tools = await detach_mcp_service.get_tools()
-        logger.info(f"MCP service initialized with {len(tools)} tools")
-    except Exception as e:
-        logger.error(f"Error initializing MCP service: {e}")
+    # Drop half-written uploads from a previous run
+    for directory in (Config.UPLOADED_FILES_DIR, Config.AUDIO_UPLOAD_DIR):
+        removed = remove_partial_uploads(directory)
+        if removed:
+            logger.info(f"Removed {removed} partial uploads from {directory}")
+
+    # Everything that connects to other services or loads models runs in the
+    # background, so /health answers at once; /ready reports 503 until done
+    start_in_background("mcp", initialize_mcp())
+    # Connect the shared Qdrant client and load retrieval models once
+    start_in_background("rag", initialize_rag())
+    # Start the background indexer for chat uploads
+    start_in_background("documents", initialize_documents())
+    # Build the agent graphs (MCP tool listing included)
+    start_in_background("agents", warm_up_agents())
+    # Load the STT model in its worker processes
+    start_in_background("stt", stt_service.warm_up())
 
     yield
 
     logger.info("Shutting down application...")
 
+    for task in startup_tasks.values():
+        task.cancel()
+
+    # Persist cached LLM responses
+    try:
+        llm_response_cache.save()
+    except Exception as e:
+        logger.error(f"Error saving LLM response cache: {e}")
+
+    # Close the Qdrant connection
+    try:
+        await rag_service.close()
+    except Exception as e:
+        logger.error(f"Error closing RAG service: {e}")
+
+    # Stop indexing chat uploads
+    try:
+        await document_service.close()
+    except Exception as e:
+        logger.error(f"Error closing document service: {e}")
+
+    # Stop PDF extraction and STT workers
+    pdf_service.shutdown()
+    stt_service.shutdown()
+
     # Close database connections
     try:
         await close_database()
@@ -102,7 +210,30 @@ async def health_check():
         "status": "healthy",
         "service": "omni-multi-agent-backend",
         "version": "1.0.0",
+        "rag": await rag_service.health(),
+        "stt": stt_service.get_stats(),
+        "agents": graph_service.get_status(),
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the document backends have connected (or
+    given up) and the agent graphs are built, so load balancers only route
+    to warm workers."""
+    startup = startup_status()
+    agents = graph_service.get_status()
+    ready = agents["ready"] and all(
+        startup.get(name) in ("done", "failed") for name in READINESS_TASKS
+    )
+    content = {
+        "ready": ready,
+        "startup": startup,
+        "rag": rag_service.available,
+        "documents": document_service.available,
+        "agents": agents,
     }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
 
 
 app.include_router(router, prefix="/api")
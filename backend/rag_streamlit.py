@@ -8,7 +8,7 @@ nest_asyncio.apply()  # Thêm cái này để fix event loop trong Streamlit
 # các import của bạn, ví dụ:
 from qdrant_client import QdrantClient
 from langchain_qdrant import QdrantVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
+from utils.wrappers.embedding_wrapper import get_embeddings
 from langchain_core.messages import HumanMessage
 from utils.agents.rag_agent import RAGAgent
 
@@ -19,9 +19,7 @@ async def create_rag_agent():
     vectorstore = QdrantVectorStore(
         client=qdrant_client,
         collection_name="rag_collection",
-        embedding=HuggingFaceEmbeddings(
-            model_name="thanhtantran/Vietnamese_Embedding_v2"
-        ),
+        embedding=get_embeddings("thanhtantran/Vietnamese_Embedding_v2"),
     )
     return RAGAgent(llm=None, vectorstore=vectorstore)
 
@@ -1,10 +1,10 @@
-from typing import Optional
-from utils.graph_utils import create_conversation_agent_graph
-from utils.agents.conversation_agent import ConversationAgent
+from typing import TYPE_CHECKING, Optional
 import logging
-from langchain_core.runnables import RunnableConfig
-from utils.stt.decode import run
-from utils.wrappers.tts_wrapper import TTSWrapper
+from services.stt_service import stt_service
+from services.graph_service import graph_service
+
+if TYPE_CHECKING:
+    from utils.agents.conversation_agent import ConversationAgent
 
 logger = logging.getLogger(__name__)
 
@@ -13,30 +13,45 @@ class ConversationService:
     """Service to manage LLM interactions and agent coordination"""
 
     def __init__(self):
-        self.chat_agent: Optional[ConversationAgent] = None
+        self.chat_agent: Optional["ConversationAgent"] = None
         self.initialized = False
-        self.tts_model = TTSWrapper()
-        self.stt_model = run
+        self._tts_model = None
+        # Speech-to-text runs in the STT worker pool, never in this process
+        self.stt_model = stt_service
+        self._graph_version = 0
+
+    @property
+    def tts_model(self):
+        """ElevenLabs is imported and connected on the first voice reply"""
+        if self._tts_model is None:
+            from utils.wrappers.tts_wrapper import TTSWrapper
+
+            self._tts_model = TTSWrapper()
+        return self._tts_model
 
     async def initialize(self) -> None:
         """Initialize the service asynchronously"""
-        if self.initialized:
+        if self.initialized and self._graph_version == graph_service.version:
             return
 
         try:
-            self.chat_agent = ConversationAgent()
-            graph = await create_conversation_agent_graph()
+            # Shares the router and specialists with the text graph
+            graph = await graph_service.get_graph("voice")
+            if self.chat_agent is None:
+                from utils.agents.conversation_agent import ConversationAgent
+
+                self.chat_agent = ConversationAgent()
             self.chat_agent.set_agent_executor(graph)
+            self._graph_version = graph_service.version
             self.initialized = True
-            logger.info("LLM service initialized successfully")
+            logger.info("Conversation service initialized successfully")
         except Exception as e:
-            logger.error(f"Error initializing LLM service: {e}")
+            logger.error(f"Error initializing conversation service: {e}")
             raise
 
     async def ensure_initialized(self) -> None:
-        """Ensure the service is initialized"""
-        if not self.initialized:
-            await self.initialize()
+        """Ensure the service is initialized and on the current graph"""
+        await self.initialize()
 
     async def process_message(self, message: str) -> str:
         """Process a message through the agent graph asynchronously"""
@@ -46,7 +61,6 @@ class ConversationService:
             raise RuntimeError("Chat agent initialization failed")
 
         try:
-            config = RunnableConfig(recursion_limit=25)
             return await self.chat_agent.achat(message)
         except Exception as e:
             logger.error(f"Message processing error: {str(e)}")
@@ -56,11 +70,14 @@ class ConversationService:
 
         return self.tts_model.invoke(text)
 
-    def stt(self, audio_path: str = None, data=None):
+    async def stt(self, audio_path: str = None, pcm: bytes = None) -> str:
         try:
-            result_stt = self.stt_model(long_form_audio=audio_path, data=data)
-            return result_stt
+            return await self.stt_model.transcribe(audio_path=audio_path, pcm=pcm)
 
         except Exception as e:
             logger.error(f"Speech to Text error: {str(e)}")
             raise
+
+
+# Initialize the service globally
+conversation_service = ConversationService()
@@ -0,0 +1,428 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+
+from langchain_core.documents import Document
+
+from config.config import Config
+from services.pdf_service import pdf_service
+from utils.tools.retrieval import (
+    HybridRetriever,
+    LRUCache,
+    QdrantSearchBackend,
+    get_reranker,
+)
+from utils.tools.tcvn3 import normalize_vietnamese
+
+# qdrant-client and the text splitter load when the service is first used
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.http import models as q_models
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "metadata.session_id"
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+
+@dataclass
+class DocumentJob:
+    doc_id: str
+    session_id: str
+    file_path: str
+    filename: str
+    content_hash: Optional[str] = None
+    status: str = "queued"  # queued, processing, ready, failed
+    chunks: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "doc_id": self.doc_id,
+            "session_id": self.session_id,
+            "filename": self.filename,
+            "status": self.status,
+            "chunks": self.chunks,
+            "error": self.error,
+        }
+
+
+class DocumentService:
+    """Indexes chat uploads in the background and retrieves from them per session.
+
+    Uploads are extracted, chunked and embedded by queue workers into one
+    Qdrant collection; every point carries its ``session_id`` and searches
+    are filtered on it, so a chat turn only sees chunks from its own
+    session's documents and the prompt grows by at most ``k`` chunks.
+    """
+
+    def __init__(self):
+        self.client: Optional["AsyncQdrantClient"] = None
+        self.available = False
+        # Oldest first; finished jobs beyond Config.SESSION_DOCS_MAX_JOBS are dropped
+        self.jobs: Dict[str, DocumentJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._collection_ready = False
+        self._collection_lock = asyncio.Lock()
+        self._retrievers = LRUCache(Config.SESSION_DOCS_MAX_RETRIEVERS)
+        self._has_documents = LRUCache(Config.SESSION_DOCS_MAX_RETRIEVERS * 4)
+        self._splitter = None
+
+    async def initialize(self) -> None:
+        """Connect to Qdrant and start the ingest workers; failures skip indexing"""
+        if self.available or not Config.ENABLE_SESSION_DOCUMENTS:
+            return
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        from qdrant_client import AsyncQdrantClient
+
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=Config.SESSION_DOCS_CHUNK_SIZE,
+            chunk_overlap=Config.SESSION_DOCS_CHUNK_OVERLAP,
+        )
+        try:
+            self.client = AsyncQdrantClient(
+                url=Config.QDRANT_URL,
+                api_key=Config.QDRANT_API_KEY,
+                prefer_grpc=Config.QDRANT_PREFER_GRPC,
+                grpc_port=Config.QDRANT_GRPC_PORT,
+                timeout=Config.QDRANT_TIMEOUT,
+            )
+            await self.client.get_collections()
+        except Exception as e:
+            logger.error(f"Session documents disabled, Qdrant unreachable: {e}")
+            self.client = None
+            return
+
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._run_worker())
+            for _ in range(Config.SESSION_DOCS_INGEST_WORKERS)
+        ]
+        self.available = True
+        logger.info(
+            f"Session document service initialized ({Config.SESSION_DOCS_COLLECTION})"
+        )
+
+    @staticmethod
+    def is_supported(filename: str) -> bool:
+        extension = os.path.splitext(filename)[1].lower()
+        return extension == ".pdf" or extension in TEXT_EXTENSIONS
+
+    def submit(
+        self,
+        session_id: str,
+        file_path: str,
+        filename: str,
+        content_hash: Optional[str] = None,
+    ) -> DocumentJob:
+        """Queue an uploaded file for indexing into ``session_id``'s documents.
+
+        Re-uploading content the session already has returns the existing job.
+        """
+        if not self.available:
+            raise RuntimeError("Session document service is not available")
+        if content_hash:
+            for existing in self.list_jobs(session_id):
+                if (
+                    existing.content_hash == content_hash
+                    and existing.status != "failed"
+                ):
+                    return existing
+        job = DocumentJob(
+            doc_id=uuid.uuid4().hex,
+            session_id=session_id,
+            file_path=file_path,
+            filename=filename,
+            content_hash=content_hash,
+        )
+        self.jobs[job.doc_id] = job
+        self._queue.put_nowait(job)
+        logger.info(f"Queued {filename} for session {session_id} ({job.doc_id})")
+        return job
+
+    async def wait_until_indexed(self, doc_id: str, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for a queued document; True if it is ready"""
+        job = self.jobs.get(doc_id)
+        if job is None:
+            return False
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return job.status == "ready"
+
+    def get_job(self, doc_id: str) -> Optional[DocumentJob]:
+        return self.jobs.get(doc_id)
+
+    def list_jobs(self, session_id: str) -> List[DocumentJob]:
+        return [job for job in self.jobs.values() if job.session_id == session_id]
+
+    async def _run_worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "processing"
+            start = time.perf_counter()
+            try:
+                job.chunks = await self._ingest(job)
+                job.status = "ready"
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Indexed {job.filename} ({job.chunks} chunks) in {elapsed:.1f}s"
+                )
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                logger.error(f"Error indexing {job.filename}: {e}")
+            finally:
+                job.done.set()
+                self._queue.task_done()
+                self._prune_jobs()
+
+    def _prune_jobs(self) -> None:
+        """Forget the oldest finished jobs; queued and running ones are always kept"""
+        excess = len(self.jobs) - Config.SESSION_DOCS_MAX_JOBS
+        if excess <= 0:
+            return
+        finished = [doc_id for doc_id, job in self.jobs.items() if job.done.is_set()]
+        for doc_id in finished[:excess]:
+            del self.jobs[doc_id]
+
+    async def _load_pages(self, job: DocumentJob) -> List[Document]:
+        metadata = {
+            "session_id": job.session_id,
+            "doc_id": job.doc_id,
+            "source": job.filename,
+        }
+        if os.path.splitext(job.filename)[1].lower() in TEXT_EXTENSIONS:
+            with open(job.file_path, "r", encoding="utf-8", errors="replace") as f:
+                text = await asyncio.to_thread(f.read)
+            return [
+                Document(
+                    page_content=normalize_vietnamese(text, job.filename),
+                    metadata=dict(metadata),
+                )
+            ]
+
+        return [
+            Document(
+                page_content=normalize_vietnamese(text, job.filename),
+                metadata={**metadata, "page": page},
+            )
+            async for page, text in pdf_service.iter_pages(job.file_path)
+            if text.strip()
+        ]
+
+    async def _ingest(self, job: DocumentJob) -> int:
+        from qdrant_client.http import models as q_models
+        from utils.wrappers.embedding_wrapper import (
+            get_embeddings,
+            get_sparse_embeddings,
+        )
+
+        pages = await self._load_pages(job)
+        chunks = self._splitter.split_documents(pages)
+        if not chunks:
+            return 0
+
+        embeddings = get_embeddings()
+        sparse_embeddings = get_sparse_embeddings()
+        for start in range(0, len(chunks), Config.EMBEDDING_BATCH_SIZE):
+            batch = chunks[start:start + Config.EMBEDDING_BATCH_SIZE]
+            texts = [chunk.page_content for chunk in batch]
+            vectors = await embeddings.aembed_documents(texts)
+            await self._ensure_collection(
+                len(vectors[0]), sparse_embeddings is not None
+            )
+
+            if sparse_embeddings is not None:
+                sparse_vectors = await asyncio.to_thread(
+                    sparse_embeddings.embed_documents, texts
+                )
+                vectors = [
+                    {
+                        "": vector,
+                        Config.RAG_SPARSE_VECTOR_NAME: q_models.SparseVector(
+                            indices=sparse.indices, values=sparse.values
+                        ),
+                    }
+                    for vector, sparse in zip(vectors, sparse_vectors)
+                ]
+
+            points = []
+            for idx, (chunk, vector) in enumerate(zip(batch, vectors), start=start):
+                chunk.metadata["chunk_index"] = idx
+                text_hash = hashlib.sha1(chunk.page_content.encode("utf-8")).hexdigest()
+                point_id = str(
+                    uuid.uuid5(uuid.NAMESPACE_URL, f"{job.doc_id}#{idx}#{text_hash}")
+                )
+                points.append(
+                    q_models.PointStruct(
+                        id=point_id,
+                        vector=vector,
+                        payload={
+                            "page_content": chunk.page_content,
+                            "metadata": chunk.metadata,
+                        },
+                    )
+                )
+            await self.client.upsert(
+                collection_name=Config.SESSION_DOCS_COLLECTION, points=points, wait=True
+            )
+
+        self._has_documents.put(job.session_id, True)
+        retriever = self._retrievers.get(job.session_id)
+        if retriever is not None:
+            retriever.invalidate()
+        return len(chunks)
+
+    async def _ensure_collection(self, vector_size: int, with_sparse: bool) -> None:
+        from qdrant_client.http import models as q_models
+
+        if self._collection_ready:
+            return
+        async with self._collection_lock:
+            if self._collection_ready:
+                return
+            if not await self.client.collection_exists(Config.SESSION_DOCS_COLLECTION):
+                await self.client.create_collection(
+                    collection_name=Config.SESSION_DOCS_COLLECTION,
+                    vectors_config=q_models.VectorParams(
+                        size=vector_size, distance=q_models.Distance.COSINE
+                    ),
+                    sparse_vectors_config=(
+                        {
+                            Config.RAG_SPARSE_VECTOR_NAME: q_models.SparseVectorParams(
+                                modifier=q_models.Modifier.IDF
+                            )
+                        }
+                        if with_sparse
+                        else None
+                    ),
+                )
+                # Tenant index: Qdrant co-locates each session's points
+                await self.client.create_payload_index(
+                    collection_name=Config.SESSION_DOCS_COLLECTION,
+                    field_name=SESSION_KEY,
+                    field_schema=q_models.KeywordIndexParams(
+                        type=q_models.KeywordIndexType.KEYWORD, is_tenant=True
+                    ),
+                )
+                logger.info(f"Created collection {Config.SESSION_DOCS_COLLECTION}")
+            self._collection_ready = True
+
+    @staticmethod
+    def _session_filter(session_id: str) -> "q_models.Filter":
+        from qdrant_client.http import models as q_models
+
+        return q_models.Filter(
+            must=[
+                q_models.FieldCondition(
+                    key=SESSION_KEY, match=q_models.MatchValue(value=session_id)
+                )
+            ]
+        )
+
+    async def has_documents(self, session_id: str) -> bool:
+        """Whether any of the session's uploads are indexed, remembered per session"""
+        if not self.available or not session_id:
+            return False
+        known = self._has_documents.get(session_id)
+        if known is None:
+            known = False
+            if await self.client.collection_exists(Config.SESSION_DOCS_COLLECTION):
+                result = await self.client.count(
+                    collection_name=Config.SESSION_DOCS_COLLECTION,
+                    count_filter=self._session_filter(session_id),
+                    exact=False,
+                )
+                known = result.count > 0
+            self._has_documents.put(session_id, known)
+        return known
+
+    def _get_retriever(self, session_id: str) -> HybridRetriever:
+        retriever = self._retrievers.get(session_id)
+        if retriever is None:
+            from utils.wrappers.embedding_wrapper import (
+                get_embeddings,
+                get_sparse_embeddings,
+            )
+
+            backend = QdrantSearchBackend(
+                self.client,
+                Config.SESSION_DOCS_COLLECTION,
+                query_filter=self._session_filter(session_id),
+            )
+            retriever = HybridRetriever(
+                backend,
+                get_embeddings(),
+                sparse_embeddings=get_sparse_embeddings(),
+                reranker=get_reranker(),
+                k=Config.SESSION_DOCS_TOP_K,
+            )
+            self._retrievers.put(session_id, retriever)
+        return retriever
+
+    async def retrieve_context(self, session_id: str, query: str) -> Optional[str]:
+        """Relevant excerpts from the session's documents, or None if there are none"""
+        try:
+            if not await self.has_documents(session_id):
+                return None
+            docs = await self._get_retriever(session_id).aretrieve(query)
+        except Exception as e:
+            logger.error(f"Session document retrieval failed: {e}")
+            return None
+        if not docs:
+            return None
+        parts = []
+        for doc in docs:
+            page = doc.metadata.get("page")
+            label = doc.metadata.get("source", "")
+            if page:
+                label += f", page {page}"
+            parts.append(f"[{label}]\n{doc.page_content}")
+        return "\n\n".join(parts)
+
+    async def delete_session(self, session_id: str) -> None:
+        """Remove all indexed chunks of a session"""
+        if not self.available:
+            return
+        from qdrant_client.http import models as q_models
+
+        try:
+            if await self.client.collection_exists(Config.SESSION_DOCS_COLLECTION):
+                await self.client.delete(
+                    collection_name=Config.SESSION_DOCS_COLLECTION,
+                    points_selector=q_models.FilterSelector(
+                        filter=self._session_filter(session_id)
+                    ),
+                )
+        except Exception as e:
+            logger.error(f"Error deleting documents of session {session_id}: {e}")
+        self._has_documents.put(session_id, False)
+        retriever = self._retrievers.get(session_id)
+        if retriever is not None:
+            retriever.invalidate()
+        stale = [d for d, job in self.jobs.items() if job.session_id == session_id]
+        for doc_id in stale:
+            del self.jobs[doc_id]
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        self.available = False
+
+
+# Initialize the service globally
+document_service = DocumentService()
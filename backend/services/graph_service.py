@@ -0,0 +1,104 @@
+from typing import Any, Dict, Optional
+import asyncio
+import importlib
+import logging
+import time
+
+from utils.speculation_stats import speculation_stats
+
+logger = logging.getLogger(__name__)
+
+
+class GraphService:
+    """Builds the text and voice agent graphs once and shares them.
+
+    ``warm_up`` runs from the application lifespan so no user request pays
+    for graph construction (and the MCP tool listing behind it). Concurrent
+    callers of ``get_graph`` wait for the same build. ``rebuild`` swaps in
+    new graphs (e.g. after an MCP config change) while the old ones keep
+    serving, and bumps ``version`` so services pick them up.
+    """
+
+    def __init__(self):
+        self._graphs: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self.version = 0
+        self.error: Optional[str] = None
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._graphs)
+
+    async def _build(self) -> None:
+        start = time.perf_counter()
+        try:
+            # The agent stack (LangGraph, LLM SDKs, tools) loads with the first
+            # build, in a thread so the event loop keeps serving meanwhile
+            graph_utils = await asyncio.to_thread(
+                importlib.import_module, "utils.graph_utils"
+            )
+            graphs = await graph_utils.create_agent_graphs()
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            logger.error(f"Error building agent graphs: {self.error}")
+            raise
+        self._graphs = graphs
+        self.version += 1
+        self.error = None
+        self.build_seconds = round(time.perf_counter() - start, 3)
+        logger.info(
+            f"Agent graphs {sorted(graphs)} built in {self.build_seconds}s "
+            f"(v{self.version})"
+        )
+
+    async def get_graph(self, name: str) -> Any:
+        """The compiled graph ``"chat"`` or ``"voice"``, built on first use"""
+        if not self._graphs:
+            async with self._lock:
+                if not self._graphs:
+                    await self._build()
+        return self._graphs[name]
+
+    async def warm_up(self) -> None:
+        """Build the graphs now instead of on the first request"""
+        try:
+            await self.get_graph("chat")
+        except Exception:
+            # Already logged; the next request retries the build
+            pass
+
+    async def rebuild(self) -> None:
+        """Build fresh graphs and swap them in; the old ones serve meanwhile"""
+        async with self._lock:
+            await self._build()
+
+    def schedule_rebuild(self) -> None:
+        """Rebuild in the background, e.g. after the MCP tool set changed"""
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            self._rebuild_task.cancel()
+        self._rebuild_task = asyncio.create_task(self._rebuild_in_background())
+
+    async def _rebuild_in_background(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception:
+            # Already logged; the previous graphs stay in service
+            pass
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "graphs": sorted(self._graphs),
+            "version": self.version,
+            "build_seconds": self.build_seconds,
+            "rebuilding": self._rebuild_task is not None
+            and not self._rebuild_task.done(),
+            "error": self.error,
+            "speculation": speculation_stats.to_dict(),
+        }
+
+
+# Initialize the service globally
+graph_service = GraphService()
@@ -1,8 +1,10 @@
-from typing import Optional
-from utils.graph_utils import create_agent_graph
-from utils.agents.chat_agent import ChatAgent
+from typing import TYPE_CHECKING, Optional
+from services.document_service import document_service
+from services.graph_service import graph_service
 import logging
-from langchain_core.runnables import RunnableConfig
+
+if TYPE_CHECKING:
+    from utils.agents.chat_agent import ChatAgent
 
 logger = logging.getLogger(__name__)
 
@@ -11,19 +13,25 @@ class LLMService:
     """Service to manage LLM interactions and agent coordination with persistent memory"""
 
     def __init__(self):
-        self.chat_agent: Optional[ChatAgent] = None
+        self.chat_agent: Optional["ChatAgent"] = None
         self.initialized = False
         self.current_session_id: Optional[str] = None
+        self._graph_version = 0
 
     async def initialize(self) -> None:
         """Initialize the service asynchronously"""
-        if self.initialized:
+        if self.initialized and self._graph_version == graph_service.version:
             return
 
         try:
-            self.chat_agent = ChatAgent()
-            graph = await create_agent_graph()
+            # The text graph is shared and normally already built at startup
+            graph = await graph_service.get_graph("chat")
+            if self.chat_agent is None:
+                from utils.agents.chat_agent import ChatAgent
+
+                self.chat_agent = ChatAgent()
             self.chat_agent.set_agent_executor(graph)
+            self._graph_version = graph_service.version
             self.initialized = True
             logger.info("LLM service initialized successfully")
         except Exception as e:
@@ -31,9 +39,8 @@ class LLMService:
             raise
 
     async def ensure_initialized(self) -> None:
-        """Ensure the service is initialized"""
-        if not self.initialized:
-            await self.initialize()
+        """Ensure the service is initialized and on the current graph"""
+        await self.initialize()
 
     async def process_message(self, message: str, session_id: str = None) -> str:
         """Process a message through the agent graph asynchronously with session management"""
@@ -53,8 +60,11 @@ class LLMService:
                 new_session_id = await self.chat_agent.initialize_session()
                 self.current_session_id = new_session_id
 
-            config = RunnableConfig(recursion_limit=25)
-            return await self.chat_agent.achat(message)
+            # Only the chunks of this session's uploads that match the message
+            context = await document_service.retrieve_context(
+                self.current_session_id, message
+            )
+            return await self.chat_agent.achat(message, context=context)
         except Exception as e:
             logger.error(f"Message processing error: {str(e)}")
             raise
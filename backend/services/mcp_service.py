@@ -1,10 +1,12 @@
 import json
 import os
-from typing import Dict, Any
-from langchain_mcp_adapters.client import MultiServerMCPClient
+from typing import TYPE_CHECKING, Dict, Any
 import logging
 import asyncio
 
+if TYPE_CHECKING:
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+
 logger = logging.getLogger(__name__)
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config", "mcp_config.json")
@@ -17,10 +19,10 @@ class MCPService:
 
     def __init__(self):
         self.configs: Dict[str, Any] = self._load_configs()
-        self.client: MultiServerMCPClient = None
+        self.client: "MultiServerMCPClient" = None
         self.initialized = False
         self._lock = asyncio.Lock()
-        self._create_client()
+        # Created by initialize_client, so importing the module stays cheap
 
     def _load_configs(self) -> Dict[str, Any]:
         if not os.path.exists(CONFIG_PATH):
@@ -55,6 +57,8 @@ class MCPService:
 
     def _create_client(self) -> None:
         """Create a new MCP client with current configs"""
+        from langchain_mcp_adapters.client import MultiServerMCPClient
+
         logger.info(f"Creating MCP client object with configs: {self.configs}")
 
         # Clean the configs to remove unsupported parameters
@@ -69,8 +73,7 @@ class MCPService:
             if self.initialized:
                 return True
             if not self.client:
-                logger.error("MCP Client object not created before initialization.")
-                return False
+                self._create_client()
             try:
                 logger.info("Initializing MCP client...")
                 # Add timeout to prevent hanging
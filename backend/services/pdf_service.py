@@ -0,0 +1,213 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _count_pages(path: str) -> int:
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_pages(path: str, pages: List[int]) -> List[Tuple[int, str]]:
+    """Runs in a worker process; ``pages`` are 1-based"""
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [(page, reader.pages[page - 1].extract_text() or "") for page in pages]
+
+
+class PageTextCache:
+    """SQLite store of extracted page text keyed by file hash and page number"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_pages "
+                "(file_hash TEXT, page INTEGER, text TEXT, "
+                "PRIMARY KEY (file_hash, page))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_files "
+                "(file_hash TEXT PRIMARY KEY, page_count INTEGER)"
+            )
+            self._conn.commit()
+
+    def get_page_count(self, file_hash: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM pdf_files WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, file_hash: str, page_count: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_files (file_hash, page_count) "
+                "VALUES (?, ?)",
+                (file_hash, page_count),
+            )
+            self._conn.commit()
+
+    def get_pages(self, file_hash: str, start: int, end: int) -> Dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, text FROM pdf_pages "
+                "WHERE file_hash = ? AND page BETWEEN ? AND ?",
+                (file_hash, start, end),
+            ).fetchall()
+        return dict(rows)
+
+    def put_pages(self, file_hash: str, pages: List[Tuple[int, str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pdf_pages (file_hash, page, text) "
+                "VALUES (?, ?, ?)",
+                [(file_hash, page, text) for page, text in pages],
+            )
+            self._conn.commit()
+
+
+class PDFService:
+    """Extracts PDF text in a process pool, page batch by page batch, with caching.
+
+    Parsing never runs on the event loop, pages are yielded as soon as their
+    batch finishes, and text is cached per (file SHA-256, page) so re-reading
+    an upload is a cache lookup.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: Optional[PageTextCache] = None
+        # Most recently used last; bounded by Config.PDF_HASH_CACHE_SIZE
+        self._hashes: "OrderedDict[Tuple[str, int, float], str]" = OrderedDict()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=Config.PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @property
+    def cache(self) -> PageTextCache:
+        if self._cache is None:
+            self._cache = PageTextCache(Config.PDF_TEXT_CACHE_PATH)
+        return self._cache
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    async def file_hash(self, path: str) -> str:
+        """SHA-256 of ``path``, remembered while its size and mtime are unchanged"""
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        file_hash = self._hashes.get(key)
+        if file_hash is None:
+            file_hash = await asyncio.to_thread(self._sha256, path)
+            self._hashes[key] = file_hash
+            while len(self._hashes) > Config.PDF_HASH_CACHE_SIZE:
+                self._hashes.popitem(last=False)
+        self._hashes.move_to_end(key)
+        return file_hash
+
+    async def page_count(self, path: str, file_hash: Optional[str] = None) -> int:
+        file_hash = file_hash or await self.file_hash(path)
+        count = await asyncio.to_thread(self.cache.get_page_count, file_hash)
+        if count is None:
+            loop = asyncio.get_running_loop()
+            count = await loop.run_in_executor(self.executor, _count_pages, path)
+            await asyncio.to_thread(self.cache.set_page_count, file_hash, count)
+        return count
+
+    async def iter_pages(
+        self, path: str, start_page: int = 1, end_page: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """Yield ``(page, text)`` in page order for the inclusive 1-based range"""
+        file_hash = await self.file_hash(path)
+        total = await self.page_count(path, file_hash)
+        start = max(1, start_page)
+        end = min(total, end_page or total)
+        if start > end:
+            return
+
+        cached = await asyncio.to_thread(self.cache.get_pages, file_hash, start, end)
+        # Batches are contiguous runs of uncached pages, so the reader below
+        # can step from one batch to the next page without skipping any
+        batches: List[List[int]] = []
+        for page in range(start, end + 1):
+            if page in cached:
+                continue
+            if (
+                batches
+                and batches[-1][-1] == page - 1
+                and len(batches[-1]) < Config.PDF_PAGES_PER_TASK
+            ):
+                batches[-1].append(page)
+            else:
+                batches.append([page])
+
+        loop = asyncio.get_running_loop()
+        # Submit everything up front; the pool bounds the actual parallelism
+        futures = {
+            batch[0]: loop.run_in_executor(self.executor, _extract_pages, path, batch)
+            for batch in batches
+        }
+
+        try:
+            page = start
+            while page <= end:
+                if page in cached:
+                    yield page, cached[page]
+                    page += 1
+                    continue
+                extracted = await futures.pop(page)
+                await asyncio.to_thread(self.cache.put_pages, file_hash, extracted)
+                for extracted_page, text in extracted:
+                    yield extracted_page, text
+                page = extracted[-1][0] + 1
+        finally:
+            # Client went away: don't leave queued batches running
+            for future in futures.values():
+                future.cancel()
+
+    async def extract_text(
+        self, path: str, start_page: int = 1, end_page: Optional[int] = None
+    ) -> str:
+        parts = []
+        async for page, text in self.iter_pages(path, start_page, end_page):
+            parts.append(f"\n\n--- Page {page} ---\n\n{text}")
+        return "".join(parts)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Initialize the service globally
+pdf_service = PDFService()
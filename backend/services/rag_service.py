@@ -0,0 +1,150 @@
+from typing import TYPE_CHECKING, Any, Dict, Optional
+import asyncio
+import logging
+
+from config.config import Config
+from utils.tools.local_vector_index import LocalSearchBackend, LocalVectorIndex
+from utils.tools.retrieval import HybridRetriever, QdrantSearchBackend, get_reranker
+
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient
+
+logger = logging.getLogger(__name__)
+
+
+class RAGService:
+    """Owns the process-wide vector store connection and the RAG agent's retriever"""
+
+    def __init__(self):
+        self.client: Optional["AsyncQdrantClient"] = None
+        self.retriever: Optional[HybridRetriever] = None
+        self.available = False
+        self.backend_name: Optional[str] = None
+        self._init_lock = asyncio.Lock()
+        self._initialized = False
+
+    async def initialize(self) -> None:
+        """Open the vector store and build the retriever once; failures disable RAG"""
+        async with self._init_lock:
+            if self._initialized:
+                return
+            self._initialized = True
+
+            if not Config.ENABLE_RAG:
+                logger.info("RAG disabled by configuration")
+                return
+
+            backend = None
+            if Config.VECTOR_STORE_BACKEND in ("qdrant", "auto"):
+                backend = await self._connect_qdrant()
+            if backend is None and Config.VECTOR_STORE_BACKEND in ("local", "auto"):
+                backend = await self._open_local_index()
+            if backend is None:
+                logger.warning("No vector store available, RAG disabled")
+                return
+
+            # Loading the sparse model and opening the embedding cache block
+            try:
+                self.retriever = await asyncio.to_thread(self._build_retriever, backend)
+            except Exception as e:
+                logger.error(f"Error loading retrieval models, RAG disabled: {e}")
+                return
+            self.available = True
+            logger.info(f"RAG service initialized with {self.backend_name} backend")
+
+    @staticmethod
+    def _build_retriever(backend) -> HybridRetriever:
+        # Embedding models (and langchain's runtime) load with the first retriever
+        from utils.wrappers.embedding_wrapper import (
+            get_embeddings,
+            get_sparse_embeddings,
+        )
+
+        return HybridRetriever(
+            backend,
+            get_embeddings(),
+            sparse_embeddings=get_sparse_embeddings(),
+            reranker=get_reranker(),
+        )
+
+    async def _connect_qdrant(self) -> Optional[QdrantSearchBackend]:
+        from qdrant_client import AsyncQdrantClient
+
+        try:
+            self.client = AsyncQdrantClient(
+                url=Config.QDRANT_URL,
+                api_key=Config.QDRANT_API_KEY,
+                prefer_grpc=Config.QDRANT_PREFER_GRPC,
+                grpc_port=Config.QDRANT_GRPC_PORT,
+                timeout=Config.QDRANT_TIMEOUT,
+            )
+            if not await self.client.collection_exists(Config.QDRANT_COLLECTION_NAME):
+                logger.warning(
+                    f"Qdrant collection '{Config.QDRANT_COLLECTION_NAME}' not found"
+                )
+                return None
+            self.backend_name = "qdrant"
+            return QdrantSearchBackend(self.client, Config.QDRANT_COLLECTION_NAME)
+        except Exception as e:
+            logger.error(f"Error connecting to Qdrant: {e}")
+            return None
+
+    async def _open_local_index(self) -> Optional[LocalSearchBackend]:
+        if LocalVectorIndex.read_version(Config.LOCAL_INDEX_DIR) is None:
+            logger.warning(f"No local vector index at {Config.LOCAL_INDEX_DIR}")
+            return None
+        try:
+            backend = await asyncio.to_thread(
+                LocalSearchBackend, Config.LOCAL_INDEX_DIR
+            )
+            self.backend_name = "local"
+            return backend
+        except Exception as e:
+            logger.error(f"Error opening local vector index: {e}")
+            return None
+
+    async def health(self) -> Dict[str, Any]:
+        """Collection status for /health; never raises"""
+        if not self.available:
+            return {"status": "disabled" if not Config.ENABLE_RAG else "unavailable"}
+        if self.backend_name == "local":
+            return {
+                "status": "healthy",
+                "backend": "local",
+                "points": self.retriever.backend.index.count,
+            }
+        try:
+            info = await asyncio.wait_for(
+                self.client.get_collection(Config.QDRANT_COLLECTION_NAME),
+                timeout=Config.QDRANT_TIMEOUT,
+            )
+            return {
+                "status": "healthy",
+                "backend": "qdrant",
+                "collection": Config.QDRANT_COLLECTION_NAME,
+                "points": info.points_count,
+                "collection_status": str(info.status),
+            }
+        except Exception as e:
+            logger.error(f"RAG health check failed: {e}")
+            return {"status": "unhealthy", "error": str(e)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        if not self.available:
+            return {"available": False}
+        return {
+            "available": True,
+            "backend": self.backend_name,
+            **self.retriever.get_stats(),
+        }
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        self.available = False
+        self._initialized = False
+
+
+# Initialize the service globally
+rag_service = RAGService()
@@ -0,0 +1,216 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import importlib
+import logging
+import multiprocessing
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Per worker process: the STT module, imported (and its model loaded) once
+_model = None
+
+
+def _init_worker(module_name: str) -> None:
+    global _model
+    _model = importlib.import_module(module_name)
+
+
+def _ping() -> bool:
+    """Forces a worker to start, so its model is loaded before the first request"""
+    return _model is not None
+
+
+def _model_input(item: Dict[str, Any]) -> Dict[str, Any]:
+    pcm = item.get("pcm")
+    if pcm is None:
+        return {"long_form_audio": item["audio_path"], "data": None}
+    if getattr(_model, "ACCEPTS_NUMPY", False):
+        import numpy as np
+
+        data = np.frombuffer(pcm, dtype=np.float32) * 32767
+    else:
+        import torch
+
+        samples = torch.frombuffer(bytearray(pcm), dtype=torch.float32)
+        data = samples.unsqueeze(0) * 32767
+    return {"long_form_audio": " ", "data": data}
+
+
+def _transcribe_batch(items: List[Dict[str, Any]]) -> List[Tuple[bool, str]]:
+    """Runs in a worker; one ``(ok, text or error)`` per item"""
+    inputs = [_model_input(item) for item in items]
+    if len(inputs) > 1 and hasattr(_model, "run_batch"):
+        try:
+            return [(True, text) for text in _model.run_batch(inputs)]
+        except Exception as e:
+            return [(False, str(e))] * len(inputs)
+
+    results = []
+    for model_input in inputs:
+        try:
+            results.append((True, _model.run(**model_input)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
+
+class STTUnavailableError(Exception):
+    """Speech-to-text is disabled or its workers could not start"""
+
+
+class STTOverloadedError(Exception):
+    """Too many transcriptions are already queued"""
+
+
+class STTService:
+    """Speech-to-text in a process pool, loading the model once per worker.
+
+    The speech stack is never imported by the API process. Concurrent
+    requests are grouped into small batches (used when the model module
+    has ``run_batch``), and at most ``STT_MAX_PENDING`` may wait at once;
+    further ones fail fast with ``STTOverloadedError``.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batcher: Optional[asyncio.Task] = None
+        # The loop keeps only weak references to tasks; in-flight batches live here
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+        self.error: Optional[str] = None
+        self._stats = {"requests": 0, "rejected": 0, "failed": 0, "batches": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=Config.STT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(Config.STT_MODEL,),
+            )
+        return self._executor
+
+    async def warm_up(self) -> None:
+        """Start the workers and load the model now instead of on the first request"""
+        if not Config.ENABLE_STT:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self._get_executor()
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, _ping)
+                    for _ in range(Config.STT_WORKERS)
+                )
+            )
+            self.error = None
+            logger.info(f"STT workers ready ({Config.STT_MODEL} x{Config.STT_WORKERS})")
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            logger.error(f"STT workers failed to start: {self.error}")
+            self._reset_executor()
+
+    def _reset_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def transcribe(
+        self, audio_path: Optional[str] = None, pcm: Optional[bytes] = None
+    ) -> str:
+        """Transcribe an audio file, or raw float32 PCM from the voice WebSocket"""
+        if not Config.ENABLE_STT:
+            raise STTUnavailableError("Speech-to-text is disabled")
+        if self._pending >= Config.STT_MAX_PENDING:
+            self._stats["rejected"] += 1
+            raise STTOverloadedError("Speech-to-text is busy, retry shortly")
+
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._queue_loop is not loop:
+            self._queue = asyncio.Queue()
+            self._queue_loop = loop
+            self._batcher = loop.create_task(self._run_batcher(self._queue))
+
+        self._pending += 1
+        self._stats["requests"] += 1
+        try:
+            future = loop.create_future()
+            await self._queue.put(({"audio_path": audio_path, "pcm": pcm}, future))
+            return await asyncio.wait_for(future, Config.STT_TIMEOUT)
+        finally:
+            self._pending -= 1
+
+    async def _run_batcher(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            deadline = asyncio.get_running_loop().time() + Config.STT_BATCH_WAIT
+            while len(batch) < Config.STT_BATCH_SIZE:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Don't wait for the result: other workers can take the next batch
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(
+        self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        self._stats["batches"] += 1
+        try:
+            results = await loop.run_in_executor(
+                self._get_executor(), _transcribe_batch, [item for item, _ in batch]
+            )
+        except BrokenProcessPool as e:
+            # A worker died (e.g. the model failed to load); start fresh next time
+            self.error = str(e) or "STT worker pool broke"
+            self._reset_executor()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(STTUnavailableError(self.error))
+            return
+        except Exception as e:
+            results = [(False, str(e))] * len(batch)
+
+        for (_, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                self._stats["failed"] += 1
+                future.set_exception(RuntimeError(value))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": Config.ENABLE_STT,
+            "model": Config.STT_MODEL,
+            "workers": Config.STT_WORKERS,
+            "pending": self._pending,
+            "error": self.error,
+            **self._stats,
+        }
+
+    def shutdown(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+        for task in list(self._batch_tasks):
+            task.cancel()
+        self._queue = self._queue_loop = None
+        self._reset_executor()
+
+
+# Initialize the service globally
+stt_service = STTService()
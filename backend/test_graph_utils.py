@@ -0,0 +1,218 @@
+"""Tests for agent graphs compiled from a GraphSpec"""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from config.config import Config
+from utils import graph_utils
+from utils.graph_utils import (
+    AGGREGATE_NODE,
+    GraphSpec,
+    RoutingRule,
+    build_graph,
+    parse_route,
+    predict_agent,
+)
+from utils.speculation_stats import SpeculationStats
+
+
+class FakeAgent:
+    """Answers with a fixed reply after ``delay`` seconds and counts its calls"""
+
+    def __init__(self, reply, delay=0.0, delegate_to=None):
+        self.reply = reply
+        self.delay = delay
+        self.delegate_to = delegate_to
+        self.calls = 0
+        self.cancelled = 0
+
+    async def invoke(self, message, chat_history=None, context=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        response = {"messages": [AIMessage(content=self.reply)]}
+        if self.delegate_to:
+            response["delegation"] = {"target_agent": self.delegate_to}
+        return response
+
+    def get_system_message(self):
+        return AIMessage(content="system prompt")
+
+
+def _agents(route, **extra):
+    agents = {
+        "router": FakeAgent(f"ROUTE: {route}"),
+        "assistant": FakeAgent("assistant answer"),
+        "math": FakeAgent("42"),
+    }
+    agents.update(extra)
+    return agents
+
+
+def _run(spec, text="hello", previous_agent=None):
+    graph = build_graph(spec)
+    state = {
+        "input": text,
+        "chat_history": [],
+        "current_agent": None,
+        "output": None,
+        "artifacts": {},
+        "previous_agent": previous_agent,
+    }
+    return asyncio.run(graph.ainvoke(state))
+
+
+def test_graph_has_a_node_per_agent_and_the_aggregate():
+    graph = build_graph(GraphSpec("chat", _agents("Math")))
+    assert {"router", "assistant", "math", AGGREGATE_NODE} <= set(graph.nodes)
+
+
+def test_router_decision_picks_the_agent():
+    agents = _agents("Math")
+    result = _run(GraphSpec("chat", agents))
+    assert result["output"] == "42"
+    assert result["current_agent"] == "math"
+    assert agents["assistant"].calls == 0
+    # The user's message and the answer are appended to the history
+    assert [m.content for m in result["chat_history"]] == ["hello", "42"]
+
+
+def test_unknown_route_falls_back_to_the_default_agent():
+    result = _run(GraphSpec("chat", _agents("Astrology")))
+    assert result["output"] == "assistant answer"
+
+
+def test_routing_rule_overrides_the_assistant_only():
+    image = FakeAgent("an image")
+    rules = [RoutingRule(target="image", keywords=["draw"])]
+    spec = GraphSpec("chat", _agents("Assistant", image=image), rules=rules)
+    assert _run(spec, "draw a cat")["output"] == "an image"
+
+    spec = GraphSpec("chat", _agents("Math", image=image), rules=rules)
+    assert _run(spec, "draw 2 + 2")["output"] == "42"
+
+
+def test_rule_for_an_agent_the_graph_lacks_is_ignored():
+    rules = [RoutingRule(target="image", keywords=["draw"])]
+    spec = GraphSpec("voice", _agents("Assistant"), rules=rules)
+    assert _run(spec, "draw a cat")["output"] == "assistant answer"
+
+
+def test_delegation_sets_the_current_agent():
+    agents = _agents("Math", math=FakeAgent("ask research", delegate_to="research"))
+    result = _run(GraphSpec("chat", agents))
+    assert result["current_agent"] == "research"
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("ROUTE: Math", ["math"]),
+        ("Thinking...\nroute: **Research**.", ["research"]),
+        ("ROUTE: Research, Math", ["research", "math"]),
+        ("ROUTE: Math and Planning + Math", ["math", "planning"]),
+        ("ROUTE: Research agent / Math", ["research", "math"]),
+        ("I'd pick the math agent", []),
+    ],
+)
+def test_parse_route(content, expected):
+    assert parse_route(content) == expected
+
+
+def test_previous_fan_out_predicts_its_primary_agent():
+    candidates = ["math", "research"]
+    assert predict_agent("and then?", "research,math", candidates) == "research"
+    assert predict_agent("and then?", "image", candidates) is None
+
+
+def _fan_out(route, max_parallel_agents=3, **extra):
+    extra.setdefault("research", FakeAgent("research answer"))
+    agents = _agents(route, **extra)
+    spec = GraphSpec("chat", agents, max_parallel_agents=max_parallel_agents)
+    return agents, _run(spec)
+
+
+def test_fan_out_merges_answers_in_router_order():
+    agents, result = _fan_out("Research, Math")
+    assert result["output"] == "**Research**\n\nresearch answer\n\n**Math**\n\n42"
+    assert result["current_agent"] == "research,math"
+    assert agents["research"].calls == agents["math"].calls == 1
+    assert [m.content for m in result["chat_history"]] == ["hello", result["output"]]
+
+
+def test_fan_out_is_capped_at_max_parallel_agents():
+    agents, result = _fan_out("Research, Math", max_parallel_agents=1)
+    assert result["output"] == "research answer"
+    assert agents["math"].calls == 0
+
+
+def test_slow_agent_misses_the_deadline(monkeypatch):
+    monkeypatch.setattr(Config, "PARALLEL_AGENTS_DEADLINE", 0.1)
+    agents, result = _fan_out("Research, Math", math=FakeAgent("late", delay=1))
+    assert result["output"] == (
+        "**Research**\n\nresearch answer\n\n_No answer from: Math._"
+    )
+    assert result["current_agent"] == "research"
+    assert agents["math"].cancelled == 1
+
+
+def test_fan_out_without_answers_apologizes(monkeypatch):
+    monkeypatch.setattr(Config, "PARALLEL_AGENTS_DEADLINE", 0.05)
+    _, result = _fan_out(
+        "Research, Math",
+        research=FakeAgent("late", delay=1),
+        math=FakeAgent("late", delay=1),
+    )
+    assert result["output"].startswith("Sorry, none of the agents")
+    assert result["current_agent"] == "assistant"
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = SpeculationStats()
+    monkeypatch.setattr(graph_utils, "speculation_stats", stats)
+    return stats
+
+
+def _speculating(route, **extra):
+    agents = _agents(route, **extra)
+    agents["router"].delay = 0.2
+    spec = GraphSpec("chat", agents, speculative_agents=["math", "research"])
+    return agents, spec
+
+
+def test_speculation_hit_reuses_the_running_agent(stats):
+    agents, spec = _speculating("Math", math=FakeAgent("42", delay=0.2))
+    start = time.perf_counter()
+    result = _run(spec, "calculate 6 * 7")
+    # The math agent ran alongside the router instead of after it
+    assert time.perf_counter() - start < 0.35
+    assert result["output"] == "42"
+    assert agents["math"].calls == 1
+    assert stats.hits == 1 and stats.misses == 0
+    assert graph_utils._speculations == {}
+    assert not any(isinstance(v, asyncio.Task) for v in result.values())
+
+
+def test_speculation_miss_is_discarded(stats):
+    research = FakeAgent("research answer", delay=1)
+    agents, spec = _speculating("Math", research=research)
+    result = _run(spec, "hello", previous_agent="research")
+    assert result["output"] == "42"
+    assert research.calls == 1 and research.cancelled == 1
+    assert stats.misses == 1 and stats.by_agent["research"]["misses"] == 1
+    # The prompt sent to the discarded run still counts as wasted
+    assert stats.wasted_tokens > 0
+    assert graph_utils._speculations == {}
+
+
+def test_no_speculation_without_a_prediction(stats):
+    agents, spec = _speculating("Math")
+    assert _run(spec, "hello")["output"] == "42"
+    assert stats.hits == stats.misses == 0
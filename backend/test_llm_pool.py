@@ -0,0 +1,123 @@
+"""Tests for the circuit breaker and token bucket of the LLM provider gates"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.wrappers import llm_pool
+from utils.wrappers.llm_pool import (
+    CircuitBreaker,
+    LLMUnavailableError,
+    TokenBucket,
+    call_with_resilience,
+    get_provider_gate,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual clock for the pool's time.monotonic()"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(
+        llm_pool, "time", SimpleNamespace(monotonic=lambda: now.value)
+    )
+    return now
+
+
+def _open_breaker(clock) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.value += 30
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = _open_breaker(clock)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_probe_reopens_immediately(clock):
+    breaker = _open_breaker(clock)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+
+def test_released_probe_lets_the_next_request_probe(clock):
+    breaker = _open_breaker(clock)
+    assert breaker.allow_request()
+    breaker.release_probe()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_concurrent_calls_share_a_single_probe(clock, monkeypatch):
+    monkeypatch.setattr(llm_pool, "_gates", {})
+    gate = get_provider_gate("test-half-open")
+    gate.breaker = _open_breaker(clock)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(
+            *(call_with_resilience("test-half-open", call) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert results[0] == "ok"
+    assert all(isinstance(r, LLMUnavailableError) for r in results[1:])
+    assert len(calls) == 1
+    assert gate.breaker.state == "closed"
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)
+
+    async def acquire(n):
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(acquire(2)) < 0.05
+    # 10 tokens per second: the third token takes about 0.1s to refill
+    assert asyncio.run(acquire(1)) >= 0.08
+
+
+def test_token_bucket_disabled_without_a_rate():
+    bucket = TokenBucket(rate_per_minute=0)
+
+    async def acquire_many():
+        for _ in range(1000):
+            await bucket.acquire()
+
+    start = time.perf_counter()
+    asyncio.run(acquire_many())
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,131 @@
+"""Tests for the embedded vector index: IVF/int8 round-trips and versioned saves"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from config.config import Config
+from utils.tools.local_vector_index import (
+    CURRENT_FILE,
+    LocalSearchBackend,
+    LocalVectorIndex,
+)
+
+DIM = 16
+
+
+def _vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, DIM))
+    return centers[rng.integers(8, size=count)] + 0.3 * rng.normal(size=(count, DIM))
+
+
+def _build(path, count=400, quantization="none", nlist=0, sparse=False):
+    index = LocalVectorIndex(str(path), quantization=quantization, nlist=nlist)
+    ids = [f"p{i}" for i in range(count)]
+    payloads = [
+        {"page_content": f"chunk {i}", "metadata": {"n": i}} for i in range(count)
+    ]
+    sparse_vectors = None
+    if sparse:
+        sparse_vectors = [
+            SimpleNamespace(indices=[i % 7, 100 + i], values=[1.0, 2.0])
+            for i in range(count)
+        ]
+    index.upsert(ids, _vectors(count), payloads, sparse_vectors)
+    index.save()
+    return index
+
+
+@pytest.mark.parametrize(
+    "quantization, nlist", [("none", 0), ("int8", 0), ("none", 8), ("int8", 8)]
+)
+def test_round_trip_finds_the_exact_neighbours(tmp_path, quantization, nlist):
+    built = _build(tmp_path, quantization=quantization, nlist=nlist)
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    assert loaded.version == built.version
+    assert loaded.ids == built.ids and loaded.payloads == built.payloads
+    assert (loaded.centroids is not None) == bool(nlist)
+    assert (loaded.codes is not None) == (quantization == "int8")
+
+    queries = _vectors(20, seed=1)
+    exact = np.asarray(loaded.vectors) @ (
+        queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    ).T
+    for q, scores in zip(queries, exact.T):
+        found = [row for row, _ in loaded.search(q, 5, nprobe=8)]
+        expected = np.argsort(scores)[::-1][:5].tolist()
+        assert found[0] == expected[0]
+        assert len(set(found) & set(expected)) >= 4
+
+
+def test_score_threshold_and_sparse_search(tmp_path):
+    index = _build(tmp_path, count=50, sparse=True)
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    assert loaded.search(loaded.vectors[3], 5, score_threshold=2.0) == []
+
+    # Term 103 is unique to row 3; term 3 is shared by every 7th row
+    hits = loaded.sparse_search([103, 3], [1.0, 1.0], 10)
+    assert hits[0][0] == 3
+    assert {row for row, _ in hits} == set(range(3, 50, 7))
+    assert index.sparse_search([999], [1.0], 10) == []
+
+
+def test_upsert_and_delete_survive_a_reload(tmp_path):
+    index = _build(tmp_path, count=20, sparse=True)
+    index.delete(["p0", "p1"])
+    index.upsert(
+        ["p5"],
+        _vectors(1, seed=9),
+        [{"page_content": "new", "metadata": {}}],
+        [SimpleNamespace(indices=[500], values=[1.0])],
+    )
+    index.save()
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    assert loaded.count == 18
+    assert "p0" not in loaded.ids and loaded.ids[-1] == "p5"
+    assert loaded.payloads[-1]["page_content"] == "new"
+    assert loaded.sparse_search([500], [1.0], 5)[0][0] == loaded.count - 1
+
+
+def test_saves_publish_whole_versions(tmp_path):
+    index = _build(tmp_path, count=20)
+    versions = [index.version]
+    for _ in range(3):
+        index.upsert(["extra"], _vectors(1), [{"page_content": "x"}])
+        versions.append(index.save())
+
+    assert LocalVectorIndex.read_version(str(tmp_path)) == versions[-1]
+    with open(tmp_path / CURRENT_FILE, encoding="utf-8") as f:
+        assert f.read() == versions[-1]
+    # The current and the previous version are kept, older ones pruned
+    kept = sorted(name for name in os.listdir(tmp_path) if name.startswith("v"))
+    assert kept == [f"v{v}" for v in versions[-2:]]
+
+
+def test_missing_index_has_no_version(tmp_path):
+    assert LocalVectorIndex.read_version(str(tmp_path)) is None
+    with pytest.raises(FileNotFoundError):
+        LocalVectorIndex.load(str(tmp_path))
+
+
+def test_backend_reloads_new_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RAG_VERSION_CHECK_INTERVAL", 0)
+    index = _build(tmp_path, count=20)
+    backend = LocalSearchBackend(str(tmp_path))
+    index.upsert(["late"], _vectors(1, seed=5), [{"page_content": "late"}])
+    new_version = index.save()
+
+    async def check():
+        version = await backend.index_version()
+        results = await backend.dense_search(index.vectors[-1], 1)
+        return version, results
+
+    version, results = asyncio.run(check())
+    assert version == new_version
+    point_id, document, score = results[0]
+    assert point_id == "late" and document.page_content == "late"
+    assert score == pytest.approx(1.0, abs=1e-5)
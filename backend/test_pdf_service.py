@@ -0,0 +1,73 @@
+"""Tests for page-batched PDF extraction with the page text cache"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config.config import Config
+from services import pdf_service as pdf_module
+from services.pdf_service import PageTextCache, PDFService
+
+PAGE_COUNT = 6
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """A PDFService on a fake 6-page PDF, extracting in threads"""
+    extracted = []
+
+    def fake_extract(path, pages):
+        extracted.append(list(pages))
+        return [(page, f"text {page}") for page in pages]
+
+    monkeypatch.setattr(pdf_module, "_extract_pages", fake_extract)
+    monkeypatch.setattr(pdf_module, "_count_pages", lambda path: PAGE_COUNT)
+    monkeypatch.setattr(Config, "PDF_PAGES_PER_TASK", 8)
+
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 fake")
+
+    svc = PDFService()
+    svc._executor = ThreadPoolExecutor(max_workers=2)
+    svc._cache = PageTextCache(str(tmp_path / "cache.sqlite3"))
+    svc.extracted = extracted
+    svc.pdf_path = str(pdf_path)
+    yield svc
+    svc.shutdown()
+
+
+async def _read(svc, start=1, end=None):
+    return [page async for page, _ in svc.iter_pages(svc.pdf_path, start, end)]
+
+
+def test_full_read_after_partial_read_returns_every_page(service):
+    assert asyncio.run(_read(service, 3, 4)) == [3, 4]
+    assert asyncio.run(_read(service)) == [1, 2, 3, 4, 5, 6]
+    # Only the uncached runs on either side of pages 3-4 were extracted
+    assert service.extracted == [[3, 4], [1, 2], [5, 6]]
+
+
+def test_batches_split_at_page_limit(service, monkeypatch):
+    monkeypatch.setattr(Config, "PDF_PAGES_PER_TASK", 4)
+    assert asyncio.run(_read(service)) == [1, 2, 3, 4, 5, 6]
+    assert service.extracted == [[1, 2, 3, 4], [5, 6]]
+
+
+def test_cached_pages_are_not_extracted_again(service):
+    asyncio.run(_read(service))
+    service.extracted.clear()
+    texts = asyncio.run(service.extract_text(service.pdf_path, 2, 3))
+    assert "--- Page 2 ---" in texts and "--- Page 3 ---" in texts
+    assert service.extracted == []
+
+
+def test_file_hashes_are_bounded(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "PDF_HASH_CACHE_SIZE", 2)
+    paths = []
+    for n in range(3):
+        path = tmp_path / f"{n}.pdf"
+        path.write_bytes(b"%PDF" + bytes([n]))
+        paths.append(str(path))
+        asyncio.run(service.file_hash(str(path)))
+    assert [key[0] for key in service._hashes] == paths[1:]
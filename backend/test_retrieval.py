@@ -0,0 +1,116 @@
+"""Tests for rank fusion and the score cutoffs of HybridRetriever"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from utils.tools.retrieval import HybridRetriever, reciprocal_rank_fusion
+
+
+def _points(scored):
+    """[(id, score)] -> search results as the backends return them"""
+    return [(point_id, Document(page_content=point_id), s) for point_id, s in scored]
+
+
+class FakeBackend:
+    """Canned dense and sparse results; dense honours the score threshold"""
+
+    collection_name = "test"
+
+    def __init__(self, dense, sparse=()):
+        self.dense = _points(dense)
+        self.sparse = _points(sparse)
+
+    async def has_sparse(self):
+        return bool(self.sparse)
+
+    async def index_version(self):
+        return "1"
+
+    async def dense_search(self, vector, limit, score_threshold=None):
+        return [
+            p for p in self.dense if score_threshold is None or p[2] >= score_threshold
+        ][:limit]
+
+    async def sparse_search(self, indices, values, limit):
+        return self.sparse[:limit]
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return [1.0]
+
+
+class FakeSparseEmbeddings:
+    def embed_query(self, text):
+        return SimpleNamespace(indices=[1], values=[1.0])
+
+
+class FakeReranker:
+    def __init__(self, scores):
+        self.scores = scores
+
+    async def ascore(self, query, texts):
+        return [self.scores[text] for text in texts]
+
+
+def _retrieve(backend, **kwargs):
+    kwargs.setdefault("dense_score_threshold", 0.3)
+    kwargs.setdefault("relative_score_cutoff", 0.5)
+    kwargs.setdefault("fused_relative_score_cutoff", 0.45)
+    retriever = HybridRetriever(
+        backend, FakeEmbeddings(), FakeSparseEmbeddings(), k=10, **kwargs
+    )
+    return [doc.page_content for doc in asyncio.run(retriever.aretrieve("query"))]
+
+
+def test_rrf_rewards_points_found_by_both_lists():
+    fused = reciprocal_rank_fusion(
+        [_points([("a", 0.9), ("b", 0.8)]), _points([("b", 7.0), ("c", 5.0)])], k=60
+    )
+    assert [point_id for point_id, _, _ in fused] == ["b", "a", "c"]
+    assert fused[0][2] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[1][2] == pytest.approx(1 / 61)
+
+
+def test_relative_cutoff_drops_weak_dense_hits():
+    backend = FakeBackend([("a", 0.9), ("b", 0.5), ("c", 0.35)])
+    assert _retrieve(backend) == ["a", "b"]
+
+
+def test_dense_threshold_drops_everything_below_it():
+    backend = FakeBackend([("a", 0.25), ("b", 0.2)])
+    assert _retrieve(backend) == []
+
+
+def test_fused_cutoff_keeps_single_list_hits_near_the_top():
+    dense = [("a", 0.9)] + [(f"d{n}", 0.8 - n * 0.01) for n in range(12)]
+    backend = FakeBackend(dense, sparse=[("a", 9.0)])
+    found = _retrieve(backend)
+    assert found[0] == "a"
+    # Dense-only hits survive down to about rank 7 behind a hit found by both
+    assert 5 <= len(found) <= 9
+
+
+def test_sparse_only_hits_need_a_dense_match():
+    backend = FakeBackend(
+        [("a", 0.9), ("b", 0.2)], sparse=[("b", 9.0), ("s", 8.0), ("a", 1.0)]
+    )
+    assert _retrieve(backend) == ["a"]
+
+
+def test_sparse_only_hits_dropped_when_dense_finds_nothing():
+    backend = FakeBackend([("a", 0.1)], sparse=[("s1", 9.0), ("s2", 8.0)])
+    assert _retrieve(backend) == []
+
+
+def test_reranker_scores_drive_thresholds_and_order():
+    backend = FakeBackend(
+        [("a", 0.9), ("b", 0.8), ("c", 0.7)], sparse=[("s", 9.0)]
+    )
+    reranker = FakeReranker({"a": 0.4, "b": 0.9, "c": 0.1, "s": 0.6})
+    found = _retrieve(backend, reranker=reranker, rerank_score_threshold=0.2)
+    # "c" is under the absolute threshold, "a" under half of the best score
+    assert found == ["b", "s"]
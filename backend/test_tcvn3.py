@@ -0,0 +1,53 @@
+"""Tests for TCVN3 detection and transcoding"""
+
+import pytest
+
+from utils.tools.tcvn3 import (
+    is_tcvn3,
+    is_tcvn3_source,
+    normalize_vietnamese,
+    tcvn3_to_unicode,
+)
+
+# "Chuyển động thẳng biến đổi đều là gì?" in TCVN3
+TCVN3_LINE = "ChuyÓn ®éng th¼ng biÕn ®æi ®Òu lµ g×?"
+UNICODE_LINE = "Chuyển động thẳng biến đổi đều là gì?"
+
+
+def test_transcodes_tcvn3():
+    assert tcvn3_to_unicode(TCVN3_LINE) == UNICODE_LINE
+
+
+def test_characters_outside_latin1_are_kept():
+    assert tcvn3_to_unicode(f"• {TCVN3_LINE} ✓") == f"• {UNICODE_LINE} ✓"
+
+
+def test_detects_tcvn3_text():
+    assert is_tcvn3("\n".join([TCVN3_LINE] * 10))
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Latin-1 symbols outside words
+        "3 × 4 = 12, 12 ÷ 4 = 3, ± 0.5 µm, © 2024, 25 °C, § 4, ¶ 2. " * 20,
+        # Latin-1 letters that TCVN3 also uses, in ordinary European text
+        "Le café à côté de l'école était déjà fermé, süß, façade. " * 20,
+        # Unicode Vietnamese
+        f"{UNICODE_LINE} " * 20,
+        # A little TCVN3 in a long English text
+        TCVN3_LINE + " Plain English text about physics and motion. " * 100,
+    ],
+)
+def test_no_false_positives(text):
+    assert not is_tcvn3(text)
+    assert normalize_vietnamese(text) == text
+
+
+def test_file_name_suffix_forces_transcoding():
+    assert is_tcvn3_source("docs/chuong1_TCVN3.txt")
+    assert not is_tcvn3_source("docs/tcvn3_notes.txt")
+    assert not is_tcvn3_source(None)
+    # Too short to detect, transcoded because of the file name
+    assert normalize_vietnamese("lµ g×", "bai_tcvn3.pdf") == "là gì"
+    assert normalize_vietnamese("lµ g×") == "lµ g×"
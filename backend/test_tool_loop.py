@@ -0,0 +1,140 @@
+"""Tests for native tool calling: ToolHandler.execute_tool_calls and the agent loop"""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+from config.config import Config
+from utils.agents.base_agent import BaseAgent
+from utils.tools.tool_handler import ToolHandler
+
+
+async def _lookup(query: str) -> str:
+    """Look something up"""
+    await asyncio.sleep(0.1)
+    return f"found {query}"
+
+
+async def _broken(query: str) -> str:
+    """Always fails"""
+    raise ValueError("backend down")
+
+
+TOOLS = [
+    StructuredTool.from_function(coroutine=_lookup, name="lookup"),
+    StructuredTool.from_function(coroutine=_broken, name="broken"),
+]
+
+
+def _call(name, query="x", call_id=None):
+    return {"name": name, "args": {"query": query}, "id": call_id or f"{name}-{query}"}
+
+
+def test_calls_run_concurrently_and_keep_their_order():
+    calls = [_call("lookup", "a"), _call("lookup", "b")]
+    start = time.perf_counter()
+    messages = asyncio.run(ToolHandler.execute_tool_calls(calls, TOOLS))
+    assert time.perf_counter() - start < 0.19
+    assert [m.content for m in messages] == ["found a", "found b"]
+    assert [m.tool_call_id for m in messages] == ["lookup-a", "lookup-b"]
+
+
+def test_errors_come_back_as_tool_messages():
+    artifacts = {}
+    calls = [_call("broken"), _call("missing")]
+    messages = asyncio.run(
+        ToolHandler.execute_tool_calls(calls, TOOLS, artifacts=artifacts)
+    )
+    assert all(isinstance(m, ToolMessage) for m in messages)
+    assert "backend down" in messages[0].content
+    assert "unknown tool 'missing'" in messages[1].content
+    assert "backend down" in artifacts["broken"]
+
+
+def test_call_limit_is_shared_across_responses():
+    artifacts, counts = {}, {}
+    for query in ("a", "b"):
+        asyncio.run(
+            ToolHandler.execute_tool_calls(
+                [_call("lookup", query)],
+                TOOLS,
+                artifacts=artifacts,
+                tool_call_count=counts,
+                max_tool_calls=2,
+            )
+        )
+    messages = asyncio.run(
+        ToolHandler.execute_tool_calls(
+            [_call("lookup", "c")],
+            TOOLS,
+            artifacts=artifacts,
+            tool_call_count=counts,
+            max_tool_calls=2,
+        )
+    )
+    assert "call limit reached" in messages[0].content
+    assert artifacts == {"lookup": "found a", "lookup_2": "found b"}
+
+
+class FakeLLM:
+    """Replays scripted responses and records whether tools were offered"""
+
+    supports_native_tools = True
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.offered_tools = []
+
+    async def invoke(self, messages, tools=None, cache_namespace=None):
+        self.offered_tools.append(bool(tools))
+        return self.responses.pop(0)
+
+
+class Agent(BaseAgent):
+    def get_system_prompt(self) -> str:
+        return "test agent"
+
+
+def _agent(responses):
+    agent = Agent(llm=FakeLLM(responses))
+    agent.tools = TOOLS
+    return agent
+
+
+def _tool_request(query):
+    return AIMessage(content="", tool_calls=[_call("lookup", query)])
+
+
+def test_loop_feeds_tool_results_back_until_a_plain_answer():
+    agent = _agent([_tool_request("a"), AIMessage(content="the answer")])
+    messages = [HumanMessage(content="question")]
+    result = asyncio.run(agent._invoke_with_native_tools(messages))
+    assert result["messages"][0].content == "the answer"
+    assert result["artifacts"] == {"lookup": "found a"}
+    # The request and its tool result were appended for the second call
+    assert isinstance(messages[1], AIMessage)
+    assert isinstance(messages[2], ToolMessage)
+    assert messages[2].content == "found a"
+
+
+def test_loop_forces_an_answer_after_max_iterations(monkeypatch):
+    monkeypatch.setattr(Config, "MAX_ITERATIONS", 2)
+    agent = _agent(
+        [_tool_request("a"), _tool_request("b"), AIMessage(content="best effort")]
+    )
+    result = asyncio.run(agent._invoke_with_native_tools([HumanMessage("q")]))
+    assert result["messages"][0].content == "best effort"
+    assert agent.llm.offered_tools == [True, True, False]
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [("plain", "plain"), ([{"type": "text", "text": "a"}, "b"], "ab")],
+)
+def test_loop_flattens_content_blocks(content, expected):
+    agent = _agent([AIMessage(content=content)])
+    result = asyncio.run(agent._invoke_with_native_tools([HumanMessage("q")]))
+    assert result["messages"][0].content == expected
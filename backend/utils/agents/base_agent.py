@@ -1,11 +1,14 @@
 """Base agent implementation with proper async support"""
 
 from typing import List, Dict, Any, Optional
+import hashlib
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 import logging
-from utils.wrappers.llm_wrapper import LLMWrapper
+from config.config import Config
+from utils.wrappers.llm_wrapper import get_llm
 from utils.tools.tool_handler import ToolHandler
 from .tools import get_tools_for_agent
+from config.prompts import get_session_documents_context
 
 logger = logging.getLogger(__name__)
 
@@ -14,37 +17,138 @@ class BaseAgent:
     """Base class for all specialized agents with async support"""
 
     def __init__(self, llm=None):
-        self.llm = llm or LLMWrapper()
+        self._llm = llm
         self.tools: List[Any] = []
         self.agent_type = "base"
         self.agent_name = "Base Agent"
+        self.tools_version = ""
+        self._system_message_cache: Dict[str, SystemMessage] = {}
+
+    @property
+    def llm(self):
+        """LLM client for this agent's model profile (Config.AGENT_LLM_PROFILES).
+
+        Resolved lazily because subclasses set agent_type after BaseAgent.__init__.
+        """
+        if self._llm is None:
+            profile = Config.AGENT_LLM_PROFILES.get(self.agent_type, "default")
+            self._llm = get_llm(profile)
+        return self._llm
+
+    @llm.setter
+    def llm(self, value) -> None:
+        self._llm = value
 
     def get_system_prompt(self) -> str:
         """Get the system prompt for this agent"""
         raise NotImplementedError("Subclasses must implement get_system_prompt")
 
+    def get_system_message(self) -> SystemMessage:
+        """Return the system message, built once per tool-catalog version.
+
+        Returning the same object keeps the prompt prefix byte-identical across
+        calls, which is what provider-side prefix caching keys on.
+        """
+        key = f"{self.tools_version}:{self.uses_native_tools}"
+        system_message = self._system_message_cache.get(key)
+        if system_message is None:
+            system_message = SystemMessage(content=self.get_system_prompt())
+            self._system_message_cache[key] = system_message
+            logger.debug(
+                f"{self.agent_name} built system prompt for tool catalog {key}"
+            )
+        return system_message
+
+    def _cache_namespace(self) -> Optional[str]:
+        """Namespace for response caching, or None when this agent opts out"""
+        if Config.LLM_CACHE_AGENTS.get(self.agent_type, False):
+            return self.agent_type
+        return None
+
+    def invalidate_system_prompt(self) -> None:
+        """Drop memoized prompts after prompt inputs other than tools change"""
+        self._system_message_cache.clear()
+
+    def _update_tools_version(self) -> None:
+        """Fingerprint the tool catalog so prompts are rebuilt only when it changes"""
+        catalog = "\n".join(
+            sorted(f"{tool.name}:{tool.description}" for tool in self.tools)
+        )
+        self.tools_version = hashlib.sha1(catalog.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def uses_native_tools(self) -> bool:
+        """Whether tools are bound to the model instead of described in text"""
+        return bool(self.tools) and getattr(self.llm, "supports_native_tools", False)
+
+    def get_tools_prompt(self) -> str:
+        """Describe available tools for the system prompt.
+
+        With native function calling the schemas travel with the request, so
+        only the text fallback needs the "[Tool Used]" calling convention.
+        """
+        if not self.tools or self.uses_native_tools:
+            return ""
+
+        # Sorted so the prompt does not depend on MCP tool discovery order
+        tool_lines = [
+            f"- {tool.name}: {tool.description}"
+            for tool in sorted(self.tools, key=lambda tool: tool.name)
+        ]
+        tools_desc = "\n\nYou have access to the following tools:\n" + "\n".join(
+            tool_lines
+        )
+        tools_desc += (
+            '\n\nUse tools by indicating "[Tool Used] tool_name(args)" '
+            "in your response."
+        )
+        return tools_desc
+
     async def initialize_tools(self) -> None:
         """Initialize tools asynchronously"""
         agent_tools = await get_tools_for_agent(self.agent_type)
         mcp_tools = await ToolHandler.initialize_tools()
-        self.tools = agent_tools + mcp_tools
+        # get_tools_for_agent may already include MCP tools; keep one per name
+        # since providers reject duplicate function declarations
+        unique_tools = {}
+        for tool in agent_tools + mcp_tools:
+            unique_tools.setdefault(tool.name, tool)
+        self.tools = list(unique_tools.values())
+        self._update_tools_version()
         logger.info(
             f"{self.agent_name} initialized with {len(self.tools)} tools: {[tool.name for tool in self.tools]}"
         )
 
     async def invoke(
-        self, message: HumanMessage, chat_history: Optional[List[BaseMessage]] = None
+        self,
+        message: HumanMessage,
+        chat_history: Optional[List[BaseMessage]] = None,
+        context: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Process a message asynchronously and return response with any artifacts"""
+        """Process a message asynchronously and return response with any artifacts.
+
+        ``context`` (excerpts from the session's documents) is added to this
+        turn's message only, after the cacheable system prefix and history.
+        """
         if chat_history is None:
             chat_history = []
+        if context:
+            message = HumanMessage(
+                content=get_session_documents_context(context, message.content)
+            )
 
-        messages = [SystemMessage(content=self.get_system_prompt())]
+        # Static system prefix first, then history, then the new turn
+        messages = [self.get_system_message()]
         messages.extend(chat_history)
         messages.append(message)
 
+        if self.uses_native_tools:
+            return await self._invoke_with_native_tools(messages)
+
         try:
-            response = await self.llm.invoke(messages)
+            response = await self.llm.invoke(
+                messages, cache_namespace=self._cache_namespace()
+            )
             if not response:
                 return {
                     "messages": [
@@ -114,7 +218,9 @@ Yêu cầu:
                 messages.append(AIMessage(content=response_content))
                 messages.append(HumanMessage(content=tool_results_message))
 
-                final_response = await self.llm.invoke(messages)
+                final_response = await self.llm.invoke(
+                    messages, cache_namespace=self._cache_namespace()
+                )
                 if final_response:
                     final_content = getattr(final_response, "content", "")
                     if not isinstance(final_content, str):
@@ -136,3 +242,87 @@ Yêu cầu:
             return {
                 "messages": [AIMessage(content=f"I encountered an error: {str(e)}")]
             }
+
+    async def _invoke_with_native_tools(
+        self, messages: List[BaseMessage]
+    ) -> Dict[str, Any]:
+        """Run a structured tool loop bounded by Config.MAX_ITERATIONS"""
+        artifacts: Dict[str, Any] = {}
+        tool_call_count: Dict[str, int] = {}
+
+        try:
+            for iteration in range(Config.MAX_ITERATIONS):
+                response = await self.llm.invoke(
+                    messages,
+                    tools=self.tools,
+                    cache_namespace=self._cache_namespace(),
+                )
+                if not response:
+                    break
+
+                tool_calls = getattr(response, "tool_calls", None) or []
+                if not tool_calls:
+                    return {
+                        "messages": [AIMessage(content=_content_to_str(response))],
+                        "artifacts": artifacts,
+                    }
+
+                logger.info(
+                    f"{self.agent_name} iteration {iteration + 1}: "
+                    f"{[call.get('name') for call in tool_calls]}"
+                )
+                messages.append(response)
+                messages.extend(
+                    await ToolHandler.execute_tool_calls(
+                        tool_calls,
+                        self.tools,
+                        artifacts=artifacts,
+                        tool_call_count=tool_call_count,
+                    )
+                )
+            else:
+                # Iteration budget spent on tool calls: force a plain answer
+                logger.warning(
+                    f"{self.agent_name} reached MAX_ITERATIONS "
+                    f"({Config.MAX_ITERATIONS}) in tool loop"
+                )
+                final_response = await self.llm.invoke(
+                    messages, cache_namespace=self._cache_namespace()
+                )
+                if final_response:
+                    return {
+                        "messages": [
+                            AIMessage(content=_content_to_str(final_response))
+                        ],
+                        "artifacts": artifacts,
+                    }
+
+            return {
+                "messages": [
+                    AIMessage(
+                        content="I apologize, but I couldn't generate a response."
+                    )
+                ],
+                "artifacts": artifacts,
+            }
+
+        except Exception as e:
+            logger.error(f"Error in agent tool loop: {e}", exc_info=True)
+            return {
+                "messages": [AIMessage(content=f"I encountered an error: {str(e)}")]
+            }
+
+
+def _content_to_str(response: BaseMessage) -> str:
+    """Flatten provider message content (string or content blocks) to text"""
+    content = getattr(response, "content", None)
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return str(content)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 import logging
 from .memory_mixin import MemoryMixin
@@ -13,13 +13,26 @@ class ChatAgent(MemoryMixin):
         super().__init__()
         self.chat_history: List[BaseMessage] = []
         self.agent_executor = None
+        # Agent that answered the last turn; the graph may speculate on it
+        self.last_agent: Optional[str] = None
 
     def set_agent_executor(self, executor):
         """Set the agent executor function from the graph"""
         self.agent_executor = executor
 
-    async def achat(self, prompt: str, agent_type: str = None) -> str:
-        """Process a chat message through the agent graph asynchronously with optional memory"""
+    def set_session_id(self, session_id: str):
+        super().set_session_id(session_id)
+        self.last_agent = None
+
+    async def achat(
+        self, prompt: str, agent_type: str = None, context: Optional[str] = None
+    ) -> str:
+        """Process a chat message through the agent graph asynchronously with memory.
+
+        ``context`` (excerpts from the session's documents) travels in its own
+        state field: routing, speculation and retrieval see the plain prompt,
+        the answering agent sees both, and history stores the plain prompt.
+        """
         try:
             if not prompt.strip():
                 return "Please provide a valid input"
@@ -42,8 +55,10 @@ class ChatAgent(MemoryMixin):
 
             input_state = {
                 "input": prompt,
+                "context": context,
                 "chat_history": chat_history,
                 "current_agent": None,
+                "previous_agent": self.last_agent,
                 "output": None,
                 "artifacts": {},
             }
@@ -53,6 +68,7 @@ class ChatAgent(MemoryMixin):
                 if isinstance(response, dict):
                     output = response.get("output", "")
                     current_agent = response.get("current_agent", agent_type)
+                    self.last_agent = current_agent
 
                     # Update local history if memory is disabled
                     if not self._memory_enabled and "chat_history" in response:
@@ -12,6 +12,8 @@ class ConversationAgent:
     def __init__(self):
         self.chat_history: List[BaseMessage] = []
         self.agent_executor = None
+        # Agent that answered the last turn; the graph may speculate on it
+        self.last_agent: Optional[str] = None
 
     def set_agent_executor(self, executor):
         """Set the agent executor function from the graph"""
@@ -30,6 +32,7 @@ class ConversationAgent:
                 "input": prompt,
                 "chat_history": self.chat_history,
                 "current_agent": None,
+                "previous_agent": self.last_agent,
                 "output": None,
             }
 
@@ -38,6 +41,7 @@ class ConversationAgent:
 
                 if isinstance(response, dict):
                     output = response.get("output", "")
+                    self.last_agent = response.get("current_agent")
 
                     if "chat_history" in response:
                         self.chat_history = response["chat_history"]
@@ -1,9 +1,6 @@
-from diffusers import DiffusionPipeline, LCMScheduler
-import torch
 import os
 from datetime import datetime
 import gc
-from huggingface_hub import hf_hub_download
 import logging
 from langchain_core.messages import AIMessage
 from utils.wrappers.image_generator_wrapper import ImageGeneratorWrapper
@@ -17,17 +14,27 @@ logger = logging.getLogger(__name__)
 class ImageAgent(MemoryMixin):
     def __init__(self, provider="google_ai_studio"):
         super().__init__()
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = ImageGeneratorWrapper(provider=provider, device=self.device)
+        self.provider = provider
+        self.device = ImageGeneratorWrapper.default_device(provider)
+        self._model = None
         self.images_dir = Config.GENERATED_IMAGES_DIR
         os.makedirs(self.images_dir, exist_ok=True)
         logger.info(f"Using device: {self.device}")
 
+    @property
+    def model(self) -> ImageGeneratorWrapper:
+        """The generator is created on the first image request, not at startup"""
+        if self._model is None:
+            self._model = ImageGeneratorWrapper(
+                provider=self.provider, device=self.device
+            )
+        return self._model
+
     async def initialize_tools(self):
         """Initialize tools for the image agent (async compatibility)"""
         pass
 
-    async def invoke(self, message, chat_history=None):
+    async def invoke(self, message, chat_history=None, context=None):
         """
         Main interface method for the ImageAgent.
         This method is called by the chat agent and router.
@@ -84,6 +91,8 @@ class ImageAgent(MemoryMixin):
 
     def _clear_memory(self):
         if self.device == "cuda":
+            import torch
+
             torch.cuda.empty_cache()
             gc.collect()
 
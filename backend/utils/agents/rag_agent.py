@@ -3,8 +3,9 @@ from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, Base
 from langchain_core.runnables import Runnable
 from langchain.schema import Document
 from langchain_qdrant import QdrantVectorStore
-from langchain_core.vectorstores import VectorStoreRetriever
+from typing import List, Optional
 
+from utils.tools.retrieval import HybridRetriever
 from .base_agent import BaseAgent
 from .memory_mixin import MemoryMixin
 import logging
@@ -16,11 +17,18 @@ logger = logging.getLogger(__name__)
 class RAGAgent(BaseAgent, MemoryMixin):
     """Retrieval-Augmented Generation (RAG) Agent with LangGraph"""
 
-    def __init__(self, vectorstore: QdrantVectorStore, llm=None):
+    def __init__(
+        self,
+        vectorstore: Optional[QdrantVectorStore] = None,
+        llm=None,
+        retriever: Optional[HybridRetriever] = None,
+    ):
         super().__init__(llm)
         MemoryMixin.__init__(self)
+        if retriever is None and vectorstore is None:
+            raise ValueError("RAGAgent needs a vectorstore or a retriever")
         self.vectorstore = vectorstore
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 6})
+        self.retriever = retriever or HybridRetriever.from_vectorstore(vectorstore)
         self.agent_type = "rag"
         self.agent_name = "RAG Agent"
         self.graph = self._build_workflow()
@@ -30,18 +38,21 @@ class RAGAgent(BaseAgent, MemoryMixin):
 
         async def retrieve_node(state: dict) -> dict:
             query = state["input"].content
-            docs = await self.retriever.ainvoke(query)
-            context = "\n".join(doc.page_content for doc in docs)
-            print("YOLO MOTHER FUCKER CONTEXT:\n ", context)
-            state["context"] = context
+            docs = await self.retriever.aretrieve(query)
+            state["context"] = self._format_context(docs)
+            logger.debug(f"RAG context ({len(docs)} chunks): {state['context'][:500]}")
             return state
 
         async def generate_node(state: dict) -> dict:
             context = state.get("context", "")
+            if state.get("session_context"):
+                # Excerpts from the user's uploads in this chat come first
+                context = f"{state['session_context']}\n\n{context}"
             query = state["input"].content
             system_prompt = SystemMessage(content=get_RAG_system_prompt())
             messages = [
                 system_prompt,
+                *state.get("chat_history", []),
                 HumanMessage(
                     content=(
                         f"Dưới đây là tài liệu tham khảo:\n{context}\n\n"
@@ -49,7 +60,9 @@ class RAGAgent(BaseAgent, MemoryMixin):
                     )
                 ),
             ]
-            response = await self.llm.invoke(messages)
+            response = await self.llm.invoke(
+                messages, cache_namespace=self._cache_namespace()
+            )
             state["output"] = response
             return state
 
@@ -62,14 +75,33 @@ class RAGAgent(BaseAgent, MemoryMixin):
         builder.set_finish_point("generate")
         return builder.compile()
 
+    @staticmethod
+    def _format_context(docs: List[Document]) -> str:
+        """Render chunks best first, each under its section header path"""
+        parts = []
+        for doc in docs:
+            header = doc.metadata.get("header")
+            parts.append(
+                f"[{header}]\n{doc.page_content}" if header else doc.page_content
+            )
+        return "\n\n".join(parts)
+
     async def ainvoke(
-        self, message: HumanMessage, chat_history: list[BaseMessage] = None
+        self,
+        message: HumanMessage,
+        chat_history: list[BaseMessage] = None,
+        context: Optional[str] = None,
     ) -> dict:
         if chat_history is None:
             chat_history = []
 
         try:
-            state = {"input": message}
+            # Retrieval runs on the message alone; session excerpts only join the prompt
+            state = {
+                "input": message,
+                "chat_history": chat_history,
+                "session_context": context,
+            }
             final_state = await self.graph.ainvoke(state)
             ai_msg = final_state["output"]
             return {"messages": [ai_msg]}
@@ -78,9 +110,22 @@ class RAGAgent(BaseAgent, MemoryMixin):
             logger.error(f"RAGAgent encountered an error: {e}")
             return {"messages": [AIMessage(content=f"Error: {str(e)}")]}
 
+    async def initialize_tools(self) -> None:
+        """Answers come from retrieved context only, so no tools are bound"""
+        self.tools = []
+
+    async def invoke(
+        self,
+        message: HumanMessage,
+        chat_history: list[BaseMessage] = None,
+        context: Optional[str] = None,
+    ) -> dict:
+        """Graph node entry point; retrieval replaces the tool loop of other agents"""
+        return await self.ainvoke(message, chat_history, context)
+
 
 from qdrant_client import QdrantClient
-from langchain_huggingface import HuggingFaceEmbeddings
+from utils.wrappers.embedding_wrapper import get_embeddings
 import asyncio
 import time
 
@@ -91,9 +136,7 @@ async def main():
     vectorstore = QdrantVectorStore(
         client=qdrant_client,
         collection_name="rag_collection",
-        embedding=HuggingFaceEmbeddings(
-            model_name="thanhtantran/Vietnamese_Embedding_v2"
-        ),
+        embedding=get_embeddings("thanhtantran/Vietnamese_Embedding_v2"),
     )
 
     rag_agent = RAGAgent(llm=None, vectorstore=vectorstore)
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Optional
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+import copy
 import logging
 import re
 from services.mcp_service import detach_mcp_service
@@ -28,6 +29,8 @@ class RouterAgent(BaseAgent, MemoryMixin):
         MemoryMixin.__init__(self)
         self.agent_type = "router"
         self.agent_name = "Router Agent"
+        self.mcp_tools_info = ""  # Cache for MCP tools information
+        self.route_hints = ""  # Optional agents registered by the graph
 
         self._ensure_mcp_initialized()
 
@@ -47,10 +50,6 @@ class RouterAgent(BaseAgent, MemoryMixin):
         except Exception as e:
             logger.error(f"Error checking MCP service: {e}")
 
-    def __init__(self):
-        super().__init__()
-        self.mcp_tools_info = ""  # Cache for MCP tools information
-
     async def initialize_mcp_tools_info(self):
         """Initialize MCP tools information for use in prompts"""
         try:
@@ -78,10 +77,35 @@ class RouterAgent(BaseAgent, MemoryMixin):
         except Exception as e:
             logger.error(f"Error initializing MCP tools info: {e}")
             self.mcp_tools_info = ""
+        finally:
+            self.invalidate_system_prompt()
+
+    def add_route_hint(self, hint: str) -> None:
+        """Advertise an optional agent (e.g. RAG) to the routing model"""
+        self.route_hints += hint
+        self.invalidate_system_prompt()
+
+    def with_route_hint(self, hint: str) -> "RouterAgent":
+        """A copy advertising one more agent, for a graph that has it.
+
+        The copy shares the LLM client and the MCP listing, so it costs no
+        initialization; this router's prompt is left unchanged.
+        """
+        router = copy.copy(self)
+        router.tools = list(self.tools)
+        router._system_message_cache = {}
+        router.add_route_hint(hint)
+        return router
+
+    @property
+    def uses_native_tools(self) -> bool:
+        """The router only emits a route label, so tools are never bound"""
+        return False
 
     def get_system_prompt(self) -> str:
         """Get the specialized router prompt including MCP tool names"""
         prompt = get_router_prompt()
+        prompt += self.route_hints
         prompt += self.mcp_tools_info
         return prompt
 
@@ -96,13 +120,14 @@ class RouterAgent(BaseAgent, MemoryMixin):
             "planning": PlanningAgent,
         }
 
+        # Specialists resolve their own model profile; the router's is too small
         if agent_type in agent_map:
-            return agent_map[agent_type](self.llm)
+            return agent_map[agent_type]()
 
         logger.warning(
             f"Unknown agent type: {agent_type}, defaulting to AssistantAgent"
         )
-        return AssistantAgent(self.llm)
+        return AssistantAgent()
 
 
 class AssistantAgent(BaseAgent):
@@ -116,16 +141,7 @@ class AssistantAgent(BaseAgent):
     def get_system_prompt(self) -> str:
         """Get the specialized assistant prompt including tool descriptions"""
         system_prompt = get_assistant_agent_prompt()
-        if self.tools:
-            tool_lines = [f"- {tool.name}: {tool.description}" for tool in self.tools]
-            tools_desc = "\n\nYou have access to the following tools:\n" + "\n".join(
-                tool_lines
-            )
-            tools_desc += '\n\nUse tools by indicating "[Tool Used] tool_name(args)" in your response.'
-        else:
-            tools_desc = ""
-
-        return f"{system_prompt}{tools_desc}"
+        return f"{system_prompt}{self.get_tools_prompt()}"
 
 
 class MathAgent(BaseAgent):
@@ -139,16 +155,7 @@ class MathAgent(BaseAgent):
     def get_system_prompt(self) -> str:
         """Get the specialized math prompt including tool descriptions"""
         system_prompt = get_math_agent_prompt()
-        if self.tools:
-            tool_lines = [f"- {tool.name}: {tool.description}" for tool in self.tools]
-            tools_desc = "\n\nYou have access to the following tools:\n" + "\n".join(
-                tool_lines
-            )
-            tools_desc += '\n\nUse tools by indicating "[Tool Used] tool_name(args)" in your response.'
-        else:
-            tools_desc = ""
-
-        return f"{system_prompt}{tools_desc}"
+        return f"{system_prompt}{self.get_tools_prompt()}"
 
 
 class ResearchAgent(BaseAgent):
@@ -162,16 +169,7 @@ class ResearchAgent(BaseAgent):
     def get_system_prompt(self) -> str:
         """Get the specialized research prompt including tool descriptions"""
         system_prompt = get_research_agent_prompt()
-        if self.tools:
-            tool_lines = [f"- {tool.name}: {tool.description}" for tool in self.tools]
-            tools_desc = "\n\nYou have access to the following tools:\n" + "\n".join(
-                tool_lines
-            )
-            tools_desc += '\n\nUse tools by indicating "[Tool Used] tool_name(args)" in your response.'
-        else:
-            tools_desc = ""
-
-        return f"{system_prompt}{tools_desc}"
+        return f"{system_prompt}{self.get_tools_prompt()}"
 
 
 class PlanningAgent(BaseAgent):
@@ -185,16 +183,7 @@ class PlanningAgent(BaseAgent):
     def get_system_prompt(self) -> str:
         """Get the specialized planning prompt including tool descriptions"""
         system_prompt = get_planning_agent_prompt()
-        if self.tools:
-            tool_lines = [f"- {tool.name}: {tool.description}" for tool in self.tools]
-            tools_desc = "\n\nYou have access to the following tools:\n" + "\n".join(
-                tool_lines
-            )
-            tools_desc += '\n\nUse tools by indicating "[Tool Used] tool_name(args)" in your response.'
-        else:
-            tools_desc = ""
-
-        return f"{system_prompt}{tools_desc}"
+        return f"{system_prompt}{self.get_tools_prompt()}"
 
 
 class ConversationAssistantAgent(BaseAgent):
@@ -208,13 +197,4 @@ class ConversationAssistantAgent(BaseAgent):
     def get_system_prompt(self) -> str:
         """Get the specialized assistant prompt including tool descriptions"""
         system_prompt = get_conversation_assistant_agent_prompt()
-        if self.tools:
-            tool_lines = [f"- {tool.name}: {tool.description}" for tool in self.tools]
-            tools_desc = "\n\nYou have access to the following tools:\n" + "\n".join(
-                tool_lines
-            )
-            tools_desc += '\n\nUse tools by indicating "[Tool Used] tool_name(args)" in your response.'
-        else:
-            tools_desc = ""
-
-        return f"{system_prompt}{tools_desc}"
+        return f"{system_prompt}{self.get_tools_prompt()}"
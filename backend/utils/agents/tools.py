@@ -5,10 +5,19 @@ from typing import Optional, List
 from .image_agent import ImageAgent
 from services.mcp_service import detach_mcp_service
 from pydantic import BaseModel, Field
+from config.config import Config
 
 logger = logging.getLogger(__name__)
 
-image_agent = ImageAgent()
+_image_agent: Optional[ImageAgent] = None
+
+
+def get_image_agent() -> ImageAgent:
+    """Shared ImageAgent for the generate_image tool, created on first use"""
+    global _image_agent
+    if _image_agent is None:
+        _image_agent = ImageAgent()
+    return _image_agent
 
 
 class GenerateImageInput(BaseModel):
@@ -18,7 +27,7 @@ class GenerateImageInput(BaseModel):
 def generate_image(prompt: str) -> str:
     """Generate an image based on the given prompt"""
     try:
-        result = image_agent.generate_image(prompt)
+        result = get_image_agent().generate_image(prompt)
         image_path = f"/generated_images/{result['filename']}"
 
         return f"""I've created an image based on your description: "{prompt}".
@@ -62,8 +71,12 @@ get_time_tool = StructuredTool.from_function(
 TOOL_REGISTRY = {
     "assistant": [get_time_tool],
     "voice_assistant": [get_time_tool],
-    "image": [generate_image_tool],
-    "all": [generate_image_tool, get_time_tool],
+    "image": [generate_image_tool] if Config.ENABLE_IMAGE_GENERATION else [],
+    "all": (
+        [generate_image_tool, get_time_tool]
+        if Config.ENABLE_IMAGE_GENERATION
+        else [get_time_tool]
+    ),
 }
 
 
@@ -8,29 +8,29 @@ from fastapi import (
     Form,
 )
 from pydantic import BaseModel, Field
-import asyncio
-from services.llm_service import LLMService
-from services.conversation_service import ConversationService
+from services.llm_service import llm_service
+from services.conversation_service import conversation_service
+from services.graph_service import graph_service
+from utils.speculation_stats import speculation_stats
 import re
 from typing import Optional, Dict, Any
 import logging
 from fastapi.responses import JSONResponse, Response
-import shutil
 import os
-import torch
 from services.mcp_service import detach_mcp_service
-import datetime
-from utils.api.pdf_reader import router as pdf_router
+from utils.api.pdf_reader import router as pdf_router, read_pdf as read_pdf_text
 from utils.api.memory_endpoints import router as memory_router
 from config.config import Config
-
-from utils.stt.decode import run
+from utils.wrappers.llm_cache import llm_response_cache
+from utils.wrappers.llm_pool import get_pool_status
+from utils.tools.file_storage import UploadTooLargeError, save_upload
+from services.rag_service import rag_service
+from services.document_service import document_service
+from services.stt_service import STTOverloadedError, STTUnavailableError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-llm_service = LLMService()
-conversation_service = ConversationService()
 
 
 class ChatMessage(BaseModel):
@@ -46,6 +46,9 @@ class ChatResponse(BaseModel):
     session_id: Optional[str] = Field(
         default=None, description="Session ID used for this conversation"
     )
+    document_id: Optional[str] = Field(
+        default=None, description="ID of the uploaded document being indexed"
+    )
 
 
 @router.post("/chat", response_model=ChatResponse)
@@ -93,21 +96,14 @@ async def chat_with_image(
     """
     Process a chat message with an uploaded image/document and return a response with session support
     """
-    try:  # Create directory for uploaded files if it doesn't exist
-        os.makedirs(Config.UPLOADED_FILES_DIR, exist_ok=True)
-
-        # Generate a unique filename with extension
-        file_extension = os.path.splitext(image.filename)[1].lower()
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_filename = f"file_{timestamp}{file_extension}"
-        file_path = os.path.join(Config.UPLOADED_FILES_DIR, unique_filename)
-
-        # Save the uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+    try:
+        # Stored under its content hash: re-uploads reuse the same file
+        stored = await save_upload(image, Config.UPLOADED_FILES_DIR)
+        file_extension = os.path.splitext(stored.filename)[1]
+        file_path = stored.path
 
         # Create public URL for the file
-        file_url = f"/uploaded_files/{unique_filename}"
+        file_url = f"/uploaded_files/{stored.filename}"
 
         # Determine file type
         content_type = image.content_type or ""
@@ -117,10 +113,34 @@ async def chat_with_image(
         else:
             file_type = "image"
 
+        # Index documents for this session; later turns retrieve from them
+        document_id = None
+        original_name = image.filename or stored.filename
+        if document_service.available and document_service.is_supported(original_name):
+            await llm_service.ensure_initialized()
+            session_id = (
+                session_id
+                or llm_service.get_current_session_id()
+                or await llm_service.create_new_session()
+            )
+            job = document_service.submit(
+                session_id, file_path, original_name, content_hash=stored.sha256
+            )
+            document_id = job.doc_id
+            # Bounded wait so this turn can already use the document
+            await document_service.wait_until_indexed(
+                document_id, Config.SESSION_DOCS_UPLOAD_WAIT
+            )
+
         # Create message with file info
         message = text.strip()
         if not message:
-            if file_type == "pdf":
+            if document_id:
+                message = (
+                    f"I've uploaded the document {original_name}. "
+                    "Can you help me analyze it?"
+                )
+            elif file_type == "pdf":
                 message = f"I've uploaded this PDF document. Can you help me analyze it? {file_url}"
             else:
                 message = "I've uploaded this image. Can you describe what you see?"  # Process the message with session support
@@ -152,9 +172,14 @@ async def chat_with_image(
         current_session_id = llm_service.get_current_session_id()
 
         return ChatResponse(
-            response=response, image=image_url, session_id=current_session_id
+            response=response,
+            image=image_url,
+            session_id=current_session_id,
+            document_id=document_id,
         )
 
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error in chat_with_image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -171,17 +196,29 @@ async def ensure_llm_service_ready():
 @router.post("/transcribe")
 async def transcribe(audio: UploadFile = File(...)):
 
-    temp_file_path = f"{Config.AUDIO_UPLOAD_DIR}/{audio.filename}"
-    print(os.path.isdir(Config.AUDIO_UPLOAD_DIR))
-    with open(temp_file_path, "wb") as buffer:
-        shutil.copyfileobj(audio.file, buffer)
+    # Random name per request, so concurrent uploads never share a file
+    try:
+        stored = await save_upload(
+            audio,
+            Config.AUDIO_UPLOAD_DIR,
+            max_bytes=Config.MAX_AUDIO_UPLOAD_SIZE,
+            content_addressed=False,
+        )
+    except UploadTooLargeError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
 
     try:
-        result = conversation_service.stt(audio_path=temp_file_path)
+        result = await conversation_service.stt(audio_path=stored.path)
+    except STTOverloadedError as e:
+        return JSONResponse(
+            content={"error": str(e)}, status_code=503, headers={"Retry-After": "2"}
+        )
+    except STTUnavailableError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
     finally:
-        os.remove(temp_file_path)
+        os.remove(stored.path)
     return {"transcription": result}
 
 
@@ -227,9 +264,8 @@ async def add_mcp_config(config_body: dict):
             )
         for name, conf in mapping.items():
             await detach_mcp_service.add_config(name, conf)
-        # Reset LLM service to rebuild graph with new MCP tools
-        llm_service.initialized = False
-        llm_service.chat_agent = None
+        # Rebuild the graphs with the new MCP tools; the current ones serve meanwhile
+        graph_service.schedule_rebuild()
         updated = detach_mcp_service.list_configs()
         # Return using JSONResponse for correct headers
         return JSONResponse(status_code=201, content=updated)
@@ -245,8 +281,7 @@ async def delete_mcp_config(name: str):
     """Delete an existing MCP configuration"""
     try:
         await detach_mcp_service.delete_config(name)
-        llm_service.initialized = False
-        llm_service.chat_agent = None
+        graph_service.schedule_rebuild()
         return Response(status_code=204)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -261,18 +296,63 @@ async def get_mcp_status():
     return status
 
 
+@router.get("/llm/cache/stats")
+async def get_llm_cache_stats():
+    """Report LLM response cache hit rate and size"""
+    return {
+        "enabled": Config.ENABLE_LLM_RESPONSE_CACHE,
+        **llm_response_cache.get_stats(),
+    }
+
+
+@router.get("/agents/speculation/stats")
+async def get_speculation_stats():
+    """Report speculative agent hit rate and the work wasted on misses"""
+    return {
+        "enabled": Config.ENABLE_SPECULATIVE_AGENTS,
+        **speculation_stats.to_dict(),
+    }
+
+
+@router.get("/llm/pool/status")
+async def get_llm_pool_status():
+    """Report per-provider circuit state and queue depth"""
+    return get_pool_status()
+
+
+@router.get("/rag/cache/stats")
+async def get_rag_cache_stats():
+    """Report retrieval result and query-embedding cache hit rates"""
+    return rag_service.get_stats()
+
+
+@router.get("/documents/{doc_id}")
+async def get_document_status(doc_id: str):
+    """Indexing status of a document uploaded through chat-with-image"""
+    job = document_service.get_job(doc_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return job.to_dict()
+
+
+@router.get("/sessions/{session_id}/documents")
+async def list_session_documents(session_id: str):
+    """Documents uploaded to a session and their indexing status"""
+    return [job.to_dict() for job in document_service.list_jobs(session_id)]
+
+
 @router.websocket("/ws/conversation")
 async def websocket_conversation(websocket: WebSocket):
     await websocket.accept()
     while True:
         data: bytes = await websocket.receive_bytes()
         if len(data) > 0:
-            audio_tensor = torch.frombuffer(data, dtype=torch.float32).unsqueeze(0)
-            audio_tensor = audio_tensor * 32767
-
-            text_transcribe = await asyncio.to_thread(
-                conversation_service.stt, data=audio_tensor, audio_path=" "
-            )
+            # Raw float32 PCM; the STT worker converts it for the model
+            try:
+                text_transcribe = await conversation_service.stt(pcm=data)
+            except (STTOverloadedError, STTUnavailableError) as e:
+                await websocket.send_json({"error": str(e)})
+                continue
             text_response = await conversation_service.process_message(text_transcribe)
             audio_response = conversation_service.tts(text_response)
             audio_bytes_to_send: bytes = audio_response.getvalue()
@@ -280,45 +360,16 @@ async def websocket_conversation(websocket: WebSocket):
 
 
 @router.post("/read-pdf")
-async def read_pdf(pdf_path: str):
+async def read_pdf(
+    pdf_path: str,
+    start_page: int = 1,
+    end_page: Optional[int] = None,
+    stream: bool = False,
+):
     """
-    Read PDF content using PyPDF2 and return the text
+    Read PDF content and return the text (same extraction service as GET /pdf/read-pdf)
     """
-    try:
-        import PyPDF2
-
-        # Make sure the path starts from the proper location
-        if pdf_path.startswith("/uploaded_files/"):
-            filename = pdf_path.replace("/uploaded_files/", "")
-            pdf_path = os.path.join(Config.UPLOADED_FILES_DIR, filename)
-
-        # Check if file exists
-        if not os.path.exists(pdf_path):
-            raise HTTPException(
-                status_code=404, detail=f"PDF file not found: {pdf_path}"
-            )
-
-        # Open and read the PDF file
-        pdf_text = ""
-        with open(pdf_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                pdf_text += f"\n\n--- Page {page_num + 1} ---\n\n"
-                pdf_text += page.extract_text()
-
-        return {"text": pdf_text}
-
-    except ImportError:
-        return JSONResponse(
-            status_code=500,
-            content={
-                "detail": "PyPDF2 package not installed. Please install it with 'pip install PyPDF2'"
-            },
-        )
-    except Exception as e:
-        logger.error(f"Error reading PDF: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return await read_pdf_text(pdf_path, start_page, end_page, stream)
 
 
 # Include PDF router
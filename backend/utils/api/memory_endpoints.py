@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 from services.memory_service import memory_service
+from services.document_service import document_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -131,6 +132,7 @@ async def delete_session(session_id: str):
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
 
+        await document_service.delete_session(session_id)
         return {"message": "Session deleted successfully"}
     except HTTPException:
         raise
@@ -1,44 +1,65 @@
 from fastapi import APIRouter, HTTPException
+from typing import Optional
+import json
 import os
 import logging
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from config.config import Config
+from services.pdf_service import pdf_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def resolve_pdf_path(pdf_path: str) -> str:
+    """Map ``/uploaded_files/<name>`` URLs to an existing file in the upload dir"""
+    if pdf_path.startswith("/uploaded_files/"):
+        filename = pdf_path.replace("/uploaded_files/", "")
+        pdf_path = os.path.join(Config.UPLOADED_FILES_DIR, filename)
+
+    if not os.path.exists(pdf_path):
+        logger.error(f"PDF file not found: {pdf_path}")
+        raise HTTPException(status_code=404, detail=f"PDF file not found: {pdf_path}")
+    return pdf_path
+
+
+async def _stream_pages(pdf_path: str, start_page: int, end_page: Optional[int]):
+    """NDJSON: one ``{"page", "text"}`` line per page, then a ``{"done"}`` line"""
+    pages = 0
+    try:
+        async for page, text in pdf_service.iter_pages(pdf_path, start_page, end_page):
+            pages += 1
+            yield json.dumps({"page": page, "text": text}, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "pages": pages}) + "\n"
+    except Exception as e:
+        logger.error(f"Error streaming PDF: {str(e)}")
+        yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+
 @router.get("/read-pdf")
-async def read_pdf(pdf_path: str):
+async def read_pdf(
+    pdf_path: str,
+    start_page: int = 1,
+    end_page: Optional[int] = None,
+    stream: bool = False,
+):
     """
-    Read PDF content using PyPDF2 and return the text
+    Read PDF content and return the text; pages are 1-based and inclusive.
+    With ``stream=true`` pages are sent as NDJSON as soon as they are extracted.
     """
     try:
-        import PyPDF2
-
-        # Make sure the path starts from the proper location
-        if pdf_path.startswith("/uploaded_files/"):
-            filename = pdf_path.replace("/uploaded_files/", "")
-            pdf_path = os.path.join(Config.UPLOADED_FILES_DIR, filename)
+        import PyPDF2  # noqa: F401
 
+        pdf_path = resolve_pdf_path(pdf_path)
         logger.info(f"Attempting to read PDF from path: {pdf_path}")
 
-        # Check if file exists
-        if not os.path.exists(pdf_path):
-            logger.error(f"PDF file not found: {pdf_path}")
-            raise HTTPException(
-                status_code=404, detail=f"PDF file not found: {pdf_path}"
+        if stream:
+            return StreamingResponse(
+                _stream_pages(pdf_path, start_page, end_page),
+                media_type="application/x-ndjson",
             )
 
-        # Open and read the PDF file
-        pdf_text = ""
-        with open(pdf_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                pdf_text += f"\n\n--- Page {page_num + 1} ---\n\n"
-                pdf_text += page.extract_text()
-
+        pdf_text = await pdf_service.extract_text(pdf_path, start_page, end_page)
         logger.info(f"Successfully extracted {len(pdf_text)} characters from PDF")
         return {"text": pdf_text}
 
@@ -49,7 +70,8 @@ async def read_pdf(pdf_path: str):
                 "detail": "PyPDF2 package not installed. Please install it with 'pip install PyPDF2'"
             },
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error reading PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-        raise HTTPException(status_code=500, detail=str(e))
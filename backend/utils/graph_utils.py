@@ -1,5 +1,6 @@
-from typing import Dict, List, Any, TypedDict, Optional
-from langchain_core.messages import BaseMessage, HumanMessage
+from dataclasses import dataclass, field
+from typing import Annotated, Dict, List, Any, Pattern, Sequence, TypedDict, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 from utils.agents.router_agent import (
     RouterAgent,
@@ -10,278 +11,574 @@ from utils.agents.router_agent import (
     ConversationAssistantAgent,
 )
 from utils.agents.image_agent import ImageAgent
+from utils.agents.rag_agent import RAGAgent
+from services.rag_service import rag_service
+from config.prompts import get_parallel_route_hint, get_rag_route_hint
+from config.config import Config
+from utils.speculation_stats import speculation_stats
+import asyncio
 import logging
+import operator
 import re
+import time
+import uuid
 from langchain_core.runnables import RunnableConfig
 
 logger = logging.getLogger(__name__)
 
 
 class AgentState(TypedDict):
+    # The user's message as typed; routing, speculation and history use it
     input: str
-    chat_history: List[BaseMessage]
+    # Excerpts from the session's documents, shown to the answering agents only
+    context: Optional[str]
+    # Nodes return only the messages they add; LangGraph appends them
+    chat_history: Annotated[List[BaseMessage], operator.add]
     current_agent: Optional[str]
     output: Optional[str]
     artifacts: Optional[Dict[str, Any]]
-
-
-async def create_agent_graph():
-    """Create an async-aware directed graph for agent routing and execution"""
+    # Agents picked by the router for this turn; several in planner mode
+    planned_agents: List[str]
+    # time.monotonic() by which fanned-out agents must answer
+    deadline: Optional[float]
+    # One entry per agent run, merged into output by the aggregate node
+    agent_results: Annotated[List[Dict[str, Any]], operator.add]
+    # Agent that answered the previous turn, set by the caller
+    previous_agent: Optional[str]
+    # Key in _speculations of a speculative run the router agreed with; the
+    # task itself stays out of the state, which must remain plain data
+    speculation_id: Optional[str]
+
+
+ROUTE_PATTERN = re.compile(r"ROUTE:\s*([^\n]*)", re.IGNORECASE)
+ROUTE_SEPARATOR = re.compile(r"[,+&/]|\band\b", re.IGNORECASE)
+AGGREGATE_NODE = "aggregate"
+CHARS_PER_TOKEN = 4  # rough estimate for reporting wasted speculative work
+
+# In-flight speculative runs kept by the router, {"agent", "task", "started"}
+# per graph invocation. The agent node takes its entry; the aggregate node
+# cancels whatever is left.
+_speculations: Dict[str, Dict[str, Any]] = {}
+
+IMAGE_KEYWORDS = [
+    "draw",
+    "image",
+    "picture",
+    "generate image",
+    "create image",
+    "visualize",
+    "create a picture",
+    "make an image",
+    "render",
+    "illustration",
+    "artwork",
+    "design",
+    "sketch",
+    "depict",
+    "drawing of",
+    "photo of",
+    "show me",
+    "create a visual",
+]
+
+
+def compile_keywords(
+    keywords: Sequence[str], whole_words: bool = False
+) -> Pattern[str]:
+    """One case-insensitive alternation matching any keyword (substrings by default)"""
+    # Longest first so overlapping keywords ("image", "make an image") are equivalent
+    ordered = sorted(set(keywords), key=len, reverse=True)
+    pattern = "|".join(re.escape(keyword) for keyword in ordered)
+    if whole_words:
+        pattern = rf"\b(?:{pattern})\b"
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# Cheap local guess at the router's decision, used only to pick what to speculate on
+SPECULATION_KEYWORDS = {
+    "math": [
+        "calculate",
+        "compute",
+        "solve",
+        "equation",
+        "integral",
+        "derivative",
+        "percent",
+        "probability",
+        "tính",
+        "giải",
+        "phương trình",
+    ],
+    "research": [
+        "what is",
+        "who is",
+        "who was",
+        "when did",
+        "history of",
+        "latest",
+        "news",
+        "là gì",
+        "là ai",
+        "tìm hiểu",
+    ],
+    "planning": [
+        "plan",
+        "schedule",
+        "roadmap",
+        "timeline",
+        "itinerary",
+        "to-do",
+        "kế hoạch",
+        "lịch trình",
+    ],
+}
+SPECULATION_PATTERNS = {
+    agent: compile_keywords(keywords, whole_words=True)
+    for agent, keywords in SPECULATION_KEYWORDS.items()
+}
+ARITHMETIC_PATTERN = re.compile(r"\d\s*[-+*/^×÷=]\s*\d")
+
+
+def predict_agent(
+    user_input: str, previous_agent: Optional[str], candidates: Sequence[str]
+) -> Optional[str]:
+    """An unambiguous keyword match, else the previous turn's agent, else None.
+
+    After a fan-out ``previous_agent`` lists every agent that answered
+    ("research,math"); the first one, the router's primary pick, counts.
+    """
+    matched = [
+        agent
+        for agent, pattern in SPECULATION_PATTERNS.items()
+        if agent in candidates and pattern.search(user_input)
+    ]
+    if (
+        "math" in candidates
+        and "math" not in matched
+        and ARITHMETIC_PATTERN.search(user_input)
+    ):
+        matched.append("math")
+    if matched:
+        return matched[0] if len(matched) == 1 else None
+    if previous_agent:
+        previous_agent = previous_agent.split(",")[0].strip()
+    return previous_agent if previous_agent in candidates else None
+
+
+def _estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(len(str(message.content)) for message in messages) // CHARS_PER_TOKEN
+
+
+def parse_route(content: str) -> List[str]:
+    """Agent names from the router's "ROUTE: A[, B, ...]" line, in order"""
+    match = ROUTE_PATTERN.search(content)
+    if not match:
+        return []
+    names: List[str] = []
+    for part in ROUTE_SEPARATOR.split(match.group(1)):
+        words = part.split()
+        name = words[0].strip("[]*\"'.:").lower() if words else ""
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+@dataclass
+class RoutingRule:
+    """Send the turn to ``target`` when the input mentions any keyword.
+
+    Only overrides a router decision of ``when_routed_to``, and only if
+    ``target`` is an agent of the graph.
+    """
+
+    target: str
+    keywords: Sequence[str]
+    when_routed_to: str = "assistant"
+    pattern: Pattern[str] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.pattern = compile_keywords(self.keywords)
+
+    def matches(self, text: str) -> bool:
+        return self.pattern.search(text) is not None
+
+
+@dataclass
+class GraphSpec:
+    """Declarative description of an agent graph, compiled by ``build_graph``.
+
+    ``agents`` maps node names to agents with initialized tools and must
+    contain ``"router"`` and ``default_agent``. With ``max_parallel_agents``
+    above 1 the router may fan a turn out to that many agents at once.
+    """
+
+    name: str
+    agents: Dict[str, Any]
+    rules: List[RoutingRule] = field(default_factory=list)
+    default_agent: str = "assistant"
+    max_parallel_agents: int = 1
+    # Agents that may start alongside the router; empty disables speculation
+    speculative_agents: Sequence[str] = ()
+
+
+def _max_parallel_agents() -> int:
+    return Config.MAX_PARALLEL_AGENTS if Config.ENABLE_PARALLEL_AGENTS else 1
+
+
+def _speculative_agents() -> List[str]:
+    if not Config.ENABLE_SPECULATIVE_AGENTS:
+        return []
+    return [name.strip() for name in Config.SPECULATIVE_AGENTS if name.strip()]
+
+
+async def create_shared_agents() -> Dict[str, Any]:
+    """Router and specialists that are identical in the text and voice graphs.
+
+    Their tools (including the MCP listing) are initialized here once, so
+    graphs built from the same shared agents don't repeat that work.
+    """
     agents = {
         "router": RouterAgent(),
-        "assistant": AssistantAgent(),
-        "image": ImageAgent(),
         "math": MathAgent(),
         "research": ResearchAgent(),
         "planning": PlanningAgent(),
     }
-
-    # Initialize all agents' tools in parallel
-    import asyncio
-
     await asyncio.gather(*(agent.initialize_tools() for agent in agents.values()))
-
-    # Initialize MCP tools information for router agent
-    router_agent = agents["router"]
-    if hasattr(router_agent, "initialize_mcp_tools_info"):
-        await router_agent.initialize_mcp_tools_info()
-
-    workflow = StateGraph(AgentState)
-
-    async def create_agent_node(agent_name: str):
-        async def node_func(
-            state: AgentState, config: Optional[RunnableConfig] = None
-        ) -> AgentState:
-            agent = agents[agent_name]
-            logger.info(f"{agent_name.capitalize()} agent processing request")
-
-            human_message = HumanMessage(content=state["input"])
-            chat_history = state.get("chat_history", [])
-
-            if agent_name == "router":
-                response = await agent.invoke(
-                    message=human_message, chat_history=chat_history
-                )
-                ai_message = response["messages"][0]
-                content = ai_message.content
-                match = re.search(r"ROUTE:\s*(.*?)(?:\s|$)", content, re.IGNORECASE)
-
-                updated_state = state.copy()
-                if match:
-                    agent_type = match.group(1).strip().lower()
-                    updated_state["current_agent"] = agent_type
-                    logger.info(f"Router selected agent: {agent_type}")
-                else:
-                    updated_state["current_agent"] = "assistant"
-                    logger.info("Router defaulting to assistant agent")
-
-                return updated_state
-            else:
-                response = await agent.invoke(
-                    message=human_message, chat_history=chat_history
-                )
-                updated_state = state.copy()
-
-                if "delegation" in response:
-                    delegation = response["delegation"]
-                    target_agent = delegation.get("target_agent")
-                    logger.info(f"Agent {agent_name} delegated to {target_agent}")
-
-                    updated_state["current_agent"] = target_agent
-                    updated_state["output"] = response["messages"][0].content
-                    updated_state["chat_history"] = (
-                        chat_history + [human_message] + response["messages"]
-                    )
-                    return updated_state
-
-                updated_state["output"] = response["messages"][0].content
-                updated_state["chat_history"] = (
-                    chat_history + [human_message] + response["messages"]
-                )
-
-                if "artifacts" in response and response["artifacts"]:
-                    updated_state["artifacts"] = response["artifacts"]
-
-                return updated_state
-
-        return node_func
-
-    # Add nodes to the workflow - corrected to properly await the coroutine
-    for agent_name in agents:
-        node_func = await create_agent_node(agent_name)
-        workflow.add_node(agent_name, node_func)
-
-    workflow.set_entry_point("router")
-
-    def route_to_agent(state: AgentState) -> str:
-        """Route to the appropriate agent based on router's decision"""
-        current_agent = state.get("current_agent")
-        if current_agent is None:
-            logger.info("No agent specified, defaulting to assistant")
-            return "assistant"
-
-        if current_agent == "assistant":
-            user_input = state.get("input", "").lower()
-            image_keywords = [
-                "draw",
-                "image",
-                "picture",
-                "generate image",
-                "create image",
-                "visualize",
-                "create a picture",
-                "make an image",
-                "render",
-                "illustration",
-                "artwork",
-                "design",
-                "sketch",
-                "depict",
-                "drawing of",
-                "photo of",
-                "show me",
-                "create a visual",
-            ]
-
-            if any(keyword in user_input for keyword in image_keywords):
-                logger.info("Image keyword detected, routing to image agent instead")
-                return "image"
-
-        current_agent = current_agent.lower()
-        logger.info(f"Routing to agent: {current_agent}")
-
-        return current_agent if current_agent in agents else "assistant"
-
-    workflow.add_conditional_edges(
-        "router", route_to_agent, {name: name for name in agents if name != "router"}
+    await agents["router"].initialize_mcp_tools_info()
+    if _max_parallel_agents() > 1:
+        agents["router"].add_route_hint(get_parallel_route_hint())
+    return agents
+
+
+async def create_agent_graphs() -> Dict[str, Any]:
+    """Build the text ("chat") and voice graphs on one set of shared agents"""
+    shared_agents = await create_shared_agents()
+    chat_graph = await create_agent_graph(shared_agents)
+    voice_graph = await create_conversation_agent_graph(shared_agents)
+    return {"chat": chat_graph, "voice": voice_graph}
+
+
+def _with_shared_agents(
+    shared_agents: Dict[str, Any], own_agents: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Router first, then the graph's own assistant, then the specialists.
+
+    A graph may bring its own ``"router"``, e.g. one advertising an agent
+    that only that graph has.
+    """
+    agents = {"router": own_agents.get("router", shared_agents["router"])}
+    agents.update(
+        (name, agent) for name, agent in own_agents.items() if name != "router"
     )
-
-    for name in agents:
-        if name != "router":
-            workflow.add_edge(name, END)
-
-    try:
-        compiled_graph = workflow.compile()
-        logger.info("Graph compilation successful")
-        return compiled_graph
-    except Exception as e:
-        logger.error(f"Graph compilation error: {str(e)}")
-        raise
+    agents.update(
+        (name, agent) for name, agent in shared_agents.items() if name != "router"
+    )
+    return agents
 
 
-async def create_conversation_agent_graph():
+async def create_agent_graph(shared_agents: Optional[Dict[str, Any]] = None):
     """Create an async-aware directed graph for agent routing and execution"""
-    agents = {
-        "router": RouterAgent(),
-        "assistant": ConversationAssistantAgent(),
-        "math": MathAgent(),
-        "research": ResearchAgent(),
-        "planning": PlanningAgent(),
-    }
-
-    # Initialize all agents' tools in parallel
-    import asyncio
-
-    await asyncio.gather(*(agent.initialize_tools() for agent in agents.values()))
+    if shared_agents is None:
+        shared_agents = await create_shared_agents()
+    own_agents = {"assistant": AssistantAgent()}
+    if Config.ENABLE_IMAGE_GENERATION:
+        own_agents["image"] = ImageAgent()
+
+    # Document-grounded answers, only when the shared retriever is connected
+    await rag_service.initialize()
+    if rag_service.available:
+        own_agents["rag"] = RAGAgent(retriever=rag_service.retriever)
+
+    # Shared agents are already initialized; only this graph's own need tools
+    await asyncio.gather(*(agent.initialize_tools() for agent in own_agents.values()))
+    if "rag" in own_agents:
+        # The voice graph has no rag node, so the shared router must not offer it
+        own_agents["router"] = shared_agents["router"].with_route_hint(
+            get_rag_route_hint()
+        )
+
+    return build_graph(
+        GraphSpec(
+            name="chat",
+            agents=_with_shared_agents(shared_agents, own_agents),
+            rules=[RoutingRule(target="image", keywords=IMAGE_KEYWORDS)],
+            max_parallel_agents=_max_parallel_agents(),
+            speculative_agents=_speculative_agents(),
+        )
+    )
 
-    # Initialize MCP tools information for router agent
-    router_agent = agents["router"]
-    if hasattr(router_agent, "initialize_mcp_tools_info"):
-        await router_agent.initialize_mcp_tools_info()
 
-    workflow = StateGraph(AgentState)
-
-    async def create_agent_node(agent_name: str):
-        async def node_func(
-            state: AgentState, config: Optional[RunnableConfig] = None
-        ) -> AgentState:
-            agent = agents[agent_name]
-            logger.info(f"{agent_name.capitalize()} agent processing request")
+async def create_conversation_agent_graph(
+    shared_agents: Optional[Dict[str, Any]] = None,
+):
+    """Create an async-aware directed graph for agent routing and execution"""
+    if shared_agents is None:
+        shared_agents = await create_shared_agents()
+    own_agents = {"assistant": ConversationAssistantAgent()}
+    await asyncio.gather(*(agent.initialize_tools() for agent in own_agents.values()))
+
+    return build_graph(
+        GraphSpec(
+            name="voice",
+            agents=_with_shared_agents(shared_agents, own_agents),
+            max_parallel_agents=_max_parallel_agents(),
+            speculative_agents=_speculative_agents(),
+        )
+    )
 
-            human_message = HumanMessage(content=state["input"])
-            chat_history = state.get("chat_history", [])
 
-            if agent_name == "router":
-                response = await agent.invoke(
-                    message=human_message, chat_history=chat_history
+def _make_router_node(spec: GraphSpec):
+    router_agent = spec.agents["router"]
+    targets = [name for name in spec.agents if name != "router"]
+    rules = [
+        rule
+        for rule in spec.rules
+        if rule.target in spec.agents and rule.when_routed_to in spec.agents
+    ]
+
+    def resolve(name: str, user_input: str) -> Optional[str]:
+        for rule in rules:
+            if name == rule.when_routed_to and rule.matches(user_input):
+                logger.info(
+                    f"Routing rule matched, routing to {rule.target} agent instead"
                 )
-                ai_message = response["messages"][0]
-                content = ai_message.content
-                match = re.search(r"ROUTE:\s*(.*?)(?:\s|$)", content, re.IGNORECASE)
-
-                updated_state = state.copy()
-                if match:
-                    agent_type = match.group(1).strip().lower()
-                    updated_state["current_agent"] = agent_type
-                    logger.info(f"Router selected agent: {agent_type}")
-                else:
-                    updated_state["current_agent"] = "assistant"
-                    logger.info("Router defaulting to assistant agent")
-
-                return updated_state
-            else:
-                response = await agent.invoke(
-                    message=human_message, chat_history=chat_history
+                return rule.target
+        return name if name in targets else None
+
+    speculative = [name for name in spec.speculative_agents if name in targets]
+
+    def speculate(state: AgentState) -> Optional[Dict[str, Any]]:
+        """Start the predicted agent now; the router decides whether to keep it"""
+        predicted = predict_agent(
+            state["input"], state.get("previous_agent"), speculative
+        )
+        if predicted is None:
+            return None
+        logger.info(f"Speculatively starting {predicted} agent")
+        task = asyncio.create_task(
+            spec.agents[predicted].invoke(
+                message=HumanMessage(content=state["input"]),
+                chat_history=state.get("chat_history", []),
+                context=state.get("context"),
+            )
+        )
+        return {"agent": predicted, "task": task, "started": time.monotonic()}
+
+    def discard(speculation: Dict[str, Any], state: AgentState) -> None:
+        task = speculation["task"]
+        agent = spec.agents[speculation["agent"]]
+        # The prompt was sent either way; output only counts if it finished
+        prompt = [*state.get("chat_history", []), HumanMessage(content=state["input"])]
+        if state.get("context"):
+            prompt.append(HumanMessage(content=state["context"]))
+        if hasattr(agent, "get_system_message"):
+            prompt.insert(0, agent.get_system_message())
+        wasted_tokens = _estimate_tokens(prompt)
+        if task.done() and not task.cancelled() and task.exception() is None:
+            wasted_tokens += _estimate_tokens(task.result().get("messages", []))
+        else:
+            task.cancel()
+        speculation_stats.record_miss(
+            speculation["agent"],
+            time.monotonic() - speculation["started"],
+            wasted_tokens,
+        )
+
+    async def router_node(
+        state: AgentState, config: Optional[RunnableConfig] = None
+    ) -> Dict[str, Any]:
+        logger.info("Router agent processing request")
+        speculation = speculate(state) if speculative else None
+        started = time.monotonic()
+        try:
+            response = await router_agent.invoke(
+                message=HumanMessage(content=state["input"]),
+                chat_history=state.get("chat_history", []),
+            )
+        except BaseException:
+            if speculation is not None:
+                speculation["task"].cancel()
+            raise
+        names = parse_route(response["messages"][0].content)
+        if not names:
+            logger.info("Router defaulting to assistant agent")
+            names = [spec.default_agent]
+
+        planned: List[str] = []
+        for name in names:
+            agent_name = resolve(name, state["input"])
+            if agent_name and agent_name not in planned:
+                planned.append(agent_name)
+        # Unknown names are dropped; the default agent answers if none is left
+        planned = planned[: spec.max_parallel_agents] or [spec.default_agent]
+        logger.info(f"Router selected agent: {', '.join(planned)}")
+
+        update: Dict[str, Any] = {
+            "current_agent": planned[0],
+            "planned_agents": planned,
+            "speculation_id": None,
+        }
+        if len(planned) > 1:
+            update["deadline"] = time.monotonic() + Config.PARALLEL_AGENTS_DEADLINE
+        if speculation is not None:
+            if speculation["agent"] in planned:
+                logger.info(f"Speculation hit: {speculation['agent']}")
+                speculation_stats.record_hit(
+                    speculation["agent"], time.monotonic() - started
                 )
-                updated_state = state.copy()
-
-                if "delegation" in response:
-                    delegation = response["delegation"]
-                    target_agent = delegation.get("target_agent")
-                    logger.info(f"Agent {agent_name} delegated to {target_agent}")
-
-                    updated_state["current_agent"] = target_agent
-                    updated_state["output"] = response["messages"][0].content
-                    updated_state["chat_history"] = (
-                        chat_history + [human_message] + response["messages"]
-                    )
-                    return updated_state
-
-                updated_state["output"] = response["messages"][0].content
-                updated_state["chat_history"] = (
-                    chat_history + [human_message] + response["messages"]
+                speculation_id = uuid.uuid4().hex
+                _speculations[speculation_id] = speculation
+                update["speculation_id"] = speculation_id
+            else:
+                logger.info(f"Speculation miss: {speculation['agent']} cancelled")
+                discard(speculation, state)
+        return update
+
+    return router_node
+
+
+def _make_agent_node(agent_name: str, agent):
+    async def agent_node(
+        state: AgentState, config: Optional[RunnableConfig] = None
+    ) -> Dict[str, Any]:
+        logger.info(f"{agent_name.capitalize()} agent processing request")
+        speculation = _speculations.get(state.get("speculation_id") or "")
+        if speculation is not None and speculation["agent"] == agent_name:
+            # Started alongside the router, possibly already finished
+            call = _speculations.pop(state["speculation_id"])["task"]
+        else:
+            call = agent.invoke(
+                message=HumanMessage(content=state["input"]),
+                chat_history=state.get("chat_history", []),
+                context=state.get("context"),
+            )
+        deadline = state.get("deadline")
+        if deadline is None:
+            response = await call
+        else:
+            # Fanned out: a slow or failing agent must not sink the others
+            try:
+                remaining = max(deadline - time.monotonic(), 0)
+                response = await asyncio.wait_for(call, remaining)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"{agent_name.capitalize()} agent missed the turn deadline"
                 )
+                return {"agent_results": [{"agent": agent_name, "error": "timed out"}]}
+            except Exception as e:
+                logger.error(f"{agent_name.capitalize()} agent failed: {e}")
+                return {"agent_results": [{"agent": agent_name, "error": str(e)}]}
+
+        result = {
+            "agent": agent_name,
+            "output": response["messages"][0].content,
+            "messages": response["messages"],
+            "artifacts": response.get("artifacts") or {},
+        }
+        if "delegation" in response:
+            result["delegate_to"] = response["delegation"].get("target_agent")
+            logger.info(f"Agent {agent_name} delegated to {result['delegate_to']}")
+        return {"agent_results": [result]}
+
+    return agent_node
+
+
+def _make_aggregate_node(spec: GraphSpec):
+    async def aggregate_node(
+        state: AgentState, config: Optional[RunnableConfig] = None
+    ) -> Dict[str, Any]:
+        # Only left over if the graph took an unexpected path
+        leftover = _speculations.pop(state.get("speculation_id") or "", None)
+        if leftover is not None:
+            leftover["task"].cancel()
+
+        human_message = HumanMessage(content=state["input"])
+        results = state.get("agent_results") or []
+        answered = [result for result in results if "output" in result]
+
+        if len(results) == 1 and answered:
+            result = answered[0]
+            update: Dict[str, Any] = {
+                "output": result["output"],
+                "chat_history": [human_message, *result["messages"]],
+                "current_agent": result.get("delegate_to") or result["agent"],
+            }
+            if result["artifacts"]:
+                update["artifacts"] = result["artifacts"]
+            return update
+
+        # Fan-out: one section per agent, in the order the router listed them
+        order = state.get("planned_agents") or []
+        answered.sort(key=lambda result: order.index(result["agent"]))
+        sections = [
+            f"**{result['agent'].capitalize()}**\n\n{result['output']}"
+            for result in answered
+        ]
+        missed = [result["agent"] for result in results if "output" not in result]
+        if missed and answered:
+            sections.append(
+                f"_No answer from: {', '.join(name.capitalize() for name in missed)}._"
+            )
+        output = (
+            "\n\n".join(sections)
+            if answered
+            else "Sorry, none of the agents could answer in time. Please try again."
+        )
+        logger.info(
+            f"Aggregated {len(answered)}/{len(results)} agent answers"
+            + (f", missed: {', '.join(missed)}" if missed else "")
+        )
+
+        artifacts: Dict[str, Any] = {}
+        for result in answered:
+            artifacts.update(result["artifacts"])
+        update = {
+            "output": output,
+            "chat_history": [human_message, AIMessage(content=output)],
+            "current_agent": ",".join(result["agent"] for result in answered)
+            or spec.default_agent,
+        }
+        if artifacts:
+            update["artifacts"] = artifacts
+        return update
+
+    return aggregate_node
+
+
+def build_graph(spec: GraphSpec):
+    """Compile a ``GraphSpec`` into a LangGraph.
+
+    router -> one agent (or several in parallel) -> aggregate -> END
+    """
+    agents = spec.agents
+    targets = [name for name in agents if name != "router"]
 
-                if "artifacts" in response and response["artifacts"]:
-                    updated_state["artifacts"] = response["artifacts"]
-
-                return updated_state
-
-        return node_func
-
-    # Add nodes to the workflow - corrected to properly await the coroutine
-    for agent_name in agents:
-        node_func = await create_agent_node(agent_name)
-        workflow.add_node(agent_name, node_func)
-
+    workflow = StateGraph(AgentState)
+    workflow.add_node("router", _make_router_node(spec))
+    for name in targets:
+        workflow.add_node(name, _make_agent_node(name, agents[name]))
+    workflow.add_node(AGGREGATE_NODE, _make_aggregate_node(spec))
     workflow.set_entry_point("router")
 
-    def route_to_agent(state: AgentState) -> str:
-        """Route to the appropriate agent based on router's decision"""
-        current_agent = state.get("current_agent")
-        if current_agent is None:
-            logger.info("No agent specified, defaulting to assistant")
-            return "assistant"
-
-        if current_agent == "assistant":
-            user_input = state.get("input", "").lower()
-
-        current_agent = current_agent.lower()
-        logger.info(f"Routing to agent: {current_agent}")
-
-        return current_agent if current_agent in agents else "assistant"
+    def route_to_agent(state: AgentState) -> List[str]:
+        """Fan out to every agent the router planned for this turn"""
+        planned = state.get("planned_agents")
+        if not planned:
+            logger.info(f"No agent specified, defaulting to {spec.default_agent}")
+            return [spec.default_agent]
+        return planned
 
     workflow.add_conditional_edges(
-        "router", route_to_agent, {name: name for name in agents if name != "router"}
+        "router", route_to_agent, {name: name for name in targets}
     )
-
-    for name in agents:
-        if name != "router":
-            workflow.add_edge(name, END)
+    # Fan-in: the aggregate node runs once every planned agent has finished
+    for name in targets:
+        workflow.add_edge(name, AGGREGATE_NODE)
+    workflow.add_edge(AGGREGATE_NODE, END)
 
     try:
         compiled_graph = workflow.compile()
-        logger.info("Graph compilation successful")
+        logger.info(f"Graph compilation successful ({spec.name}: {', '.join(agents)})")
         return compiled_graph
     except Exception as e:
         logger.error(f"Graph compilation error: {str(e)}")
@@ -0,0 +1,49 @@
+"""Hit rate and wasted work of speculative agent runs"""
+
+from typing import Any, Dict
+
+
+class SpeculationStats:
+    """Outcome of speculative agent runs started alongside the router"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.hidden_routing_seconds = 0.0
+        self.wasted_seconds = 0.0
+        # Estimated from message lengths; cancelled runs count their prompt only
+        self.wasted_tokens = 0
+        self.by_agent: Dict[str, Dict[str, int]] = {}
+
+    def _agent(self, name: str) -> Dict[str, int]:
+        return self.by_agent.setdefault(name, {"hits": 0, "misses": 0})
+
+    def record_hit(self, agent: str, routing_seconds: float) -> None:
+        self.hits += 1
+        self._agent(agent)["hits"] += 1
+        self.hidden_routing_seconds += routing_seconds
+
+    def record_miss(
+        self, agent: str, wasted_seconds: float, wasted_tokens: int
+    ) -> None:
+        self.misses += 1
+        self._agent(agent)["misses"] += 1
+        self.wasted_seconds += wasted_seconds
+        self.wasted_tokens += wasted_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "speculated": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "hidden_routing_seconds": round(self.hidden_routing_seconds, 3),
+            "wasted_seconds": round(self.wasted_seconds, 3),
+            "wasted_tokens_estimate": self.wasted_tokens,
+            "by_agent": self.by_agent,
+        }
+
+
+# Shared by the agent graphs and the status endpoints
+speculation_stats = SpeculationStats()
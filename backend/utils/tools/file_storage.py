@@ -0,0 +1,113 @@
+"""Async storage of uploaded files.
+
+Uploads are copied in chunks with the blocking writes in a worker thread,
+hashed (SHA-256) while they are written and aborted as soon as they exceed
+the size limit. Finished files are stored under their hash, so uploading
+the same content twice keeps one copy and names can never collide.
+"""
+
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import uuid
+
+from fastapi import UploadFile
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_SAFE_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class UploadTooLargeError(Exception):
+    """The upload exceeded its size limit and was discarded"""
+
+    def __init__(self, max_bytes: int):
+        limit_mb = max_bytes // (1024 * 1024)
+        super().__init__(f"File exceeds the {limit_mb} MB upload limit")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredFile:
+    path: str
+    filename: str
+    sha256: str
+    size: int
+    deduplicated: bool = False
+
+
+def safe_extension(filename: Optional[str]) -> str:
+    """Lower-cased extension of a client-supplied name, or "" if it looks unsafe"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _SAFE_EXTENSION.match(extension) else ""
+
+
+def _write_chunk(buffer: BinaryIO, digest, chunk: bytes) -> None:
+    buffer.write(chunk)
+    digest.update(chunk)
+
+
+async def save_upload(
+    upload: UploadFile,
+    directory: str,
+    max_bytes: int = Config.MAX_UPLOAD_SIZE,
+    content_addressed: bool = True,
+) -> StoredFile:
+    """Stream ``upload`` into ``directory``.
+
+    With ``content_addressed`` the file is named ``<sha256><ext>`` and an
+    existing copy is reused; otherwise it gets a unique random name (for
+    files deleted after use). The partial file is removed on any failure.
+    """
+    os.makedirs(directory, exist_ok=True)
+    extension = safe_extension(upload.filename)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := await upload.read(Config.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+
+        sha256 = digest.hexdigest()
+        filename = f"{sha256 if content_addressed else uuid.uuid4().hex}{extension}"
+        path = os.path.join(directory, filename)
+        if content_addressed and os.path.exists(path):
+            os.remove(temp_path)
+            logger.info(f"Upload {upload.filename} already stored as {filename}")
+            return StoredFile(path, filename, sha256, size, deduplicated=True)
+
+        # Atomic, so readers never see a half-written file
+        os.replace(temp_path, path)
+        return StoredFile(path, filename, sha256, size)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        await upload.close()
+
+
+def remove_partial_uploads(directory: str) -> int:
+    """Delete ``.part`` files left behind by a crash mid-upload"""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        if name.startswith(".upload-") and name.endswith(".part"):
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove partial upload {name}: {e}")
+    return removed
@@ -0,0 +1,445 @@
+"""Embedded vector index for installs without a Qdrant server.
+
+Vectors live in NumPy files next to ``database/``: a memory-mapped float32
+matrix, an optional int8 copy for search, an optional IVF partitioning, and
+CSR sparse vectors for the BM25 leg of hybrid search. Each save writes a new
+``v<version>/`` directory and then switches the ``CURRENT`` pointer file, so
+readers never see files from two different versions. ``LocalSearchBackend``
+exposes the same interface as ``QdrantSearchBackend`` so ``HybridRetriever``
+and ``RAGAgent`` work unchanged.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _quantize_int8(matrix: np.ndarray):
+    """Symmetric per-row int8 quantization; returns (codes, scales)"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _kmeans(
+    matrix: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means on a sample; returns L2-normalized centroids"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), nlist * 64)
+    sample = matrix[rng.choice(len(matrix), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+class LocalVectorIndex:
+    """Cosine vector index persisted as NumPy files in ``path``"""
+
+    def __init__(self, path: str, quantization: str = "none", nlist: int = 0):
+        self.path = path
+        self.quantization = quantization
+        self.nlist = nlist
+        self.version = "0"
+        self._dir = path
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self._ivf_order: Optional[np.ndarray] = None
+        self._ivf_offsets: Optional[np.ndarray] = None
+        self.sparse: Optional[Dict[str, np.ndarray]] = None
+        self._postings = None
+
+    # Building
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        payloads: Sequence[Dict[str, Any]],
+        sparse_vectors: Optional[Sequence[Any]] = None,
+    ) -> None:
+        """Insert or replace points; call ``save`` to rebuild search structures"""
+        self.delete(ids)
+        new_vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        old_vectors = np.asarray(self.vectors) if self.vectors is not None else None
+        if old_vectors is None:
+            self.vectors = new_vectors
+        else:
+            self.vectors = np.vstack([old_vectors, new_vectors])
+        self.ids.extend(ids)
+        self.payloads.extend(payloads)
+
+        if sparse_vectors is not None or self.sparse is not None:
+            old_count = self.count - len(ids)
+            if self.sparse is not None:
+                old_rows = self._sparse_rows()
+            else:
+                old_rows = [([], [])] * old_count
+            if sparse_vectors is not None:
+                rows = [(list(v.indices), list(v.values)) for v in sparse_vectors]
+            else:
+                rows = [([], [])] * len(ids)
+            self._set_sparse(old_rows + rows)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        remove = set(ids)
+        if not remove or not self.ids:
+            return
+        keep = np.array([point_id not in remove for point_id in self.ids], dtype=bool)
+        if keep.all():
+            return
+        sparse_rows = self._sparse_rows() if self.sparse is not None else None
+        self.ids = [point_id for point_id, k in zip(self.ids, keep) if k]
+        self.payloads = [payload for payload, k in zip(self.payloads, keep) if k]
+        self.vectors = np.asarray(self.vectors)[keep]
+        if sparse_rows is not None:
+            self._set_sparse([row for row, k in zip(sparse_rows, keep) if k])
+
+    def _sparse_rows(self):
+        indptr = self.sparse["indptr"]
+        indices, values = self.sparse["indices"], self.sparse["values"]
+        return [
+            (
+                indices[indptr[i]:indptr[i + 1]].tolist(),
+                values[indptr[i]:indptr[i + 1]].tolist(),
+            )
+            for i in range(len(indptr) - 1)
+        ]
+
+    def _set_sparse(self, rows) -> None:
+        lengths = [len(indices) for indices, _ in rows]
+        self.sparse = {
+            "indptr": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            "indices": np.fromiter(
+                (i for indices, _ in rows for i in indices), dtype=np.int64
+            ),
+            "values": np.fromiter(
+                (v for _, values in rows for v in values), dtype=np.float32
+            ),
+        }
+
+    def _quantize(self) -> None:
+        if self.quantization == "int8" and self.count:
+            self.codes, self.scales = _quantize_int8(np.asarray(self.vectors))
+        else:
+            self.codes, self.scales = None, None
+
+    def _train_ivf(self) -> None:
+        if self.nlist and self.count >= self.nlist * 8:
+            self.centroids = _kmeans(np.asarray(self.vectors), self.nlist)
+        else:
+            self.centroids = None
+
+    def _build_ivf_lists(self) -> None:
+        self._ivf_order = self._ivf_offsets = None
+        if self.centroids is None or not self.count:
+            return
+        assign = np.argmax(np.asarray(self.vectors) @ self.centroids.T, axis=1)
+        self._ivf_order = np.argsort(assign, kind="stable")
+        self._ivf_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assign, minlength=len(self.centroids)))]
+        )
+
+    def _build_postings(self) -> None:
+        """Inverted lists over the sparse vectors, sorted by term id"""
+        self._postings = None
+        if self.sparse is None or not len(self.sparse["indices"]):
+            return
+        indptr = self.sparse["indptr"]
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        order = np.argsort(self.sparse["indices"], kind="stable")
+        terms = self.sparse["indices"][order]
+        unique_terms, starts, counts = np.unique(
+            terms, return_index=True, return_counts=True
+        )
+        n = len(indptr) - 1
+        self._postings = {
+            "terms": unique_terms,
+            "starts": starts,
+            "counts": counts,
+            "idf": np.log((n - counts + 0.5) / (counts + 0.5) + 1.0).astype(
+                np.float32
+            ),
+            "rows": rows[order],
+            "values": self.sparse["values"][order],
+        }
+
+    # Persistence
+
+    @staticmethod
+    def _version_dir(path: str, version: str) -> str:
+        return os.path.join(path, f"v{version}")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self._dir, name)
+
+    def _save_array(self, name: str, array: np.ndarray) -> None:
+        np.save(self._file(f"{name}.npy"), array)
+
+    def save(self) -> str:
+        """Rebuild search structures and write them as a new version.
+
+        Files go to a fresh directory that no reader knows about yet; the
+        ``CURRENT`` pointer is replaced last, atomically.
+        """
+        self.version = str(time.time_ns())
+        self._dir = self._version_dir(self.path, self.version)
+        os.makedirs(self._dir)
+        self._quantize()
+        self._train_ivf()
+        self._build_ivf_lists()
+        self._build_postings()
+        if self.vectors is not None:
+            self._save_array("vectors", np.asarray(self.vectors))
+        if self.codes is not None:
+            self._save_array("codes", self.codes)
+            self._save_array("scales", self.scales)
+        if self.centroids is not None:
+            self._save_array("centroids", self.centroids)
+        if self.sparse is not None:
+            for key, array in self.sparse.items():
+                self._save_array(f"sparse_{key}", array)
+
+        with open(self._file("points.jsonl"), "w", encoding="utf-8") as f:
+            for point_id, payload in zip(self.ids, self.payloads):
+                record = {"id": point_id, "payload": payload}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        meta = {
+            "version": self.version,
+            "count": self.count,
+            "quantization": self.quantization,
+            "nlist": self.nlist,
+            "has_centroids": self.centroids is not None,
+            "has_sparse": self.sparse is not None,
+        }
+        with open(self._file("meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        tmp_path = os.path.join(self.path, f"{CURRENT_FILE}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.version)
+        os.replace(tmp_path, os.path.join(self.path, CURRENT_FILE))
+        self._prune()
+        return self.version
+
+    def _prune(self) -> None:
+        """Delete versions older than the previous one.
+
+        The previous version stays: a reader may have just read the old
+        pointer and still be opening its files.
+        """
+        versions = sorted(
+            (int(name[1:]), name)
+            for name in os.listdir(self.path)
+            if name.startswith("v") and name[1:].isdigit()
+        )
+        for _, name in versions[:-2]:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    @classmethod
+    def read_version(cls, path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        """Open the current version; the float32 matrix is memory-mapped"""
+        version = cls.read_version(path)
+        if version is None:
+            raise FileNotFoundError(f"No local vector index at {path}")
+        version_dir = cls._version_dir(path, version)
+        with open(os.path.join(version_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(path, quantization=meta["quantization"], nlist=meta["nlist"])
+        index.version = meta["version"]
+        index._dir = version_dir
+        if meta["count"]:
+            index.vectors = np.load(index._file("vectors.npy"), mmap_mode="r")
+        if meta.get("has_centroids"):
+            index.centroids = np.load(index._file("centroids.npy"))
+        if meta.get("has_sparse"):
+            index.sparse = {
+                key: np.load(index._file(f"sparse_{key}.npy"))
+                for key in ("indptr", "indices", "values")
+            }
+        with open(index._file("points.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                index.ids.append(record["id"])
+                index.payloads.append(record["payload"])
+        if index.quantization == "int8" and meta["count"]:
+            index.codes = np.load(index._file("codes.npy"))
+            index.scales = np.load(index._file("scales.npy"))
+        index._build_ivf_lists()
+        index._build_postings()
+        return index
+
+    # Search
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        if self.centroids is None:
+            return None
+        probe = np.argsort(self.centroids @ query)[::-1][:nprobe]
+        return np.concatenate(
+            [
+                self._ivf_order[self._ivf_offsets[c]:self._ivf_offsets[c + 1]]
+                for c in probe
+            ]
+        )
+
+    def search(
+        self,
+        query: Sequence[float],
+        limit: int,
+        score_threshold: Optional[float] = None,
+        nprobe: int = Config.LOCAL_INDEX_NPROBE,
+    ) -> List[tuple]:
+        """Top ``limit`` (row, cosine score) pairs"""
+        if not self.count:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        rows = self._candidates(q, nprobe)
+        if rows is not None:
+            rows = np.sort(rows)  # sequential reads from the memory map
+
+        if self.codes is not None:
+            codes = self.codes if rows is None else self.codes[rows]
+            scales = self.scales if rows is None else self.scales[rows]
+            approx = (codes.astype(np.float32) @ q) * scales
+            # Rescore a shortlist against the exact float32 vectors
+            shortlist = np.sort(np.argsort(approx)[::-1][:limit * 4])
+            rows = shortlist if rows is None else rows[shortlist]
+
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        scores = np.asarray(vectors) @ q
+        top = np.argsort(scores)[::-1][:limit]
+
+        results = []
+        for i in top:
+            score = float(scores[i])
+            if score_threshold is not None and score < score_threshold:
+                break
+            results.append((int(i if rows is None else rows[i]), score))
+        return results
+
+    def sparse_search(
+        self, indices: Sequence[int], values: Sequence[float], limit: int
+    ) -> List[tuple]:
+        """BM25-style scoring with IDF, matching Qdrant's IDF modifier"""
+        if self._postings is None:
+            return []
+        postings = self._postings
+        scores = np.zeros(self.count, dtype=np.float32)
+        positions = np.searchsorted(postings["terms"], indices)
+        for position, term, weight in zip(positions, indices, values):
+            if (
+                position >= len(postings["terms"])
+                or postings["terms"][position] != term
+            ):
+                continue
+            start = postings["starts"][position]
+            end = start + postings["counts"][position]
+            np.add.at(
+                scores,
+                postings["rows"][start:end],
+                postings["idf"][position] * weight * postings["values"][start:end],
+            )
+        top = np.argsort(scores)[::-1][:limit]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+class LocalSearchBackend:
+    """``QdrantSearchBackend``-compatible search over a ``LocalVectorIndex``.
+
+    The index is reloaded when another process (the ingest pipeline) saves a
+    new version, and that version feeds the retrieval cache keys.
+    """
+
+    def __init__(
+        self, path: str, collection_name: str = Config.QDRANT_COLLECTION_NAME
+    ):
+        self.path = path
+        self.collection_name = collection_name
+        self.index = LocalVectorIndex.load(path)
+        self._version_checked_at = time.monotonic()
+
+    def _to_results(self, hits) -> list:
+        results = []
+        for row, score in hits:
+            payload = self.index.payloads[row]
+            document = Document(
+                page_content=payload.get("page_content", ""),
+                metadata=dict(payload.get("metadata") or {}),
+            )
+            results.append((self.index.ids[row], document, score))
+        return results
+
+    async def has_sparse(self) -> bool:
+        return self.index.sparse is not None
+
+    async def index_version(self) -> str:
+        now = time.monotonic()
+        if now - self._version_checked_at >= Config.RAG_VERSION_CHECK_INTERVAL:
+            self._version_checked_at = now
+            version = LocalVectorIndex.read_version(self.path)
+            if version and version != self.index.version:
+                logger.info(
+                    f"Reloading local vector index {self.path} (version {version})"
+                )
+                self.index = await asyncio.to_thread(LocalVectorIndex.load, self.path)
+        return self.index.version
+
+    async def dense_search(
+        self, vector: List[float], limit: int, score_threshold: Optional[float] = None
+    ) -> list:
+        hits = await asyncio.to_thread(
+            self.index.search, vector, limit, score_threshold
+        )
+        return self._to_results(hits)
+
+    async def sparse_search(
+        self, indices: List[int], values: List[float], limit: int
+    ) -> list:
+        hits = await asyncio.to_thread(
+            self.index.sparse_search, indices, values, limit
+        )
+        return self._to_results(hits)
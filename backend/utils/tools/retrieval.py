@@ -0,0 +1,408 @@
+"""Hybrid dense + sparse retrieval with rank fusion and optional reranking"""
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from langchain_core.documents import Document
+
+from config.config import Config
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+    from qdrant_client.http import models as q_models
+
+logger = logging.getLogger(__name__)
+
+ScoredPoints = List[Tuple[str, Document, float]]
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[ScoredPoints], k: int = Config.RAG_RRF_K
+) -> ScoredPoints:
+    """Fuse ranked lists by summing 1 / (k + rank) per point"""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, (point_id, doc, _) in enumerate(results, start=1):
+            scores[point_id] = scores.get(point_id, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(point_id, doc)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [(point_id, documents[point_id], score) for point_id, score in ranked]
+
+
+def normalize_query(query: str) -> str:
+    """Canonical cache-key form: NFC, case-folded, single spaces, no end punctuation"""
+    query = unicodedata.normalize("NFC", query).casefold()
+    query = re.sub(r"\s+", " ", query).strip()
+    return query.rstrip(" ?.!")
+
+
+def _copy_documents(documents: List[Document]) -> List[Document]:
+    """Copies, so callers can't alter cached metadata"""
+    return [
+        Document(page_content=d.page_content, metadata=dict(d.metadata))
+        for d in documents
+    ]
+
+
+class LRUCache:
+    """Small in-memory LRU with optional TTL"""
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        item = self._entries.get(key)
+        if item is None or (self.ttl and time.monotonic() - item[0] > self.ttl):
+            if item is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class QdrantSearchBackend:
+    """Dense and sparse search over one Qdrant collection.
+
+    Works with either ``AsyncQdrantClient`` or the sync ``QdrantClient``
+    (calls then run in a worker thread so the event loop is never blocked).
+    """
+
+    def __init__(
+        self,
+        client,
+        collection_name: str,
+        sparse_vector_name: str = Config.RAG_SPARSE_VECTOR_NAME,
+        content_key: str = "page_content",
+        metadata_key: str = "metadata",
+        query_filter: Optional["q_models.Filter"] = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        # Applied to every search, e.g. to scope results to one chat session
+        self.query_filter = query_filter
+        self.sparse_vector_name = sparse_vector_name
+        self.content_key = content_key
+        self.metadata_key = metadata_key
+        self._has_sparse: Optional[bool] = None
+        self._index_version = "0"
+        self._version_checked_at = float("-inf")
+
+    async def _call(self, method: str, **kwargs) -> Any:
+        func = getattr(self.client, method)
+        if asyncio.iscoroutinefunction(func):
+            return await func(**kwargs)
+        return await asyncio.to_thread(func, **kwargs)
+
+    def _to_results(self, points) -> ScoredPoints:
+        return [
+            (
+                str(point.id),
+                Document(
+                    page_content=point.payload.get(self.content_key, ""),
+                    metadata=point.payload.get(self.metadata_key) or {},
+                ),
+                point.score,
+            )
+            for point in points
+        ]
+
+    async def has_sparse(self) -> bool:
+        """Whether the collection was indexed with sparse vectors"""
+        if self._has_sparse is None:
+            info = await self._call(
+                "get_collection", collection_name=self.collection_name
+            )
+            sparse_vectors = info.config.params.sparse_vectors or {}
+            self._has_sparse = self.sparse_vector_name in sparse_vectors
+            if not self._has_sparse:
+                logger.info(
+                    f"Collection {self.collection_name} has no sparse vectors, "
+                    "using dense search only"
+                )
+        return self._has_sparse
+
+    async def index_version(self) -> str:
+        """The collection's ``index_version`` metadata, polled every few seconds.
+
+        The ingest pipeline bumps it after every change, which moves all
+        retrieval cache keys to a fresh version.
+        """
+        now = time.monotonic()
+        if now - self._version_checked_at >= Config.RAG_VERSION_CHECK_INTERVAL:
+            self._version_checked_at = now
+            try:
+                info = await self._call(
+                    "get_collection", collection_name=self.collection_name
+                )
+                metadata = getattr(info.config, "metadata", None) or {}
+                self._index_version = str(metadata.get("index_version", "0"))
+            except Exception as e:
+                logger.warning(
+                    f"Could not read index version of {self.collection_name}: {e}"
+                )
+        return self._index_version
+
+    async def dense_search(
+        self, vector: List[float], limit: int, score_threshold: Optional[float] = None
+    ) -> ScoredPoints:
+        response = await self._call(
+            "query_points",
+            collection_name=self.collection_name,
+            query=vector,
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=self.query_filter,
+            with_payload=True,
+        )
+        return self._to_results(response.points)
+
+    async def sparse_search(
+        self, indices: List[int], values: List[float], limit: int
+    ) -> ScoredPoints:
+        from qdrant_client.http import models as q_models
+
+        response = await self._call(
+            "query_points",
+            collection_name=self.collection_name,
+            query=q_models.SparseVector(indices=indices, values=values),
+            using=self.sparse_vector_name,
+            query_filter=self.query_filter,
+            limit=limit,
+            with_payload=True,
+        )
+        return self._to_results(response.points)
+
+
+class CrossEncoderReranker:
+    """Local cross-encoder scoring (query, chunk) pairs in batches"""
+
+    def __init__(self, model_name: str, batch_size: int = Config.RAG_RERANK_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                logger.info(f"Loading reranker {self.model_name}")
+                self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """Relevance in [0, 1] (sigmoid) for each text"""
+        if not texts:
+            return []
+        model = self._load_model()
+        scores = model.predict(
+            [(query, text) for text in texts],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        return [float(score) for score in scores]
+
+    async def ascore(self, query: str, texts: List[str]) -> List[float]:
+        return await asyncio.to_thread(self.score, query, texts)
+
+
+_rerankers: Dict[str, CrossEncoderReranker] = {}
+
+
+def get_reranker(
+    model_name: str = Config.RAG_RERANKER_MODEL,
+) -> Optional[CrossEncoderReranker]:
+    """The shared reranker for ``model_name``, or None if reranking is disabled"""
+    if not model_name:
+        return None
+    if model_name not in _rerankers:
+        _rerankers[model_name] = CrossEncoderReranker(model_name)
+    return _rerankers[model_name]
+
+
+class HybridRetriever:
+    """Dense + sparse search fused by reciprocal rank, then reranked and thresholded.
+
+    Weak results are dropped rather than padded up to ``k``, so a vague
+    question yields a short context instead of six loosely related chunks.
+    """
+
+    def __init__(
+        self,
+        backend: QdrantSearchBackend,
+        embeddings: "Embeddings",
+        sparse_embeddings=None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        k: int = Config.RAG_TOP_K,
+        prefetch_k: int = Config.RAG_PREFETCH_K,
+        dense_score_threshold: Optional[float] = Config.RAG_DENSE_SCORE_THRESHOLD,
+        rerank_score_threshold: float = Config.RAG_RERANK_SCORE_THRESHOLD,
+        relative_score_cutoff: float = Config.RAG_RELATIVE_SCORE_CUTOFF,
+        fused_relative_score_cutoff: float = Config.RAG_FUSED_RELATIVE_SCORE_CUTOFF,
+    ):
+        self.backend = backend
+        self.embeddings = embeddings
+        self.sparse_embeddings = sparse_embeddings
+        self.reranker = reranker
+        self.k = k
+        self.prefetch_k = prefetch_k
+        self.dense_score_threshold = dense_score_threshold
+        self.rerank_score_threshold = rerank_score_threshold
+        self.relative_score_cutoff = relative_score_cutoff
+        self.fused_relative_score_cutoff = fused_relative_score_cutoff
+
+        # Repeated questions skip embedding and search entirely
+        self.result_cache = LRUCache(
+            Config.RAG_RESULT_CACHE_SIZE, Config.RAG_RESULT_CACHE_TTL
+        )
+        self.query_embedding_cache = LRUCache(Config.RAG_QUERY_EMBEDDING_CACHE_SIZE)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs) -> "HybridRetriever":
+        """Build a retriever over the client and collection of a QdrantVectorStore"""
+        from utils.wrappers.embedding_wrapper import (
+            get_embeddings,
+            get_sparse_embeddings,
+        )
+
+        backend = QdrantSearchBackend(
+            vectorstore.client,
+            vectorstore.collection_name,
+            content_key=vectorstore.content_payload_key,
+            metadata_key=vectorstore.metadata_payload_key,
+        )
+        kwargs.setdefault("sparse_embeddings", get_sparse_embeddings())
+        kwargs.setdefault("reranker", get_reranker())
+        return cls(backend, vectorstore.embeddings or get_embeddings(), **kwargs)
+
+    async def _sparse_search(self, query: str) -> ScoredPoints:
+        if self.sparse_embeddings is None or not await self.backend.has_sparse():
+            return []
+        key = ("sparse", normalize_query(query))
+        sparse = self.query_embedding_cache.get(key)
+        if sparse is None:
+            sparse = await asyncio.to_thread(self.sparse_embeddings.embed_query, query)
+            self.query_embedding_cache.put(key, sparse)
+        return await self.backend.sparse_search(
+            sparse.indices, sparse.values, self.prefetch_k
+        )
+
+    async def _dense_search(self, query: str) -> ScoredPoints:
+        key = ("dense", normalize_query(query))
+        vector = self.query_embedding_cache.get(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(query)
+            self.query_embedding_cache.put(key, vector)
+        return await self.backend.dense_search(
+            vector, self.prefetch_k, self.dense_score_threshold
+        )
+
+    async def aretrieve(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """Return up to ``k`` chunks, best first, with ``score`` in metadata"""
+        k = k or self.k
+        cache_key = (
+            normalize_query(query),
+            self.backend.collection_name,
+            await self.backend.index_version(),
+            k,
+        )
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return _copy_documents(cached)
+
+        documents = await self._retrieve(query, k)
+        self.result_cache.put(cache_key, documents)
+        return _copy_documents(documents)
+
+    def invalidate(self) -> None:
+        """Drop cached results, e.g. after indexing from this process"""
+        self.result_cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "results": self.result_cache.get_stats(),
+            "query_embeddings": self.query_embedding_cache.get_stats(),
+        }
+
+    async def _retrieve(self, query: str, k: int) -> List[Document]:
+        dense_results, sparse_results = await asyncio.gather(
+            self._dense_search(query), self._sparse_search(query)
+        )
+        if sparse_results:
+            candidates = reciprocal_rank_fusion([dense_results, sparse_results])
+            if self.dense_score_threshold is not None and self.reranker is None:
+                # Without a reranker nothing else vouches for a BM25-only hit;
+                # the sparse leg only reorders chunks the dense leg accepted
+                dense_ids = {point_id for point_id, _, _ in dense_results}
+                candidates = [c for c in candidates if c[0] in dense_ids]
+        else:
+            candidates = dense_results
+
+        if not candidates:
+            return []
+
+        # Fused rank scores are on their own scale; see RAG_FUSED_RELATIVE_SCORE_CUTOFF
+        cutoff = self.relative_score_cutoff
+        if sparse_results and self.reranker is None:
+            cutoff = self.fused_relative_score_cutoff
+
+        if self.reranker is not None:
+            scores = await self.reranker.ascore(
+                query, [doc.page_content for _, doc, _ in candidates]
+            )
+            candidates = sorted(
+                (
+                    (point_id, doc, score)
+                    for (point_id, doc, _), score in zip(candidates, scores)
+                    if score >= self.rerank_score_threshold
+                ),
+                key=lambda item: item[2],
+                reverse=True,
+            )
+
+        # Applies with or without the reranker, to whichever score ranks the candidates
+        if candidates and candidates[0][2] > 0:
+            best = candidates[0][2]
+            candidates = [c for c in candidates if c[2] >= best * cutoff]
+
+        documents = []
+        for _, doc, score in candidates[:k]:
+            doc.metadata["score"] = score
+            documents.append(doc)
+        logger.debug(
+            f"Retrieved {len(documents)} chunks "
+            f"(dense={len(dense_results)}, sparse={len(sparse_results)})"
+        )
+        return documents
@@ -0,0 +1,102 @@
+"""TCVN3 (ABC) to Unicode transcoding for legacy Vietnamese documents"""
+
+import codecs
+import os
+import re
+from typing import Optional
+
+_TCVN3_UNICODE_MAP = {
+    "¸": chr(225), "µ": chr(224), "¶": chr(7843), "·": chr(227), "¹": chr(7841),
+    "¨": chr(259), "¾": chr(7855), "»": chr(7857), "¼": chr(7859), "½": chr(7861),
+    "Æ": chr(7863), "©": chr(226), "Ê": chr(7845), "Ç": chr(7847), "È": chr(7849),
+    "É": chr(7851), "Ë": chr(7853), "Ð": chr(233), "Ì": chr(232), "Î": chr(7867),
+    "Ï": chr(7869), "Ñ": chr(7865), "ª": chr(234), "Õ": chr(7871), "Ò": chr(7873),
+    "Ó": chr(7875), "Ô": chr(7877), "Ö": chr(7879), "ã": chr(243), "ß": chr(242),
+    "á": chr(7887), "â": chr(245), "ä": chr(7885), "«": chr(244), "è": chr(7889),
+    "å": chr(7891), "æ": chr(7893), "ç": chr(7895), "é": chr(7897), "¬": chr(417),
+    "í": chr(7899), "ê": chr(7901), "ë": chr(7903), "ì": chr(7905), "î": chr(7907),
+    "Ý": chr(237), "×": chr(236), "Ø": chr(7881), "Ü": chr(297), "Þ": chr(7883),
+    "ó": chr(250), "ï": chr(249), "ñ": chr(7911), "ò": chr(361), "ô": chr(7909),
+    "­": chr(432), "ø": chr(7913), "õ": chr(7915), "ö": chr(7917), "÷": chr(7919),
+    "ù": chr(7921), "ý": chr(253), "ú": chr(7923), "û": chr(7927), "ü": chr(7929),
+    "þ": chr(7925), "®": chr(273), "ð": chr(432), "¡": chr(258), "¢": chr(194),
+    "£": chr(202), "¤": chr(212), "¥": chr(416), "¦": chr(431), "§": chr(272),
+}
+
+# Built once at import. TCVN3 text extracted from legacy fonts is all in the
+# Latin-1 range, so each Latin-1 run is converted by the C charmap codec with a
+# 256-entry decoding table; anything outside it is left unchanged.
+_TCVN3_DECODING_TABLE = "".join(
+    _TCVN3_UNICODE_MAP.get(chr(i), chr(i)) for i in range(256)
+)
+_NON_LATIN1_RUN = re.compile(r"([^\x00-\xff]+)")
+
+# TCVN3 puts most Vietnamese letters on Latin-1 symbol code points (® for đ,
+# µ for à, × for ì, « for ô, ...). Those only count as evidence when they sit
+# inside a word, next to an ASCII letter or another TCVN3 code point: "®éng",
+# "lµ", "g×" but not "3 × 4". TCVN3 code points that are Latin-1 letters
+# (é, ü, ß, ç, ...) are left out; they are ordinary in European text. µ (à)
+# hardly ever starts a Vietnamese word but prefixes units ("5 µm"), so it
+# only counts after a letter.
+_TCVN3_MARKERS = frozenset(c for c in _TCVN3_UNICODE_MAP if c < "\xc0" or c in "×÷")
+_WORD_CHARS = "A-Za-z" + re.escape("".join(_TCVN3_UNICODE_MAP))
+_MARKER_CHARS = re.escape("".join(sorted(_TCVN3_MARKERS)))
+_START_MARKER_CHARS = re.escape("".join(sorted(_TCVN3_MARKERS - {"µ"})))
+_TCVN3_LETTER = re.compile(
+    f"(?<=[{_WORD_CHARS}])[{_MARKER_CHARS}]"
+    f"|[{_START_MARKER_CHARS}](?=[{_WORD_CHARS}])"
+)
+_ASCII_LETTER = re.compile(r"[A-Za-z]")
+_UNICODE_VIETNAMESE = re.compile("[\u1ea0-\u1ef9ăâđêôơưĂÂĐÊÔƠƯĩũĨŨ]")
+
+
+def is_tcvn3(
+    text: str,
+    sample_size: int = 20000,
+    min_markers: int = 20,
+    min_ratio: float = 0.1,
+) -> bool:
+    """Guess whether ``text`` is TCVN3 text decoded as Latin-1/Unicode.
+
+    Counts TCVN3-only code points used as letters inside words, over a sample
+    from the start of the text, and requires them to be a noticeable share of
+    the ASCII letters and to outnumber Unicode Vietnamese letters.
+    """
+    sample = text[:sample_size]
+    markers = len(_TCVN3_LETTER.findall(sample))
+    if markers < min_markers:
+        return False
+    ascii_letters = len(_ASCII_LETTER.findall(sample))
+    unicode_letters = len(_UNICODE_VIETNAMESE.findall(sample))
+    return markers >= min_ratio * ascii_letters and markers > 2 * unicode_letters
+
+
+def is_tcvn3_source(source: Optional[str]) -> bool:
+    """Files named ``*_tcvn3.<ext>`` are always transcoded"""
+    if not source:
+        return False
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return stem.lower().endswith("_tcvn3")
+
+
+def tcvn3_to_unicode(vnstr: str) -> str:
+    parts = _NON_LATIN1_RUN.split(vnstr)
+    # Even indices are Latin-1 runs, odd indices the separators kept by split()
+    parts[::2] = [
+        codecs.charmap_decode(
+            part.encode("latin-1"), "strict", _TCVN3_DECODING_TABLE
+        )[0]
+        for part in parts[::2]
+    ]
+    return "".join(parts)
+
+
+def normalize_vietnamese(text: str, source: Optional[str] = None) -> str:
+    """Transcode ``text`` to Unicode if it looks like TCVN3, else return it unchanged.
+
+    ``source`` is the originating file name; the ``_tcvn3`` suffix forces
+    transcoding regardless of detection.
+    """
+    if is_tcvn3_source(source) or is_tcvn3(text):
+        return tcvn3_to_unicode(text)
+    return text
@@ -3,6 +3,7 @@ import asyncio
 import json
 import re
 from typing import Any, List, Dict, Optional
+from langchain_core.messages import ToolMessage
 from langchain_core.tools import Tool, BaseTool
 from services.mcp_service import detach_mcp_service
 
@@ -131,7 +132,8 @@ class ToolHandler:
                 # Check if we've exceeded the limit for this tool
                 if tool_call_count.get(tool_name, 0) >= max_tool_calls:
                     logger.warning(
-                        f"Tool {tool_name} has been called {max_tool_calls} times, skipping further calls to prevent loops"
+                        f"Tool {tool_name} has been called {max_tool_calls} times, "
+                    "skipping further calls to prevent loops"
                     )
                     return ""  # Return empty string to hide exceeded calls
 
@@ -154,7 +156,8 @@ class ToolHandler:
                         tool_name = alt_tool_name  # Use the correct name for tracking
                     else:
                         logger.warning(
-                            f"Tool {tool_name} not found in available tools: {list(tool_map.keys())}"
+                            f"Tool {tool_name} not found in available tools: "
+                    f"{list(tool_map.keys())}"
                         )
                         return ""  # Return empty string to hide unmatched tool calls
 
@@ -275,6 +278,83 @@ class ToolHandler:
 
         return content, artifacts
 
+    @staticmethod
+    async def execute_tool_calls(
+        tool_calls: List[Dict[str, Any]],
+        tools: List[BaseTool],
+        artifacts: Optional[Dict] = None,
+        tool_call_count: Optional[Dict[str, int]] = None,
+        max_tool_calls: int = 3,
+    ) -> List[ToolMessage]:
+        """Run structured tool calls from a native function-calling response.
+
+        Calls in one response are independent, so they run concurrently. Every
+        call gets a ToolMessage back (errors included) so the model can recover
+        on its next iteration instead of the turn being lost.
+        """
+        if artifacts is None:
+            artifacts = {}
+        if tool_call_count is None:
+            tool_call_count = {}
+
+        tool_map = {t.name: t for t in tools}
+
+        async def run_call(call: Dict[str, Any]) -> ToolMessage:
+            tool_name = call.get("name", "")
+            call_id = call.get("id") or tool_name
+            tool = tool_map.get(tool_name)
+
+            if not tool:
+                logger.warning(
+                    f"Tool {tool_name} not found in available tools: "
+                    f"{list(tool_map.keys())}"
+                )
+                return ToolMessage(
+                    content=f"[Tool Error: unknown tool '{tool_name}']",
+                    tool_call_id=call_id,
+                    name=tool_name,
+                )
+
+            if tool_call_count.get(tool_name, 0) >= max_tool_calls:
+                logger.warning(
+                    f"Tool {tool_name} has been called {max_tool_calls} times, "
+                    "skipping further calls to prevent loops"
+                )
+                return ToolMessage(
+                    content=(
+                        f"[Tool Error: call limit reached for '{tool_name}', "
+                        "answer with the information you have]"
+                    ),
+                    tool_call_id=call_id,
+                    name=tool_name,
+                )
+
+            tool_call_count[tool_name] = tool_call_count.get(tool_name, 0) + 1
+            call_count = tool_call_count[tool_name]
+            artifact_key = f"{tool_name}_{call_count}" if call_count > 1 else tool_name
+
+            logger.info(
+                f"Processing native tool call {call_count}: "
+                f"{tool_name}({call.get('args')})"
+            )
+
+            try:
+                result = await ToolHandler.ainvoke_tool(tool, call.get("args") or {})
+            except Exception as tool_error:
+                artifacts[artifact_key] = f"[Tool Error: {tool_error}]"
+                return ToolMessage(
+                    content=f"[Tool Error: {tool_error}]",
+                    tool_call_id=call_id,
+                    name=tool_name,
+                )
+
+            artifacts[artifact_key] = result
+            return ToolMessage(
+                content=str(result), tool_call_id=call_id, name=tool_name
+            )
+
+        return list(await asyncio.gather(*(run_call(call) for call in tool_calls)))
+
     @staticmethod
     async def initialize_tools() -> List[Tool]:
         """Initialize and return available tools"""
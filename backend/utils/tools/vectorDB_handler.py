@@ -1,12 +1,17 @@
 import os
+import time
 import uuid
 import torch
 import hashlib
-from typing import List, Optional
+import json
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
 from huggingface_hub import snapshot_download
 
 from langchain.schema import Document
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain_qdrant import QdrantVectorStore
 from langchain.text_splitter import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
 # from langchain_community.document_loaders import PyMuPDFLoader, PDFMinerLoader  
@@ -14,6 +19,11 @@ from langchain.text_splitter import MarkdownHeaderTextSplitter, RecursiveCharact
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as q_models
 
+from config.config import Config
+from utils.wrappers.embedding_wrapper import get_embeddings, get_sparse_embeddings
+from utils.tools.local_vector_index import LocalVectorIndex
+from utils.tools.tcvn3 import normalize_vietnamese, tcvn3_to_unicode
+
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import (PdfPipelineOptions, EasyOcrOptions,TesseractOcrOptions, RapidOcrOptions, smolvlm_picture_description, TableFormerMode)
 from docling.document_converter import (
@@ -23,79 +33,202 @@ from docling.document_converter import (
     PdfFormatOption,
 )
 
-def tcvn3_to_unicode(vnstr):
-    tcvn3_unicode_map = {
-        "¸": chr(225), "µ": chr(224), "¶": chr(7843), "·": chr(227), "¹": chr(7841),
-        "¨": chr(259), "¾": chr(7855), "»": chr(7857), "¼": chr(7859), "½": chr(7861), 
-        "Æ": chr(7863), "©": chr(226), "Ê": chr(7845), "Ç": chr(7847), "È": chr(7849), 
-        "É": chr(7851), "Ë": chr(7853), "Ð": chr(233), "Ì": chr(232), "Î": chr(7867), 
-        "Ï": chr(7869), "Ñ": chr(7865), "ª": chr(234), "Õ": chr(7871), "Ò": chr(7873), 
-        "Ó": chr(7875), "Ô": chr(7877), "Ö": chr(7879), "ã": chr(243), "ß": chr(242), 
-        "á": chr(7887), "â": chr(245), "ä": chr(7885), "«": chr(244), "è": chr(7889), 
-        "å": chr(7891), "æ": chr(7893), "ç": chr(7895), "é": chr(7897), "¬": chr(417), 
-        "í": chr(7899), "ê": chr(7901), "ë": chr(7903), "ì": chr(7905), "î": chr(7907),
-        "Ý": chr(237), "×": chr(236), "Ø": chr(7881), "Ü": chr(297), "Þ": chr(7883),
-        "ó": chr(250), "ï": chr(249), "ñ": chr(7911), "ò": chr(361), "ô": chr(7909),
-        "­": chr(432), "ø": chr(7913), "õ": chr(7915), "ö": chr(7917), "÷": chr(7919), 
-        "ù": chr(7921), "ý": chr(253), "ú": chr(7923), "û": chr(7927), "ü": chr(7929), 
-        "þ": chr(7925), "®": chr(273), "ð": chr(432), "¡": chr(258), "¢": chr(194), 
-        "£": chr(202), "¤": chr(212), "¥": chr(416), "¦": chr(431), "§": chr(272)
-    }
-
-    identity_map = {
-        "a": "a", "e": "e", "i": "i", "o": "o", "u": "u", "y": "y",
-        "A": "A", "E": "E", "I": "I", "O": "O", "U": "U", "Y": "Y"
-    }
-
-    tcvn3_unicode_map.update(identity_map)
+HASH_BLOCK_SIZE = 1024 * 1024
 
-    result = ""
-    for c in vnstr:
-        result += tcvn3_unicode_map.get(c, c) 
-    return result
 
 def get_hash(filepath: str) -> str:
+    """MD5 of a file, read in blocks so large books are not loaded into memory"""
+    digest = hashlib.md5()
     with open(filepath, 'rb') as f:
-        file_bytes = f.read()
-    return hashlib.md5(file_bytes).hexdigest()
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-def has_been_processed(path: str) -> bool:
-    return os.path.exists(path)
 
-def load_documents_from_directory(
-    directory_path: str, extensions: Optional[List[str]] = None
-) -> List[Document]:
-    extensions = extensions or [".txt", ".md", ".pdf", ".png", ".docx"]
-    docs: List[Document] = []
+class IngestManifest:
+    """Persistent record of what has been converted and indexed per source file.
+
+    Each entry maps a source path to its content hash at conversion time, and
+    to the hash, chunk IDs and embedding model used when it was last indexed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def file_hash(self, source: str) -> str:
+        """Hash ``source``, reusing the stored hash while size and mtime match"""
+        stat = os.stat(source)
+        entry = self.entries.setdefault(source, {})
+        if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+            return entry["hash"]
+        entry.update(hash=get_hash(source), size=stat.st_size, mtime=stat.st_mtime)
+        return entry["hash"]
+
+    def is_converted(self, source: str, md_path: str) -> bool:
+        if not os.path.exists(md_path):
+            return False
+        entry = self.entries.get(source, {})
+        if "converted_hash" not in entry:
+            # Output from before the manifest existed: trust it once
+            entry["converted_hash"] = self.file_hash(source)
+        return entry["converted_hash"] == self.file_hash(source)
+
+    def mark_converted(self, source: str) -> None:
+        self.entries.setdefault(source, {})["converted_hash"] = self.file_hash(source)
+
+    def needs_indexing(
+        self, source: str, content_hash: str, embedding_model: str
+    ) -> bool:
+        entry = self.entries.get(source, {})
+        return (
+            entry.get("indexed_hash") != content_hash
+            or entry.get("embedding_model") != embedding_model
+        )
+
+    def mark_indexed(
+        self, source: str, content_hash: str, chunk_ids: List[str], embedding_model: str
+    ) -> None:
+        self.entries.setdefault(source, {}).update(
+            indexed_hash=content_hash,
+            chunk_ids=chunk_ids,
+            embedding_model=embedding_model,
+        )
+
+    def chunk_ids(self, source: str) -> List[str]:
+        return self.entries.get(source, {}).get("chunk_ids", [])
+
+    def deleted_sources(self) -> List[str]:
+        return [source for source in self.entries if not os.path.exists(source)]
+
+    def remove(self, source: str) -> None:
+        self.entries.pop(source, None)
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
 
-    raw_dir = os.path.join(directory_path, "raw")
-    processed_dir = os.path.join(directory_path, "processed")
-    os.makedirs(processed_dir, exist_ok=True)
 
+def get_manifest(directory_path: str, name: str = "manifest.json") -> IngestManifest:
+    return IngestManifest(os.path.join(directory_path, "processed", name))
+
+
+def has_been_processed(
+    path: str,
+    source: Optional[str] = None,
+    manifest: Optional[IngestManifest] = None,
+) -> bool:
+    if manifest is not None and source is not None:
+        return manifest.is_converted(source, path)
+    return os.path.exists(path)
+
+def download_ocr_models() -> dict:
+    """Fetch RapidOCR models once, before any converter worker starts"""
     print("Downloading RapidOCR models")
     download_path = snapshot_download(repo_id="SWHL/RapidOCR")
+    return {
+        "det_model_path": os.path.join(
+            download_path, "PP-OCRv4", "en_PP-OCRv3_det_infer.onnx"
+        ),
+        "rec_model_path": os.path.join(
+            download_path, "PP-OCRv4", "ch_PP-OCRv4_rec_server_infer.onnx"
+        ),
+        "cls_model_path": os.path.join(
+            download_path, "PP-OCRv3", "ch_ppocr_mobile_v2.0_cls_train.onnx"
+        ),
+    }
 
-    det_model_path = os.path.join(download_path, "PP-OCRv4", "en_PP-OCRv3_det_infer.onnx")
-    rec_model_path = os.path.join(download_path, "PP-OCRv4", "ch_PP-OCRv4_rec_server_infer.onnx")
-    cls_model_path = os.path.join(download_path, "PP-OCRv3", "ch_ppocr_mobile_v2.0_cls_train.onnx")
 
-    ocr_options = RapidOcrOptions(
-        det_model_path=det_model_path,
-        rec_model_path=rec_model_path,
-        cls_model_path=cls_model_path,
-    )
+def build_converter(ocr_model_paths: dict) -> DocumentConverter:
+    ocr_options = RapidOcrOptions(**ocr_model_paths)
 
     pipeline_options = PdfPipelineOptions(
         ocr_options=ocr_options
         # do_ocr=False
         )
-    converter = DocumentConverter(
+    return DocumentConverter(
         format_options={
             InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
             InputFormat.IMAGE: ["jpg", "jpeg", "png", "tif", "tiff", "bmp"],
         },
     )
 
+
+# Per-process converter, created once by the pool initializer so RapidOCR and
+# the layout models are loaded once per worker instead of once per file.
+_worker_converter: Optional[DocumentConverter] = None
+
+
+def _init_converter_worker(ocr_model_paths: dict, threads_per_worker: int) -> None:
+    global _worker_converter
+    torch.set_num_threads(threads_per_worker)
+    _worker_converter = build_converter(ocr_model_paths)
+
+
+def _convert_file(raw_path: str, md_path: str) -> Tuple[str, float, Optional[str]]:
+    """Convert one source file to Markdown in a worker process.
+
+    The output is written to a temp file and renamed, so an interrupted run
+    never leaves a partial .md that would later be mistaken for finished work.
+    Returns (raw_path, seconds, error).
+    """
+    start = time.perf_counter()
+    try:
+        conversion_result = _worker_converter.convert(source=raw_path)
+        doc = conversion_result.document.export_to_markdown()
+
+        if doc:
+            # Legacy TCVN3 fonts come through as Latin-1 look-alikes
+            doc = normalize_vietnamese(doc, raw_path)
+
+            tmp_path = md_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(doc)
+            os.replace(tmp_path, md_path)
+        return raw_path, time.perf_counter() - start, None
+    except Exception as e:
+        return raw_path, time.perf_counter() - start, str(e)
+
+
+def _read_markdown(
+    path: str, source: str, content_hash: Optional[str] = None
+) -> Optional[Document]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    metadata = {"source": source}
+    if content_hash:
+        metadata["content_hash"] = content_hash
+    return Document(page_content=text, metadata=metadata) if text else None
+
+
+def load_documents_from_directory(
+    directory_path: str,
+    extensions: Optional[List[str]] = None,
+    num_workers: Optional[int] = None,
+    manifest: Optional[IngestManifest] = None,
+) -> List[Document]:
+    """Load documents under ``raw/``, converting PDF/PNG/DOCX in parallel.
+
+    Conversions run in a process pool (one docling converter per worker).
+    Files whose content hash matches the manifest are not converted again,
+    so an interrupted ingest resumes where it stopped and edited sources are
+    picked up. Each document carries its ``content_hash`` in metadata.
+    """
+    manifest = manifest or get_manifest(directory_path)
+    extensions = extensions or [".txt", ".md", ".pdf", ".png", ".docx"]
+    num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+    docs: List[Document] = []
+
+    raw_dir = os.path.join(directory_path, "raw")
+    processed_dir = os.path.join(directory_path, "processed")
+    os.makedirs(processed_dir, exist_ok=True)
+
+    pending: List[Tuple[str, str]] = []
     for root, _, files in os.walk(raw_dir):
         for fname in files:
             if any(fname.lower().endswith(ext) for ext in extensions):
@@ -105,69 +238,255 @@ def load_documents_from_directory(
                 unicode_md_path = os.path.join(processed_dir, base_name + ".md")
 
                 try:
-                    if has_been_processed(unicode_md_path):
+                    content_hash = manifest.file_hash(raw_path)
+                    if has_been_processed(unicode_md_path, raw_path, manifest):
                         print(f"==> Skipping already processed: {fname}")
-                        with open(unicode_md_path, "r", encoding="utf-8") as f:
-                            unicode_text = f.read().strip()
-                            if unicode_text:
-                                docs.append(Document(page_content=unicode_text, metadata={"source": raw_path}))
+                        doc = _read_markdown(unicode_md_path, raw_path, content_hash)
+                        if doc:
+                            docs.append(doc)
                         continue
 
                     if fname.lower().endswith((".pdf", ".png", ".docx")):
-                        conversion_result = converter.convert(source=raw_path)
-                        doc = conversion_result.document.export_to_markdown()
-
-                        if doc:
-                            if fname.lower().endswith("_tcvn3.pdf") or fname.lower().endswith("_tcvn3.docx"):
-                                unicode_text = tcvn3_to_unicode(doc)
-                            else:
-                                unicode_text = doc
-
-                            with open(unicode_md_path, "w", encoding="utf-8") as f:
-                                f.write(unicode_text)
-
-                            docs.append(Document(page_content=unicode_text, metadata={"source": raw_path}))
+                        pending.append((raw_path, unicode_md_path))
                     else:
                         with open(raw_path, "r", encoding="utf-8") as f:
-                            text = f.read().strip()
+                            text = normalize_vietnamese(f.read().strip(), raw_path)
                         if text:
-                            docs.append(Document(page_content=text, metadata={"source": raw_path}))
+                            docs.append(Document(
+                                page_content=text,
+                                metadata={
+                                    "source": raw_path,
+                                    "content_hash": content_hash,
+                                },
+                            ))
                 except Exception as e:
                     print(f"Failed to load {raw_path}: {e}")
 
+    if not pending:
+        manifest.save()
+        return docs
+
+    # Largest files first so one big book does not become the tail of the run
+    pending.sort(key=lambda task: os.path.getsize(task[0]), reverse=True)
+    num_workers = min(num_workers, len(pending))
+    threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+    md_paths = dict(pending)
+
+    print(f"Converting {len(pending)} files with {num_workers} workers")
+    ocr_model_paths = download_ocr_models()
+    run_start = time.perf_counter()
+
+    # spawn: forking a parent that already initialized torch is unsafe
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_converter_worker,
+        initargs=(ocr_model_paths, threads_per_worker),
+    ) as executor:
+        futures = [
+            executor.submit(_convert_file, raw_path, md_path)
+            for raw_path, md_path in pending
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            raw_path, seconds, error = future.result()
+            fname = os.path.basename(raw_path)
+            if error:
+                print(
+                    f"[{done}/{len(pending)}] Failed to load {fname} "
+                    f"after {seconds:.1f}s: {error}"
+                )
+                continue
+
+            print(f"[{done}/{len(pending)}] Converted {fname} in {seconds:.1f}s")
+            md_path = md_paths[raw_path]
+            if os.path.exists(md_path):
+                manifest.mark_converted(raw_path)
+                doc = _read_markdown(md_path, raw_path, manifest.file_hash(raw_path))
+                if doc:
+                    docs.append(doc)
+
+            # Persist progress periodically so a crash keeps finished work
+            if done % 50 == 0:
+                manifest.save()
+
+    manifest.save()
+    elapsed = time.perf_counter() - run_start
+    print(
+        f"Converted {len(pending)} files in {elapsed:.1f}s "
+        f"({len(pending) / elapsed:.2f} files/s)"
+    )
     return docs
 
 
+# Qdrant's default; restored after a bulk load so the HNSW index gets built
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+def bump_index_version(client: QdrantClient, collection_name: str) -> str:
+    """Record a new ``index_version`` in the collection metadata.
+
+    Retrieval caches key their entries on this value, so serving processes
+    stop returning results from before the change.
+    """
+    version = str(time.time_ns())
+    try:
+        client.update_collection(
+            collection_name=collection_name, metadata={"index_version": version}
+        )
+    except Exception as e:
+        print(f"Could not update index version of '{collection_name}': {e}")
+    return version
+
+
+def make_chunk_id(source: str, chunk_index: int, text: str) -> str:
+    """Stable point ID derived from the chunk's source, position and content.
+
+    Re-indexing unchanged text yields the same ID, so upserts overwrite the
+    existing point instead of adding a duplicate.
+    """
+    text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{chunk_index}#{text_hash}"))
+
+
+def _iter_points(
+    docs: List[Document],
+    embeddings: Embeddings,
+    batch_size: int,
+    sparse_embeddings=None,
+) -> Iterator[q_models.PointStruct]:
+    """Embed ``docs`` batch by batch as points in langchain_qdrant's payload layout"""
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        texts = [doc.page_content for doc in batch]
+        vectors = embeddings.embed_documents(texts)
+        if sparse_embeddings is not None:
+            sparse_batch = sparse_embeddings.embed_documents(texts)
+            sparse_vectors = [
+                {
+                    "": vector,
+                    Config.RAG_SPARSE_VECTOR_NAME: q_models.SparseVector(
+                        indices=sparse.indices, values=sparse.values
+                    ),
+                }
+                for vector, sparse in zip(vectors, sparse_batch)
+            ]
+            vectors = sparse_vectors
+        for doc, vector in zip(batch, vectors):
+            yield q_models.PointStruct(
+                id=doc.metadata["chunk_id"],
+                vector=vector,
+                payload={
+                    QdrantVectorStore.CONTENT_KEY: doc.page_content,
+                    QdrantVectorStore.METADATA_KEY: doc.metadata,
+                },
+            )
+
+
+def bulk_upsert_documents(
+    client: QdrantClient,
+    collection_name: str,
+    embeddings: Embeddings,
+    docs: List[Document],
+    batch_size: int = 256,
+    upload_workers: int = 4,
+    sparse_embeddings=None,
+) -> None:
+    """Embed and upsert chunks in batches, uploading on several workers.
+
+    Embedding runs in this process while ``upload_workers`` processes send
+    finished batches, so network round trips overlap with inference.
+    """
+    start = time.perf_counter()
+    client.upload_points(
+        collection_name=collection_name,
+        points=_iter_points(docs, embeddings, batch_size, sparse_embeddings),
+        batch_size=batch_size,
+        parallel=upload_workers,
+        max_retries=3,
+        wait=True,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Upserted {len(docs)} chunks in {elapsed:.1f}s "
+        f"({len(docs) / max(elapsed, 1e-6):.1f} chunks/s)"
+    )
+
+
+@lru_cache(maxsize=4)
+def _load_tokenizer(name: str):
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(name)
+
+
+def chunking_signature(chunk_size: int, chunk_overlap: int) -> str:
+    """Part of the index signature, so changing the chunking reindexes sources"""
+    return f"chunks={chunk_size}/{chunk_overlap}tok"
+
+
+HEADERS_TO_SPLIT_ON = [
+    ("#", "h1"),
+    ("##", "h2"),
+    ("###", "h3"),
+    ("####", "h4"),
+]
+
+
 def preprocess_documents(
-    docs: List[Document], chunk_size: int = 800, chunk_overlap: int = 400
+    docs: List[Document],
+    chunk_size: int = 800,
+    chunk_overlap: int = 400,
+    tokenizer_name: Optional[str] = None,
 ) -> List[Document]:
     """
     Preprocess documents using Markdown-aware splitting.
-    Splits documents into semantically meaningful sections based on Markdown headers.
+    Documents are first split into sections on Markdown headers, then every
+    section is split recursively so no chunk exceeds ``chunk_size`` (characters,
+    or tokens of ``tokenizer_name`` when given) with ``chunk_overlap`` overlap.
+    Each chunk records its header path, e.g. "Chương 1 > Bài 2".
     """
-    chunked_docs: List[Document] = []
-
-    splitter = MarkdownHeaderTextSplitter(headers_to_split_on=[
-        ("#", "h1"),
-        ("##", "h2"),
-        ("###", "h3"),
-        ("####", "h4"),
-    ])
+    header_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=HEADERS_TO_SPLIT_ON
+    )
+    if tokenizer_name:
+        size_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+            _load_tokenizer(tokenizer_name),
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+    else:
+        size_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
 
+    sections: List[Document] = []
     for doc in docs:
         try:
-            md_sections = splitter.split_text(doc.page_content)
-            for idx, section in enumerate(md_sections):
+            for section in header_splitter.split_text(doc.page_content):
                 metadata = dict(doc.metadata)
-                metadata.update({
-                    "chunk_id": str(uuid.uuid4()),
-                    "chunk_index": idx,
-                    "header": section.metadata.get("header", "")
-                })
-                chunked_docs.append(Document(page_content=section.page_content, metadata=metadata))
+                metadata.update(section.metadata)
+                metadata["header"] = " > ".join(
+                    section.metadata[key]
+                    for _, key in HEADERS_TO_SPLIT_ON
+                    if key in section.metadata
+                )
+                sections.append(
+                    Document(page_content=section.page_content, metadata=metadata)
+                )
         except Exception as e:
             print(f"Error while splitting document '{doc.metadata.get('source', '')}': {e}")
 
+    # One pass over all sections; chunks keep their section's metadata
+    chunked_docs = size_splitter.split_documents(sections)
+
+    chunk_index_by_source: dict = {}
+    for chunk in chunked_docs:
+        source = chunk.metadata.get("source", "")
+        idx = chunk_index_by_source.get(source, 0)
+        chunk_index_by_source[source] = idx + 1
+        chunk.metadata["chunk_index"] = idx
+        chunk.metadata["chunk_id"] = make_chunk_id(source, idx, chunk.page_content)
+
     return chunked_docs
 
 
@@ -180,26 +499,85 @@ def build_qdrant_index(
     vector_size: int = 384,
     distance: str = "Cosine",
     replica_count: int = 1,
-    shard_number: int = 1
+    shard_number: int = 1,
+    manifest: Optional[IngestManifest] = None,
+    recreate: bool = False,
+    batch_size: int = 256,
+    upload_workers: int = 4,
+    prefer_grpc: bool = True,
+    grpc_port: int = 6334,
+    defer_indexing: bool = True,
+    sparse_model: Optional[str] = Config.RAG_SPARSE_MODEL,
+    chunk_tokens: int = Config.INGEST_CHUNK_TOKENS,
+    chunk_overlap_tokens: int = Config.INGEST_CHUNK_OVERLAP_TOKENS,
 ) -> QdrantVectorStore:
-    processed_docs = preprocess_documents(docs)
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    embeddings = HuggingFaceEmbeddings(model_name=embedding_model, model_kwargs={"device": device})
-    client = QdrantClient(url=qdrant_url, api_key=api_key, prefer_grpc=False)
+    """Index ``docs`` into Qdrant.
+
+    With a manifest, only new or changed sources (or sources embedded with a
+    different model) are chunked and upserted; their previous chunks and the
+    chunks of deleted sources are removed. ``recreate`` drops the collection
+    and reindexes everything.
+
+    Points are uploaded in ``batch_size`` batches over gRPC. With
+    ``defer_indexing`` the HNSW index is built once after the bulk load
+    rather than incrementally during it.
+
+    With ``sparse_model`` (e.g. "Qdrant/bm25") every point also gets a sparse
+    vector for hybrid search; changing it reindexes all sources.
 
-    if client.collection_exists(collection_name):
+    Chunks hold at most ``chunk_tokens`` tokens of the embedding model's
+    tokenizer, so none is truncated by the model; changing the chunk size
+    reindexes all sources too.
+    """
+    # Shared, disk-cached embeddings: unchanged chunks are not re-embedded
+    embeddings = get_embeddings(embedding_model)
+    sparse_embeddings = get_sparse_embeddings(sparse_model) if sparse_model else None
+    index_signature = (
+        f"{embedding_model}+{sparse_model}" if sparse_model else embedding_model
+    )
+    index_signature += f"|{chunking_signature(chunk_tokens, chunk_overlap_tokens)}"
+    client = QdrantClient(
+        url=qdrant_url, api_key=api_key, prefer_grpc=prefer_grpc, grpc_port=grpc_port
+    )
+
+    if recreate and client.collection_exists(collection_name):
         print(f"Collection '{collection_name}' exists. Deleting for reset.")
         client.delete_collection(collection_name)
 
-    client.create_collection(
-        collection_name=collection_name,
-        vectors_config=q_models.VectorParams(
-            size=vector_size,
-            distance=getattr(q_models.Distance, distance.upper())
-        ),
-        replication_factor=replica_count,
-        shard_number=shard_number,
-    )
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=q_models.VectorParams(
+                size=vector_size,
+                distance=getattr(q_models.Distance, distance.upper())
+            ),
+            sparse_vectors_config={
+                Config.RAG_SPARSE_VECTOR_NAME: q_models.SparseVectorParams(
+                    modifier=q_models.Modifier.IDF
+                )
+            } if sparse_embeddings is not None else None,
+            replication_factor=replica_count,
+            shard_number=shard_number,
+        )
+        if manifest is not None:
+            # Nothing in the manifest is in a fresh collection
+            for entry in manifest.entries.values():
+                entry.pop("indexed_hash", None)
+                entry.pop("chunk_ids", None)
+
+    elif sparse_embeddings is not None:
+        collection = client.get_collection(collection_name)
+        sparse_config = collection.config.params.sparse_vectors or {}
+        if Config.RAG_SPARSE_VECTOR_NAME not in sparse_config:
+            print(
+                f"Collection '{collection_name}' has no sparse vectors; indexing "
+                "dense only. Use recreate=True to enable hybrid search."
+            )
+            sparse_embeddings = None
+            index_signature = (
+                f"{embedding_model}|"
+                f"{chunking_signature(chunk_tokens, chunk_overlap_tokens)}"
+            )
 
     vectorstore = QdrantVectorStore(
         client=client,
@@ -207,10 +585,172 @@ def build_qdrant_index(
         embedding=embeddings,
     )
 
-    vectorstore.add_documents(processed_docs)
+    changed_docs, stale_ids = _plan_incremental_update(docs, manifest, index_signature)
+    if stale_ids:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=q_models.PointIdsList(points=stale_ids),
+        )
+
+    processed_docs = preprocess_documents(
+        changed_docs,
+        chunk_size=chunk_tokens,
+        chunk_overlap=chunk_overlap_tokens,
+        tokenizer_name=embedding_model,
+    )
+    if processed_docs:
+        if defer_indexing:
+            client.update_collection(
+                collection_name=collection_name,
+                optimizers_config=q_models.OptimizersConfigDiff(indexing_threshold=0),
+            )
+        try:
+            bulk_upsert_documents(
+                client, collection_name, embeddings, processed_docs,
+                batch_size=batch_size, upload_workers=upload_workers,
+                sparse_embeddings=sparse_embeddings,
+            )
+        finally:
+            if defer_indexing:
+                client.update_collection(
+                    collection_name=collection_name,
+                    optimizers_config=q_models.OptimizersConfigDiff(
+                        indexing_threshold=DEFAULT_INDEXING_THRESHOLD
+                    ),
+                )
+
+    if stale_ids or processed_docs:
+        bump_index_version(client, collection_name)
+
+    if manifest is not None:
+        _record_indexed(manifest, changed_docs, processed_docs, index_signature)
+
     return vectorstore
 
 
+def build_local_index(
+    docs: List[Document],
+    index_dir: str = Config.LOCAL_INDEX_DIR,
+    embedding_model: str = Config.EMBEDDING_MODEL,
+    manifest: Optional[IngestManifest] = None,
+    recreate: bool = False,
+    batch_size: int = 256,
+    quantization: str = Config.LOCAL_INDEX_QUANTIZATION,
+    nlist: int = Config.LOCAL_INDEX_NLIST,
+    sparse_model: Optional[str] = Config.RAG_SPARSE_MODEL,
+    chunk_tokens: int = Config.INGEST_CHUNK_TOKENS,
+    chunk_overlap_tokens: int = Config.INGEST_CHUNK_OVERLAP_TOKENS,
+) -> LocalVectorIndex:
+    """Index ``docs`` into the embedded NumPy index used when Qdrant is not running.
+
+    Incremental updates follow the same manifest rules as ``build_qdrant_index``;
+    give each backend its own manifest if both are built from one directory.
+    """
+    embeddings = get_embeddings(embedding_model)
+    sparse_embeddings = get_sparse_embeddings(sparse_model) if sparse_model else None
+    index_signature = (
+        f"{embedding_model}+{sparse_model}" if sparse_model else embedding_model
+    )
+    index_signature += f"|{chunking_signature(chunk_tokens, chunk_overlap_tokens)}"
+
+    if recreate or LocalVectorIndex.read_version(index_dir) is None:
+        index = LocalVectorIndex(index_dir, quantization=quantization, nlist=nlist)
+        if manifest is not None:
+            for entry in manifest.entries.values():
+                entry.pop("indexed_hash", None)
+                entry.pop("chunk_ids", None)
+    else:
+        index = LocalVectorIndex.load(index_dir)
+        index.quantization, index.nlist = quantization, nlist
+
+    changed_docs, stale_ids = _plan_incremental_update(docs, manifest, index_signature)
+    index.delete(stale_ids)
+
+    processed_docs = preprocess_documents(
+        changed_docs,
+        chunk_size=chunk_tokens,
+        chunk_overlap=chunk_overlap_tokens,
+        tokenizer_name=embedding_model,
+    )
+    start = time.perf_counter()
+    for batch_start in range(0, len(processed_docs), batch_size):
+        batch = processed_docs[batch_start:batch_start + batch_size]
+        texts = [doc.page_content for doc in batch]
+        sparse_vectors = None
+        if sparse_embeddings is not None:
+            sparse_vectors = sparse_embeddings.embed_documents(texts)
+        index.upsert(
+            [doc.metadata["chunk_id"] for doc in batch],
+            embeddings.embed_documents(texts),
+            [
+                {
+                    QdrantVectorStore.CONTENT_KEY: doc.page_content,
+                    QdrantVectorStore.METADATA_KEY: doc.metadata,
+                }
+                for doc in batch
+            ],
+            sparse_vectors,
+        )
+    if processed_docs:
+        elapsed = time.perf_counter() - start
+        print(f"Embedded {len(processed_docs)} chunks in {elapsed:.1f}s")
+
+    if stale_ids or processed_docs or recreate:
+        index.save()
+
+    if manifest is not None:
+        _record_indexed(manifest, changed_docs, processed_docs, index_signature)
+
+    return index
+
+
+def _plan_incremental_update(
+    docs: List[Document], manifest: Optional[IngestManifest], index_signature: str
+) -> Tuple[List[Document], List[str]]:
+    """Documents to (re)index and chunk IDs to delete, according to the manifest"""
+    if manifest is None:
+        return docs, []
+
+    stale_ids: List[str] = []
+    changed_docs = [
+        doc for doc in docs
+        if manifest.needs_indexing(
+            doc.metadata["source"], doc.metadata.get("content_hash"), index_signature
+        )
+    ]
+    for doc in changed_docs:
+        stale_ids.extend(manifest.chunk_ids(doc.metadata["source"]))
+    for source in manifest.deleted_sources():
+        print(f"==> Removing chunks of deleted source: {source}")
+        stale_ids.extend(manifest.chunk_ids(source))
+        manifest.remove(source)
+    print(
+        f"{len(changed_docs)}/{len(docs)} documents changed, "
+        f"{len(stale_ids)} stale chunks"
+    )
+    return changed_docs, stale_ids
+
+
+def _record_indexed(
+    manifest: IngestManifest,
+    changed_docs: List[Document],
+    processed_docs: List[Document],
+    index_signature: str,
+) -> None:
+    chunk_ids_by_source: dict = {doc.metadata["source"]: [] for doc in changed_docs}
+    for doc in processed_docs:
+        chunk_ids_by_source[doc.metadata["source"]].append(doc.metadata["chunk_id"])
+    for doc in changed_docs:
+        source = doc.metadata["source"]
+        manifest.mark_indexed(
+            source,
+            doc.metadata.get("content_hash"),
+            chunk_ids_by_source[source],
+            index_signature,
+        )
+    manifest.save()
+
+
 def query_qdrant(
     vectorstore: QdrantVectorStore,
     query_text: str,
@@ -228,14 +768,13 @@ def query_qdrant(
         print("Content:\n", doc.page_content, "...\n")
 
 
-import time
-
 if __name__ == "__main__":
     directory = "database"
     print(f"Loading documents from: {directory}")
     start_time = time.time()
 
-    documents = load_documents_from_directory(directory)
+    manifest = get_manifest(directory)
+    documents = load_documents_from_directory(directory, manifest=manifest)
     end_time = time.time()
     elapsed_seconds = end_time - start_time
     elapsed_minutes = elapsed_seconds / 60
@@ -247,7 +786,8 @@ if __name__ == "__main__":
     # vectorstore = build_qdrant_index(
     #     documents,
     #     embedding_model="thanhtantran/Vietnamese_Embedding_v2",
-    #     vector_size=1024
+    #     vector_size=1024,
+    #     manifest=manifest,
     # )
 
     # end_time = time.time()
@@ -259,7 +799,7 @@ if __name__ == "__main__":
     # vectorstore = QdrantVectorStore(
     #     client=QdrantClient(url="http://localhost:6333"),
     #     collection_name="rag_collection",
-    #     embedding=HuggingFaceEmbeddings(model_name="thanhtantran/Vietnamese_Embedding_v2")
+    #     embedding=get_embeddings("thanhtantran/Vietnamese_Embedding_v2")
     # )
 
     # # Simple test query
@@ -0,0 +1,311 @@
+"""Shared, batched and cached text embeddings.
+
+One ``CachedEmbeddings`` instance per model is shared by ingestion, retrieval
+and the LLM response cache, so the model is loaded once per process. Vectors
+are cached on disk keyed by (model, text hash): re-ingesting unchanged chunks
+and repeated queries skip inference. Concurrent ``aembed_query`` calls are
+collected into micro-batches so the model runs once per batch.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """SQLite store of float32 vectors keyed by model and text hash.
+
+    Bounded like the LLM response cache: entries unused for ``ttl`` seconds
+    and the least recently used beyond ``max_entries`` are pruned.
+    """
+
+    PRUNE_EVERY = 1000  # rows written between prunes
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = Config.EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl: int = Config.EMBEDDING_CACHE_TTL,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._written_since_prune = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(model TEXT, text_hash TEXT, vector BLOB, last_used REAL DEFAULT 0, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+            columns = [
+                row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")
+            ]
+            if "last_used" not in columns:
+                # Caches written before eviction existed
+                self._conn.execute(
+                    "ALTER TABLE embeddings ADD COLUMN last_used REAL DEFAULT 0"
+                )
+                self._conn.execute(
+                    "UPDATE embeddings SET last_used = ?", (time.time(),)
+                )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used "
+                "ON embeddings (last_used)"
+            )
+            self._conn.commit()
+        self.prune()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? "
+                        "WHERE model = ? AND text_hash = ?",
+                        [(now, model, text_hash) for text_hash, _ in rows],
+                    )
+                    self._conn.commit()
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items: List[Tuple[str, List[float]]]) -> None:
+        now = time.time()
+        rows = [
+            (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text_hash, vector in items
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._written_since_prune += len(rows)
+            due = self._written_since_prune >= self.PRUNE_EVERY
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop expired entries, then the least recently used over the limit"""
+        with self._lock:
+            self._written_since_prune = 0
+            removed = self._conn.execute(
+                "DELETE FROM embeddings WHERE last_used < ?", (time.time() - self.ttl,)
+            ).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+        if removed:
+            logger.info(f"Pruned {removed} cached embeddings")
+        return removed
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` over sentence-transformers with caching and batching"""
+
+    def __init__(
+        self,
+        model_name: str,
+        normalize: bool = False,
+        batch_size: int = Config.EMBEDDING_BATCH_SIZE,
+        backend: str = Config.EMBEDDING_BACKEND,
+        onnx_file: str = Config.EMBEDDING_ONNX_FILE,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model_name = model_name
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.cache = cache
+        # Normalized and raw vectors differ, so they are cached separately
+        self._cache_model_key = f"{model_name}|{backend}|{onnx_file}|norm={normalize}"
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"computed": 0, "cache_hits": 0, "batches": 0}
+
+    def _load_model(self):
+        with self._model_lock:
+            if self._model is None:
+                import torch
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                model_kwargs = {"device": device}
+                if self.backend != "torch":
+                    model_kwargs["backend"] = self.backend
+                    if self.onnx_file:
+                        model_kwargs["model_kwargs"] = {"file_name": self.onnx_file}
+
+                logger.info(
+                    f"Loading embedding model {self.model_name} "
+                    f"({self.backend}, {device})"
+                )
+                self._model = HuggingFaceEmbeddings(
+                    model_name=self.model_name,
+                    model_kwargs=model_kwargs,
+                    encode_kwargs={
+                        "batch_size": self.batch_size,
+                        "normalize_embeddings": self.normalize,
+                    },
+                )
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, computing only those missing from the cache"""
+        if not texts:
+            return []
+
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        cached = (
+            self.cache.get_many(self._cache_model_key, list(set(hashes)))
+            if self.cache
+            else {}
+        )
+
+        missing: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+
+        if missing:
+            model = self._load_model()
+            missing_hashes = list(missing)
+            vectors = model.embed_documents([missing[h] for h in missing_hashes])
+            computed = dict(zip(missing_hashes, vectors))
+            if self.cache:
+                self.cache.put_many(self._cache_model_key, list(computed.items()))
+            cached.update(computed)
+            self._stats["computed"] += len(missing)
+            self._stats["batches"] += 1
+
+        self._stats["cache_hits"] += len(texts) - len(missing)
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Queue the query; concurrent callers share one model invocation"""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._queue_loop is not loop:
+            # Streamlit and scripts may run successive event loops
+            self._queue = asyncio.Queue()
+            self._queue_loop = loop
+            loop.create_task(self._run_batcher(self._queue))
+
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run_batcher(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + Config.EMBEDDING_MICROBATCH_WAIT
+            while len(batch) < Config.EMBEDDING_MICROBATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(self.embed_documents, texts)
+                for (_, future), vector in zip(batch, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_instances: Dict[str, CachedEmbeddings] = {}
+_instances_lock = threading.Lock()
+
+
+def get_embeddings(model_name: str = Config.EMBEDDING_MODEL) -> CachedEmbeddings:
+    """Return the process-wide embeddings for ``model_name``.
+
+    One instance (and one loaded model) per model name; callers that need
+    unit-length vectors normalize the output themselves.
+    """
+    global _embedding_cache
+    with _instances_lock:
+        instance = _embedding_instances.get(model_name)
+        if instance is None:
+            if Config.ENABLE_EMBEDDING_CACHE and _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(Config.EMBEDDING_CACHE_PATH)
+            instance = CachedEmbeddings(model_name, cache=_embedding_cache)
+            _embedding_instances[model_name] = instance
+    return instance
+
+
+_sparse_instances: Dict[str, Any] = {}
+
+
+def get_sparse_embeddings(model_name: str = Config.RAG_SPARSE_MODEL):
+    """The process-wide fastembed sparse model (BM25/SPLADE), or None if disabled"""
+    if not model_name:
+        return None
+    with _instances_lock:
+        instance = _sparse_instances.get(model_name)
+        if instance is None:
+            from langchain_qdrant import FastEmbedSparse
+
+            logger.info(f"Loading sparse embedding model {model_name}")
+            instance = FastEmbedSparse(model_name=model_name)
+            _sparse_instances[model_name] = instance
+    return instance
@@ -1,31 +1,21 @@
 import os
-import gc
-import torch
 import logging
-from datetime import datetime
 from io import BytesIO
-
-from diffusers import DiffusionPipeline, LCMScheduler
-from huggingface_hub import hf_hub_download
-from PIL import Image
-from typing import Optional
-
-from datetime import datetime
-from diffusers import EulerDiscreteScheduler
-from diffusers.utils import load_image
-
-from google import genai
-from google.genai import types
+from typing import TYPE_CHECKING, Optional
 
 from config.config import Config
 
+# torch, diffusers and google-genai are imported by the provider that needs them
+if TYPE_CHECKING:
+    from PIL import Image
+
 logger = logging.getLogger(__name__)
 
 
 class ImageGeneratorWrapper:
     def __init__(self, provider: str = "diffusers", device: Optional[str] = None):
         self.provider = provider
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.device = device or self.default_device(provider)
         self.model = None
 
         if self.provider == "diffusers":
@@ -35,7 +25,20 @@ class ImageGeneratorWrapper:
         else:
             raise ValueError(f"Unknown image generation provider: {self.provider}")
 
+    @staticmethod
+    def default_device(provider: str) -> str:
+        """Only local diffusion uses the GPU; hosted providers never import torch"""
+        if provider != "diffusers":
+            return "cpu"
+        import torch
+
+        return "cuda" if torch.cuda.is_available() else "cpu"
+
     def _init_diffusers(self):
+        import torch
+        from diffusers import DiffusionPipeline, LCMScheduler
+        from huggingface_hub import hf_hub_download
+
         logger.info("Initializing Diffusers pipeline...")
         base_model_id = "stabilityai/stable-diffusion-xl-base-1.0"
         repo_name = "tianweiy/DMD2"
@@ -66,10 +69,12 @@ class ImageGeneratorWrapper:
         self.model = pipe
 
     def _init_google_ai_studio(self):
+        from google import genai
+
         logger.info("Initializing Google AI Studio API...")
         self.model = genai.Client()
 
-    def generate(self, prompt: str, **kwargs) -> Image.Image:
+    def generate(self, prompt: str, **kwargs) -> "Image.Image":
         if self.provider == "diffusers":
             return self._generate_diffusers(prompt)
         elif self.provider == "google_ai_studio":
@@ -79,7 +84,7 @@ class ImageGeneratorWrapper:
         else:
             raise NotImplementedError
 
-    def _generate_diffusers(self, prompt: str) -> Image.Image:
+    def _generate_diffusers(self, prompt: str) -> "Image.Image":
         return self.model(
             prompt=prompt,
             num_inference_steps=4,
@@ -88,7 +93,10 @@ class ImageGeneratorWrapper:
             height=512,
         ).images[0]
 
-    def _generate_google(self, prompt: str) -> Image.Image:
+    def _generate_google(self, prompt: str) -> "Image.Image":
+        from google.genai import types
+        from PIL import Image
+
         contents = [
             types.Content(
                 role="user",
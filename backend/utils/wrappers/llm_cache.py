@@ -0,0 +1,320 @@
+"""Two-tier response cache for LLM calls.
+
+Tier one matches a hash of the full message list and model parameters. Tier
+two matches standalone questions (system prompt + one user message, no
+history) by embedding similarity, so rephrased FAQ-style questions are served
+without a provider round trip.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    import numpy as np
+
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return (array / norm).tolist() if norm else array.tolist()
+
+
+@dataclass
+class CacheEntry:
+    content: str
+    created_at: float
+    size: int
+    scope: str
+    embedding: Optional[List[float]] = None
+
+
+class LLMResponseCache:
+    """Bounded, TTL-expiring LRU cache of LLM responses persisted to disk"""
+
+    def __init__(
+        self,
+        path: str = Config.LLM_CACHE_PATH,
+        max_entries: int = Config.LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = Config.LLM_CACHE_MAX_BYTES,
+        ttl: int = Config.LLM_CACHE_TTL,
+        similarity_threshold: float = Config.LLM_CACHE_SIMILARITY_THRESHOLD,
+        semantic_enabled: bool = Config.ENABLE_LLM_SEMANTIC_CACHE,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.semantic_enabled = semantic_enabled
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._write_lock = threading.Lock()
+        self._unsaved = 0
+        self._embeddings = None
+        # Questions embedded on a miss are embedded again on put; remember them
+        self._recent_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    # Keys
+
+    @staticmethod
+    def _serialize_message(message: BaseMessage) -> Dict[str, Any]:
+        return {
+            "type": message.type,
+            "content": message.content,
+            "tool_calls": getattr(message, "tool_calls", None) or [],
+            "tool_call_id": getattr(message, "tool_call_id", None),
+        }
+
+    @classmethod
+    def make_key(
+        cls, messages: List[BaseMessage], params: Dict[str, Any], namespace: str
+    ) -> str:
+        payload = {
+            "namespace": namespace,
+            "params": params,
+            "messages": [cls._serialize_message(m) for m in messages],
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _standalone_question(messages: List[BaseMessage]) -> Optional[str]:
+        """Return the user text if the request carries no conversation history"""
+        if (
+            len(messages) == 2
+            and isinstance(messages[0], SystemMessage)
+            and isinstance(messages[1], HumanMessage)
+            and isinstance(messages[1].content, str)
+        ):
+            return messages[1].content.strip()
+        return None
+
+    @staticmethod
+    def _semantic_scope(
+        messages: List[BaseMessage], params: Dict[str, Any], namespace: str
+    ) -> str:
+        """Semantic matches are only valid under the same system prompt and model"""
+        raw = json.dumps(
+            {"namespace": namespace, "params": params, "system": messages[0].content},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # Embeddings
+
+    def _embed(self, text: str) -> List[float]:
+        embedding = self._recent_embeddings.get(text)
+        if embedding is not None:
+            return embedding
+
+        if self._embeddings is None:
+            from utils.wrappers.embedding_wrapper import get_embeddings
+
+            # Shares the retriever's instance, so the model is loaded only once
+            self._embeddings = get_embeddings(
+                Config.LLM_CACHE_EMBEDDING_MODEL or Config.EMBEDDING_MODEL
+            )
+        embedding = _normalize(self._embeddings.embed_query(text))
+        self._recent_embeddings[text] = embedding
+        if len(self._recent_embeddings) > 256:
+            self._recent_embeddings.popitem(last=False)
+        return embedding
+
+    def _semantic_lookup(self, scope: str, embedding: List[float]) -> Optional[str]:
+        import numpy as np
+
+        keys = [
+            key
+            for key, entry in self._entries.items()
+            if entry.scope == scope and entry.embedding
+        ]
+        if not keys:
+            return None
+
+        matrix = np.asarray(
+            [self._entries[k].embedding for k in keys], dtype=np.float32
+        )
+        # Embeddings are L2-normalized, so the dot product is cosine similarity
+        scores = matrix @ np.asarray(embedding, dtype=np.float32)
+        best = int(np.argmax(scores))
+        if float(scores[best]) >= self.similarity_threshold:
+            return keys[best]
+        return None
+
+    # Storage
+
+    def _is_expired(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.created_at > self.ttl
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total_bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _read(self) -> Dict[str, CacheEntry]:
+        """Read persisted entries from disk; runs in a thread"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            return {key: CacheEntry(**data) for key, data in raw.items()}
+        except Exception as e:
+            logger.error(f"Error loading LLM response cache: {e}")
+            return {}
+
+    async def load(self) -> None:
+        """Load persisted entries once, dropping expired ones.
+
+        The file is read in a thread but merged on the event loop, under a
+        lock, so concurrent first lookups load it only once.
+        """
+        async with self._load_lock:
+            if self._loaded:
+                return
+            entries = await asyncio.to_thread(self._read)
+            for key, entry in entries.items():
+                if key not in self._entries and not self._is_expired(entry):
+                    self._entries[key] = entry
+                    self._total_bytes += entry.size
+            self._evict()
+            self._loaded = True
+            if entries:
+                logger.info(f"Loaded {len(self._entries)} cached LLM responses")
+
+    def _snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copy the entries for writing; must run where they are mutated"""
+        # Entries are replaced, never modified, so a shallow copy is enough
+        return {key: dict(vars(entry)) for key, entry in self._entries.items()}
+
+    def _write(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        """Atomically write a snapshot to disk; safe to call from a thread"""
+        try:
+            with self._write_lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving LLM response cache: {e}")
+
+    def save(self) -> None:
+        """Write the cache to disk, e.g. at shutdown"""
+        if not self._loaded:
+            return
+        self._unsaved = 0
+        self._write(self._snapshot())
+
+    # Public API
+
+    async def get(
+        self, messages: List[BaseMessage], params: Dict[str, Any], namespace: str
+    ) -> Optional[str]:
+        """Return a cached response text, or None on a miss"""
+        if not self._loaded:
+            await self.load()
+
+        key = self.make_key(messages, params, namespace)
+        entry = self._entries.get(key)
+        if entry and not self._is_expired(entry):
+            self._entries.move_to_end(key)
+            self._stats["exact_hits"] += 1
+            return entry.content
+        if entry:
+            self._remove(key)
+
+        question = self._standalone_question(messages)
+        if self.semantic_enabled and question:
+            try:
+                embedding = await asyncio.to_thread(self._embed, question)
+                scope = self._semantic_scope(messages, params, namespace)
+                match = self._semantic_lookup(scope, embedding)
+                if match and not self._is_expired(self._entries[match]):
+                    self._entries.move_to_end(match)
+                    self._stats["semantic_hits"] += 1
+                    return self._entries[match].content
+            except Exception as e:
+                logger.error(f"Semantic cache lookup failed: {e}")
+
+        self._stats["misses"] += 1
+        return None
+
+    async def put(
+        self,
+        messages: List[BaseMessage],
+        params: Dict[str, Any],
+        namespace: str,
+        content: str,
+    ) -> None:
+        """Store a response text for later exact and semantic lookups"""
+        if not self._loaded:
+            await self.load()
+
+        key = self.make_key(messages, params, namespace)
+        scope = ""
+        embedding = None
+        question = self._standalone_question(messages)
+        if self.semantic_enabled and question:
+            try:
+                embedding = await asyncio.to_thread(self._embed, question)
+                scope = self._semantic_scope(messages, params, namespace)
+            except Exception as e:
+                logger.error(f"Error embedding cache entry: {e}")
+
+        size = len(content.encode("utf-8")) + (len(embedding) * 4 if embedding else 0)
+        self._remove(key)
+        self._entries[key] = CacheEntry(
+            content=content,
+            created_at=time.time(),
+            size=size,
+            scope=scope,
+            embedding=embedding,
+        )
+        self._total_bytes += size
+        self._evict()
+
+        self._unsaved += 1
+        if self._unsaved >= Config.LLM_CACHE_SAVE_EVERY:
+            self._unsaved = 0
+            await asyncio.to_thread(self._write, self._snapshot())
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "semantic_enabled": self.semantic_enabled,
+        }
+
+
+# Shared across all LLMWrapper instances
+llm_response_cache = LLMResponseCache()
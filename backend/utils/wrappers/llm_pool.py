@@ -0,0 +1,273 @@
+"""Per-provider admission control for LLM calls.
+
+Every provider gets one shared gate: a semaphore capping in-flight requests,
+a token bucket smoothing the request rate, and a circuit breaker that stops
+sending traffic to a provider that keeps failing. LLMWrapper runs each call
+through ``call_with_resilience`` (or ``stream_with_resilience``) which adds
+jittered retries on transient errors.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import time
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when a provider is rejecting traffic or the queue wait timed out"""
+
+
+class TokenBucket:
+    """Async token bucket; ``rate_per_minute`` <= 0 disables limiting"""
+
+    def __init__(self, rate_per_minute: int, capacity: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, rate_per_minute // 6)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, half-opens after ``reset_timeout``.
+
+    In half-open state exactly one probe request is let through; the rest
+    are rejected until the probe reports success or failure.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """The probe ended without a verdict (cancelled, queue timeout, ...)"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        # A failed probe in half-open state re-opens immediately
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("[LLMPool] Circuit opened after repeated failures")
+            self._opened_at = time.monotonic()
+
+
+class ProviderGate:
+    """Concurrency, rate and failure limits shared by all clients of a provider"""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.semaphore = asyncio.Semaphore(
+            Config.LLM_MAX_CONCURRENCY.get(provider, 4)
+        )
+        self.bucket = TokenBucket(Config.LLM_RATE_LIMIT_PER_MINUTE.get(provider, 0))
+        self.breaker = CircuitBreaker(
+            Config.LLM_CIRCUIT_FAILURE_THRESHOLD, Config.LLM_CIRCUIT_RESET_TIMEOUT
+        )
+        if provider == "ollama":
+            self.max_retries = Config.OLLAMA_MAX_RETRIES
+            self.retry_delay = Config.OLLAMA_RETRY_DELAY
+        else:
+            self.max_retries = Config.MAX_RETRIES
+            self.retry_delay = Config.RETRY_DELAY
+        self.waiting = 0
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "waiting": self.waiting,
+            "available_slots": self.semaphore._value,
+        }
+
+
+_gates: Dict[str, ProviderGate] = {}
+
+
+def get_provider_gate(provider: str) -> ProviderGate:
+    gate = _gates.get(provider)
+    if gate is None:
+        gate = ProviderGate(provider)
+        _gates[provider] = gate
+    return gate
+
+
+def get_pool_status() -> Dict[str, Any]:
+    return {provider: gate.get_status() for provider, gate in _gates.items()}
+
+
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of SDK errors: ollama/httpx ``status_code``, google ``code``"""
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    value = getattr(getattr(error, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Errors worth retrying, judged by exception type and status code only"""
+    import httpx
+
+    # LangChain integrations sometimes wrap the SDK error
+    for candidate in (error, error.__cause__):
+        if candidate is None:
+            continue
+        if isinstance(
+            candidate,
+            (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError),
+        ):
+            return True
+        if _status_code(candidate) in TRANSIENT_STATUS_CODES:
+            return True
+    return False
+
+
+@asynccontextmanager
+async def _admitted(provider: str, gate: ProviderGate) -> AsyncIterator[None]:
+    """Hold one of the provider's slots: circuit, queue and rate limit"""
+    is_probe = gate.breaker.state == "half_open"
+    if not gate.breaker.allow_request():
+        raise LLMUnavailableError(f"{provider} circuit is open")
+    try:
+        gate.waiting += 1
+        try:
+            await asyncio.wait_for(
+                gate.semaphore.acquire(), timeout=Config.LLM_QUEUE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError(
+                f"{provider} queue wait exceeded {Config.LLM_QUEUE_TIMEOUT}s"
+            )
+        finally:
+            gate.waiting -= 1
+
+        try:
+            await gate.bucket.acquire()
+            yield
+        finally:
+            gate.semaphore.release()
+    finally:
+        # No-op once the probe recorded success or failure
+        if is_probe:
+            gate.breaker.release_probe()
+
+
+async def _backoff(gate: ProviderGate, attempt: int) -> None:
+    # Full jitter keeps retries from synchronized clients spread out
+    await asyncio.sleep(random.uniform(0, gate.retry_delay * (2**attempt)))
+
+
+async def call_with_resilience(
+    provider: str, call: Callable[[], Awaitable[Any]]
+) -> Any:
+    """Run ``call`` under the provider's gate with jittered exponential retries"""
+    gate = get_provider_gate(provider)
+    last_error: Optional[Exception] = None
+
+    for attempt in range(gate.max_retries + 1):
+        async with _admitted(provider, gate):
+            try:
+                result = await call()
+                gate.breaker.record_success()
+                return result
+            except Exception as e:
+                last_error = e
+                if not is_transient_error(e):
+                    # The provider answered; the request itself was bad
+                    gate.breaker.record_success()
+                    raise
+                gate.breaker.record_failure()
+                logger.warning(
+                    f"[LLMPool] Transient error from {provider} "
+                    f"(attempt {attempt + 1}/{gate.max_retries + 1}): {e}"
+                )
+
+        if attempt < gate.max_retries:
+            await _backoff(gate, attempt)
+
+    raise last_error
+
+
+async def stream_with_resilience(
+    provider: str, open_stream: Callable[[], AsyncIterator[Any]]
+) -> AsyncIterator[Any]:
+    """Streaming counterpart of ``call_with_resilience``.
+
+    Retries only until the first chunk arrives; after that a failure is
+    raised to the caller, which has already consumed partial output.
+    """
+    gate = get_provider_gate(provider)
+
+    for attempt in range(gate.max_retries + 1):
+        started = False
+        async with _admitted(provider, gate):
+            try:
+                async for chunk in open_stream():
+                    started = True
+                    yield chunk
+                gate.breaker.record_success()
+                return
+            except Exception as e:
+                if not is_transient_error(e):
+                    gate.breaker.record_success()
+                    raise
+                gate.breaker.record_failure()
+                if started or attempt >= gate.max_retries:
+                    raise
+                logger.warning(
+                    f"[LLMPool] Transient error opening {provider} stream "
+                    f"(attempt {attempt + 1}/{gate.max_retries + 1}): {e}"
+                )
+
+        await _backoff(gate, attempt)
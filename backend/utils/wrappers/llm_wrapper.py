@@ -1,52 +1,410 @@
 """LLM Wrapper with async support for different LLM providers"""
 
-from typing import List
-from langchain_core.messages import BaseMessage
-from langchain_community.chat_models import ChatOllama
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
+import hashlib
+import json
+import time
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.tools import BaseTool
 from config.config import Config
+from .llm_cache import llm_response_cache
+from .llm_pool import (
+    LLMUnavailableError,
+    call_with_resilience,
+    is_transient_error,
+    stream_with_resilience,
+)
 import logging
 
+# Provider SDKs are imported when a model for that provider is created
+if TYPE_CHECKING:
+    import httpx
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
 logger = logging.getLogger(__name__)
 
+# Providers whose chat models implement LangChain's ``bind_tools``
+NATIVE_TOOL_PROVIDERS = ("google_ai_studio",)
+
+
+def create_chat_model(provider: str, profile: Dict[str, Any]):
+    """Build the LangChain chat model for ``provider`` using a model profile"""
+    if provider == "google_ai_studio":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        options = {}
+        if profile.get("max_tokens"):
+            options["max_output_tokens"] = profile["max_tokens"]
+        if profile.get("thinking_budget") is not None:
+            options["thinking_budget"] = profile["thinking_budget"]
+        try:
+            return ChatGoogleGenerativeAI(
+                model=profile["google_model"],
+                google_api_key=Config.GOOGLE_API_KEY,
+                temperature=profile["temperature"],
+                # Counts attempts: a single call, call_with_resilience retries
+                max_retries=1,
+                **options,
+            )
+        except Exception as e:
+            logger.error(f"[LLMWrapper] Error initializing ChatGoogleGenerativeAI: {e}")
+            raise e
+
+    # Ollama
+    from langchain_ollama import ChatOllama
+
+    options = {}
+    if profile.get("max_tokens"):
+        options["num_predict"] = profile["max_tokens"]
+    sync_transport, async_transport = ollama_transports(Config.OLLAMA_BASE_URL)
+    return ChatOllama(
+        model=profile["ollama_model"],
+        base_url=Config.OLLAMA_BASE_URL,
+        seed=42,
+        temperature=profile["temperature"],
+        client_kwargs={"timeout": Config.LLM_TIMEOUT},
+        sync_client_kwargs={"transport": sync_transport},
+        async_client_kwargs={"transport": async_transport},
+        num_ctx=profile["context_length"],
+        top_k=Config.LLM_TOP_K,
+        top_p=Config.LLM_TOP_P,
+        repeat_penalty=Config.LLM_REPETITION_PENALTY,
+        keep_alive=Config.OLLAMA_KEEP_ALIVE,
+        **options,
+    )
+
+
+# Shared transports, one per provider endpoint. Models for different profiles
+# only differ in request parameters, so they can reuse the same connections.
+_ollama_transports: Dict[
+    str, Tuple["httpx.HTTPTransport", "httpx.AsyncHTTPTransport"]
+] = {}
+_google_transport_owners: Dict[str, "ChatGoogleGenerativeAI"] = {}
+
+
+def ollama_transports(
+    base_url: str,
+) -> Tuple["httpx.HTTPTransport", "httpx.AsyncHTTPTransport"]:
+    """The process-wide httpx connection pools for an Ollama endpoint.
+
+    Each ChatOllama builds its own ollama clients; handing them the same
+    transports through ``sync_client_kwargs``/``async_client_kwargs`` makes
+    them reuse the same keep-alive connections.
+    """
+    transports = _ollama_transports.get(base_url)
+    if transports is None:
+        import httpx
+
+        transports = (httpx.HTTPTransport(), httpx.AsyncHTTPTransport())
+        _ollama_transports[base_url] = transports
+    return transports
+
+
+def share_transport(provider: str, model) -> None:
+    """Point a Gemini ``model`` at the process-wide client for its endpoint"""
+    if provider != "google_ai_studio":
+        # Ollama models get shared transports in create_chat_model
+        return
+    endpoint = str(getattr(model, "client_options", None) or "default")
+    owner = _google_transport_owners.setdefault(endpoint, model)
+    if owner is not model:
+        model.client = owner.client
+
+
+_genai_client = None
+
+
+def get_genai_client():
+    """Process-wide google-genai client for the context cache API"""
+    global _genai_client
+    if _genai_client is None:
+        from google import genai
+
+        _genai_client = genai.Client(api_key=Config.GOOGLE_API_KEY)
+    return _genai_client
+
+
+def is_uncacheable_prompt_error(error: Exception) -> bool:
+    """The API refused this prompt itself (too small, model unsupported);
+    network, quota and server errors are worth retrying later."""
+    from google.genai import errors
+
+    return isinstance(error, errors.ClientError) and error.code in (400, 404)
+
+
+def share_async_transport(provider: str, model) -> None:
+    """Gemini builds its gRPC asyncio client lazily inside the event loop"""
+    if provider != "google_ai_studio" or model.async_client_running is not None:
+        return
+    endpoint = str(getattr(model, "client_options", None) or "default")
+    owner = _google_transport_owners.get(endpoint, model)
+    model.async_client_running = owner.async_client
+
 
 class LLMWrapper:
-    def __init__(self):
+    def __init__(self, profile: str = "default"):
         self.provider = Config.LLM_PROVIDER
+        self.profile_name = profile if profile in Config.LLM_PROFILES else "default"
+        self.profile = Config.LLM_PROFILES[self.profile_name]
+        self._tool_bound_models: Dict[Tuple[str, ...], object] = {}
+        # Gemini context caches: prompt hash -> (cache name, expiry timestamp)
+        self._context_caches: Dict[str, Tuple[str, float]] = {}
+        self._uncacheable_prompts: Set[str] = set()
+        self._context_cache_lock: Optional[asyncio.Lock] = None
+
+        self.model = create_chat_model(self.provider, self.profile)
+        share_transport(self.provider, self.model)
+
+        # Secondary provider used when the primary is failing or saturated
+        fallback = Config.LLM_FALLBACK_PROVIDER
+        self.fallback_provider = fallback if fallback != self.provider else ""
+        self._fallback_model = None
+
+    @property
+    def supports_native_tools(self) -> bool:
+        """Whether tools should be passed to the provider as function schemas"""
+        return (
+            Config.ENABLE_NATIVE_TOOL_CALLING
+            and self.provider in NATIVE_TOOL_PROVIDERS
+            and hasattr(self.model, "bind_tools")
+        )
+
+    def _get_model(self, tools: Optional[Sequence[BaseTool]] = None):
+        """Return the chat model, bound to ``tools`` when native calling is used"""
+        if not tools or not self.supports_native_tools:
+            return self.model
+
+        # Binding converts every tool schema, so keep one bound model per tool set
+        key = tuple(tool.name for tool in tools)
+        bound = self._tool_bound_models.get(key)
+        if bound is None:
+            bound = self.model.bind_tools(list(tools))
+            self._tool_bound_models[key] = bound
+        return bound
+
+    async def _get_context_cache(self, system_prompt: str) -> Optional[str]:
+        """Return a Gemini cached-content name holding ``system_prompt``.
+
+        Caches are created lazily per distinct prompt and recreated after their
+        TTL. Prompts the API refuses to cache (e.g. below the minimum token
+        count) are remembered so we do not retry on every call; transient
+        failures just skip caching for this call.
+        """
+        key = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        if key in self._uncacheable_prompts:
+            return None
+
+        cached = self._context_caches.get(key)
+        if cached and cached[1] > time.time():
+            return cached[0]
+
+        if self._context_cache_lock is None:
+            self._context_cache_lock = asyncio.Lock()
+
+        async with self._context_cache_lock:
+            cached = self._context_caches.get(key)
+            if cached and cached[1] > time.time():
+                return cached[0]
 
-        if self.provider == "google_ai_studio":
             try:
-                self.model = ChatGoogleGenerativeAI(
-                    model=Config.GOOGLE_MODEL,
-                    google_api_key=Config.GOOGLE_API_KEY,
-                    temperature=Config.LLM_TEMPERATURE,
+                from google.genai import types
+
+                client = get_genai_client()
+                ttl = Config.GOOGLE_CONTEXT_CACHE_TTL
+                cache = await client.aio.caches.create(
+                    model=self.profile["google_model"],
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_prompt, ttl=f"{ttl}s"
+                    ),
                 )
             except Exception as e:
-                logger.error(
-                    f"[LLMWrapper] Error initializing ChatGoogleGenerativeAI: {e}"
-                )
+                if is_uncacheable_prompt_error(e):
+                    logger.info(f"[LLMWrapper] Prompt not cacheable: {e}")
+                    self._uncacheable_prompts.add(key)
+                else:
+                    logger.warning(f"[LLMWrapper] Context caching unavailable: {e}")
+                return None
+
+            # Refresh slightly before the provider expires the cache
+            self._context_caches[key] = (cache.name, time.time() + ttl * 0.9)
+            logger.info(f"[LLMWrapper] Created Gemini context cache {cache.name}")
+            return cache.name
+
+    def _cache_params(self, tools: Optional[Sequence[BaseTool]] = None) -> Dict:
+        """Model parameters that must match for a cached response to be reused"""
+        return {
+            "provider": self.provider,
+            "profile": self.profile,
+            "tools": sorted(tool.name for tool in tools) if tools else [],
+        }
+
+    async def invoke(
+        self,
+        messages: List[BaseMessage],
+        tools: Optional[Sequence[BaseTool]] = None,
+        cache_namespace: Optional[str] = None,
+    ) -> BaseMessage:
+        """Invoke the LLM model asynchronously.
+
+        Passing ``cache_namespace`` opts the call into the response cache.
+        """
+        use_cache = Config.ENABLE_LLM_RESPONSE_CACHE and cache_namespace is not None
+        if use_cache:
+            params = self._cache_params(tools)
+            cached = await llm_response_cache.get(messages, params, cache_namespace)
+            if cached is not None:
+                logger.debug(f"[LLMWrapper] Response cache hit ({cache_namespace})")
+                return AIMessage(content=cached)
+
+        response = await self._invoke_model(messages, tools)
+
+        # Only final text answers are reusable; tool calls depend on fresh results
+        if (
+            use_cache
+            and response is not None
+            and not getattr(response, "tool_calls", None)
+            and isinstance(response.content, str)
+            and response.content
+        ):
+            await llm_response_cache.put(
+                messages, params, cache_namespace, response.content
+            )
+        return response
+
+    def _get_fallback_model(self):
+        if self._fallback_model is None:
+            self._fallback_model = create_chat_model(
+                self.fallback_provider, self.profile
+            )
+            share_transport(self.fallback_provider, self._fallback_model)
+        return self._fallback_model
+
+    async def _invoke_model(
+        self,
+        messages: List[BaseMessage],
+        tools: Optional[Sequence[BaseTool]] = None,
+    ) -> BaseMessage:
+        # Tool-bound conversations carry tool messages the fallback cannot take
+        can_fail_over = bool(self.fallback_provider) and not (
+            tools and self.supports_native_tools
+        )
+
+        async def call_primary() -> BaseMessage:
+            return await call_with_resilience(
+                self.provider, lambda: self._call_primary(messages, tools)
+            )
+
+        async def call_fallback() -> BaseMessage:
+            model = self._get_fallback_model()
+            share_async_transport(self.fallback_provider, model)
+            return await call_with_resilience(
+                self.fallback_provider, lambda: model.ainvoke(messages)
+            )
+
+        try:
+            if can_fail_over and Config.LLM_HEDGE_DELAY > 0:
+                return await self._hedged(call_primary, call_fallback)
+            return await call_primary()
+        except Exception as e:
+            if not can_fail_over or not (
+                isinstance(e, LLMUnavailableError) or is_transient_error(e)
+            ):
+                logger.error(f"[LLMWrapper] Invoke error ({self.provider}): {e}")
                 raise e
-        else:  # Ollama
-            self.model = ChatOllama(
-                model=Config.LLM_MODEL,
-                base_url=Config.OLLAMA_BASE_URL,
-                retry_on_failure=True,
-                seed=42,
-                temperature=Config.LLM_TEMPERATURE,
-                timeout=Config.LLM_TIMEOUT,
-                num_ctx=Config.LLM_CONTEXT_LENGTH,
-                streaming=Config.ENABLE_STREAMING,
-                top_k=Config.LLM_TOP_K,
-                top_p=Config.LLM_TOP_P,
-                min_p=Config.LLM_MIN_P,
-                repeat_penalty=Config.LLM_REPETITION_PENALTY,
+
+            logger.warning(
+                f"[LLMWrapper] {self.provider} failed ({e}), "
+                f"failing over to {self.fallback_provider}"
             )
+            try:
+                return await call_fallback()
+            except Exception as fallback_error:
+                logger.error(
+                    f"[LLMWrapper] Invoke error ({self.fallback_provider}): "
+                    f"{fallback_error}"
+                )
+                raise fallback_error
+
+    async def _hedged(self, call_primary, call_fallback) -> BaseMessage:
+        """Start the fallback if the primary has not answered within the delay"""
+        primary = asyncio.ensure_future(call_primary())
+        done, _ = await asyncio.wait({primary}, timeout=Config.LLM_HEDGE_DELAY)
+        if done:
+            return primary.result()
+
+        logger.info(f"[LLMWrapper] Hedging slow {self.provider} request")
+        secondary = asyncio.ensure_future(call_fallback())
+        pending = {primary, secondary}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call_primary(
+        self,
+        messages: List[BaseMessage],
+        tools: Optional[Sequence[BaseTool]] = None,
+    ) -> BaseMessage:
+        share_async_transport(self.provider, self.model)
+        model = self._get_model(tools)
+        if (
+            Config.ENABLE_PROVIDER_PROMPT_CACHE
+            and self.provider == "google_ai_studio"
+            and model is self.model
+            and messages
+            and isinstance(messages[0], SystemMessage)
+        ):
+            # The system prompt lives in the cache, so it must not be resent.
+            # Tool-bound calls skip this: tools would have to be cached too.
+            cache_name = await self._get_context_cache(messages[0].content)
+            if cache_name:
+                return await model.ainvoke(messages[1:], cached_content=cache_name)
 
-    async def invoke(self, messages: List[BaseMessage]) -> BaseMessage:
-        """Invoke the LLM model asynchronously"""
+        return await model.ainvoke(messages)
+
+    async def astream(
+        self,
+        messages: List[BaseMessage],
+        tools: Optional[Sequence[BaseTool]] = None,
+    ):
+        """Stream response chunks; tool call arguments arrive incrementally"""
+        share_async_transport(self.provider, self.model)
+        model = self._get_model(tools)
         try:
-            response = await self.model.ainvoke(messages)
-            return response
+            async for chunk in stream_with_resilience(
+                self.provider, lambda: model.astream(messages)
+            ):
+                yield chunk
         except Exception as e:
-            logger.error(f"[LLMWrapper] Invoke error ({self.provider}): {e}")
+            logger.error(f"[LLMWrapper] Stream error ({self.provider}): {e}")
             raise e
+
+
+_llm_instances: Dict[str, LLMWrapper] = {}
+
+
+def get_llm(profile: str = "default") -> LLMWrapper:
+    """Return the process-wide LLMWrapper for a model profile.
+
+    Instances are keyed by the resolved profile settings, so profiles that
+    resolve to the same model share one client as well.
+    """
+    name = profile if profile in Config.LLM_PROFILES else "default"
+    key = json.dumps(Config.LLM_PROFILES[name], sort_keys=True, default=str)
+    llm = _llm_instances.get(key)
+    if llm is None:
+        llm = LLMWrapper(name)
+        _llm_instances[key] = llm
+        logger.info(f"[LLMWrapper] Created LLM client for profile '{name}'")
+    return llm
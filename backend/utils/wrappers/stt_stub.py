@@ -0,0 +1,22 @@
+"""Stand-in STT model with the interface of ``utils.stt.decode``.
+
+Set ``STT_MODEL=utils.wrappers.stt_stub`` to run the speech endpoints and
+the STT worker pool without the speech stack or any model weights.
+"""
+
+import os
+
+import numpy as np
+
+# The worker passes PCM as a NumPy array instead of a torch tensor
+ACCEPTS_NUMPY = True
+
+
+def run(long_form_audio: str = None, data=None) -> str:
+    if data is not None:
+        return f"stub transcription of {np.asarray(data).size} samples"
+    return f"stub transcription of {os.path.basename(long_form_audio)}"
+
+
+def run_batch(inputs: list) -> list:
+    return [run(**model_input) for model_input in inputs]